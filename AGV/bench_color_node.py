@@ -0,0 +1,50 @@
+# bench_color_node.py
+# 색상 노드 검출 프레임당 비용 측정 (제어 루프 프레임 예산 확인용)
+#
+#   python bench_color_node.py                  # 224x224 (CSI 기본)
+#   python bench_color_node.py --size 480 640
+import argparse
+import time
+import cv2
+import numpy as np
+
+from color_node import ColorNodeDetector, NODE_COLORS
+
+
+def _node_frame(h, w, hue):
+    """하단에 색 패치가 있는 BGR 프레임"""
+    frame = np.full((h, w, 3), 150, np.uint8)
+    patch = np.full((h // 4, w // 2, 3), (hue, 220, 200), np.uint8)
+    frame[h - h // 4:, w // 4:w // 4 + w // 2] = cv2.cvtColor(patch, cv2.COLOR_HSV2BGR)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, nargs=2, default=[224, 224], metavar=("H", "W"))
+    parser.add_argument("--iters", type=int, default=2000)
+    parser.add_argument("--hz", type=float, default=20.0, help="제어 루프 주기 (예산 비교용)")
+    args = parser.parse_args()
+
+    h, w = args.size
+    frames = [np.full((h, w, 3), 150, np.uint8)]
+    frames += [_node_frame(h, w, (lo + hi) // 2) for lo, hi in NODE_COLORS.values()]
+
+    det = ColorNodeDetector()
+    for name, f in zip(["none"] + list(NODE_COLORS), frames):
+        print(f"  {name:7} → {det.classify(f)}")
+
+    costs = []
+    for i in range(args.iters):
+        t = time.perf_counter()
+        det.update(frames[i % len(frames)])
+        costs.append(time.perf_counter() - t)
+
+    c = np.array(costs) * 1000
+    budget = 1000.0 / args.hz
+    print(f"\nframe {h}x{w}: mean {c.mean():.3f} ms, p95 {np.percentile(c, 95):.3f} ms, "
+          f"max {c.max():.3f} ms  ({c.mean() / budget * 100:.2f}% of {budget:.0f} ms budget)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# bench_infer_process.py
+# 조향 추론을 같은 프로세스(스레드) vs 별도 프로세스(공유 메모리 링)로 돌릴 때
+# 제어 루프 달성 Hz / 지터 / 추론 fps 와 스트림 수신 fps 비교
+#
+#   python bench_infer_process.py                       # 두 모드, 조향 추론 40 ms 가정
+#   python bench_infer_process.py --infer-ms 60 --viewers 3 --duration 15
+#   python bench_infer_process.py --real-model          # 실제 steering_model (Jetson)
+#
+# 자식 프로세스에서 AGV 전체(AGV_HARDWARE=sim 카메라 / 모터 + 스트림 서버 + 미션)를 실행하고
+# 부모가 스트림 시청자 역할. --real-model 이 없으면 추론 대신 GIL을 잡고 도는 busy loop
+# (CPU 추론의 파이썬 전/후처리처럼 GIL을 놓지 않는 최악의 경우)
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench_stream_server import _Viewer, _proc_sample, _wait_port
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def busy_infer(frame):
+    """추론 대역: BENCH_INFER_MS 동안 순수 파이썬 연산 (GIL 점유)"""
+    end = time.perf_counter() + float(os.environ.get("BENCH_INFER_MS", "40")) / 1000
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return 0.0, 0.5
+
+
+# =========================
+# 자식 프로세스: AGV 스택
+# =========================
+def _agv(port, duration):
+    import camera_manager
+    import mission
+    import stream_server
+
+    camera_manager.system_on()
+    stream_server.start_stream_server(host="127.0.0.1", port=port)
+    mission.start_mission("bench")
+
+    time.sleep(duration)
+    report = mission.stop_mission()
+    stream_server.stop_stream_server()
+    camera_manager.system_off()
+    mission.stop_infer_process()
+    print("BENCH_REPORT " + json.dumps(report), flush=True)
+
+
+# =========================
+# 부모 프로세스: 모드별 실행 + 시청자
+# =========================
+def _bench_mode(process, args):
+    env = dict(os.environ, AGV_HARDWARE="sim", AGV_INFER_PROCESS="1" if process else "0",
+               BENCH_INFER_MS=str(args.infer_ms))
+    if not args.real_model:
+        env["AGV_STEERING_INFER"] = "bench_infer_process:busy_infer"
+
+    # 미션 시작 전 워커 준비 시간만큼 여유
+    warmup = 3.0
+    run_s = warmup + args.duration + 1.0
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--agv", "--port", str(args.port),
+         "--duration", str(run_s)],
+        cwd=BASE_DIR, env=env, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        if not _wait_port(args.port):
+            raise RuntimeError("AGV stream server did not start")
+        viewers = [_Viewer(args.port) for _ in range(args.viewers)]
+        for v in viewers:
+            v.start()
+        time.sleep(warmup)
+
+        _, cpu0 = _proc_sample(proc.pid)
+        frames0 = [v.frames for v in viewers]
+        t0 = time.time()
+        time.sleep(args.duration)
+        elapsed = time.time() - t0
+        _, cpu1 = _proc_sample(proc.pid)
+        fps = [(v.frames - f0) / elapsed for v, f0 in zip(viewers, frames0)]
+        for v in viewers:
+            v.running = False
+
+        out, _ = proc.communicate(timeout=run_s + 30)
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            proc.wait(timeout=5)
+
+    report = {}
+    for line in out.splitlines():
+        if line.startswith("BENCH_REPORT "):
+            report = json.loads(line[len("BENCH_REPORT "):])
+
+    infer = report.get("stages", {}).get("infer", {})
+    return {
+        "mode": "process" if process else "thread",
+        "control_hz": report.get("achieved_hz"),
+        "jitter_ms": report.get("jitter_ms"),
+        "overruns": report.get("overruns"),
+        "infer_fps": round(report.get("frames_inferred", 0) / run_s, 1),
+        "infer_ms": infer.get("mean_ms"),
+        "stream_fps": round(sum(fps) / len(fps), 1),
+        "main_cpu_pct": round((cpu1 - cpu0) / elapsed * 100, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agv", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=5081)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--viewers", type=int, default=2)
+    parser.add_argument("--infer-ms", type=float, default=40.0)
+    parser.add_argument("--real-model", action="store_true",
+                        help="busy loop 대신 실제 steering_model.infer_xy")
+    args = parser.parse_args()
+
+    if args.agv:
+        _agv(args.port, args.duration)
+        return
+
+    rows = [_bench_mode(False, args), _bench_mode(True, args)]
+
+    print()
+    print(f"{'mode':8} {'ctrl Hz':>8} {'jitter':>7} {'overrun':>8} {'infer fps':>9} "
+          f"{'infer ms':>8} {'stream fps':>10} {'main CPU%':>9}")
+    for r in rows:
+        print(f"{r['mode']:8} {str(r['control_hz']):>8} {str(r['jitter_ms']):>7} {str(r['overruns']):>8} "
+              f"{r['infer_fps']:>9} {str(r['infer_ms']):>8} {r['stream_fps']:>10} {r['main_cpu_pct']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# bench_steering_model.py
+# steering_model 백엔드별 지연시간 / 처리량 비교
+#
+#   python bench_steering_model.py                          # 사용 가능한 백엔드 전부
+#   python bench_steering_model.py --backends torch_cpu onnx_cpu --iters 300
+#   python bench_steering_model.py --roi 112 224 0 224 --resize 112 224
+#
+# 전처리 단독 비교 (기존 PIL → to_tensor → 정규화 vs LUT 1-pass) 도 함께 출력
+#
+# 모델 로드 실패(CUDA 없음, onnxruntime 미설치 등) 백엔드는 건너뛰고 사유를 출력
+import argparse
+import time
+import numpy as np
+
+import steering_model
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+def bench_preprocess(frames, iters, roi=None, size=None):
+    """전처리만 비교: 기존 경로 vs FramePreprocessor"""
+    results = {}
+
+    try:
+        import PIL.Image
+        import torch
+        import torchvision.transforms as transforms
+
+        mean = torch.from_numpy(steering_model.MEAN)
+        std = torch.from_numpy(steering_model.STD)
+
+        def legacy(image):
+            image = PIL.Image.fromarray(image)
+            image = transforms.functional.to_tensor(image)
+            image.sub_(mean[:, None, None]).div_(std[:, None, None])
+            return image[None, ...]
+
+        t = time.perf_counter()
+        for i in range(iters):
+            legacy(frames[i % len(frames)])
+        results["legacy_pil"] = (time.perf_counter() - t) / iters * 1000
+    except ImportError as e:
+        print(f"[SKIP] legacy preprocess: {e}")
+
+    prep = steering_model.FramePreprocessor(roi, size)
+    out = np.empty((1, 3) + tuple(prep.output_hw(frames[0].shape)), np.float32)
+    t = time.perf_counter()
+    for i in range(iters):
+        prep.normalize_into(prep.crop_resize(frames[i % len(frames)]), out)
+    results["fused_lut"] = (time.perf_counter() - t) / iters * 1000
+
+    return results
+
+
+def bench_backend(name, frames, warmup, iters, roi=None, size=None):
+    t0 = time.perf_counter()
+    backend = steering_model.create_backend(name, roi=roi, size=size)
+    load_s = time.perf_counter() - t0
+
+    for i in range(warmup):
+        backend.infer(frames[i % len(frames)])
+
+    lat = []
+    t_start = time.perf_counter()
+    for i in range(iters):
+        t = time.perf_counter()
+        backend.infer(frames[i % len(frames)])
+        lat.append(time.perf_counter() - t)
+    total = time.perf_counter() - t_start
+
+    return {
+        "backend": name,
+        "stages": backend.timings.report(),
+        "load_s": load_s,
+        "mean_ms": float(np.mean(lat)) * 1000,
+        "p50_ms": _percentile(lat, 50),
+        "p95_ms": _percentile(lat, 95),
+        "p99_ms": _percentile(lat, 99),
+        "fps": iters / total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(steering_model.BACKENDS))
+    parser.add_argument("--size", type=int, nargs=2, default=[224, 224], metavar=("H", "W"))
+    parser.add_argument("--roi", type=int, nargs=4, metavar=("Y0", "Y1", "X0", "X1"))
+    parser.add_argument("--resize", type=int, nargs=2, metavar=("H", "W"))
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--iters", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 256, (args.size[0], args.size[1], 3), dtype=np.uint8)
+        for _ in range(8)
+    ]
+
+    print("[preprocess only] ms/frame")
+    prep = bench_preprocess(
+        frames, args.iters,
+        roi=args.roi and tuple(args.roi),
+        size=args.resize and tuple(args.resize),
+    )
+    for k, v in prep.items():
+        print(f"  {k:12} {v:.3f}")
+
+    rows = []
+    for name in args.backends:
+        try:
+            rows.append(bench_backend(
+                name, frames, args.warmup, args.iters,
+                roi=args.roi and tuple(args.roi),
+                size=args.resize and tuple(args.resize),
+            ))
+        except Exception as e:
+            print(f"[SKIP] {name}: {e}")
+
+    print()
+    print(f"{'backend':10} {'load s':>7} {'mean ms':>8} {'p50 ms':>7} "
+          f"{'p95 ms':>7} {'p99 ms':>7} {'fps':>7}")
+    for r in sorted(rows, key=lambda r: r["mean_ms"]):
+        print(f"{r['backend']:10} {r['load_s']:>7.2f} {r['mean_ms']:>8.2f} "
+              f"{r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f} {r['p99_ms']:>7.2f} {r['fps']:>7.1f}")
+
+    print()
+    print("[stage timings] ms (EWMA)")
+    for r in rows:
+        print(f"  {r['backend']:10} {r['stages']}")
+
+
+if __name__ == "__main__":
+    main()
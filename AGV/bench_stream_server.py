@@ -0,0 +1,201 @@
+# bench_stream_server.py
+# 스트림 서버 벤치마크: ASGI(stream_server) vs Flask(stream_server_flask)
+# 시청자 1 / 5 / 20명일 때 서버 프로세스의 시청자당 메모리(RSS), CPU, 수신 fps 측정
+#
+#   python bench_stream_server.py                  # 전체 비교 (passthrough)
+#   python bench_stream_server.py --reencode       # passthrough OFF (설정별 인코딩)
+#   python bench_stream_server.py --viewers 1 5 20 --duration 10
+#
+# 카메라 없이 돌도록 자식 프로세스에서 미리 인코딩한 합성 프레임(30fps)을 camera_manager 슬롯에 게시함
+# (프레임 생성 비용이 서버 CPU 측정에 섞이지 않도록 sim 카메라 대신 고정 프레임 사용)
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+# =========================
+# 자식 프로세스: 서버 + 합성 프레임 소스
+# =========================
+def _serve(backend, port, passthrough):
+    # 로봇 밖에서 실행 (실제 장치 import 안 함)
+    os.environ["AGV_HARDWARE"] = "sim"
+
+    import cv2
+    import numpy as np
+    import camera_manager
+
+    camera_manager.USB_JPEG_PASSTHROUGH = passthrough
+
+    h, w = 480, 640
+    frame = np.zeros((h, w, 3), np.uint8)
+    frame[:] = np.linspace(0, 255, w, dtype=np.uint8)[None, :, None]
+    noise = np.random.randint(0, 40, (h, w, 3), np.uint8)
+    jpeg = cv2.imencode(".jpg", frame + noise)[1].tobytes()
+
+    def _source():
+        while True:
+            if passthrough:
+                camera_manager.usb_jpegs.publish(jpeg)
+            else:
+                camera_manager.usb_frames.publish(frame)
+            time.sleep(1 / 30)
+
+    threading.Thread(target=_source, daemon=True).start()
+
+    if backend == "flask":
+        from stream_server_flask import run_stream_server
+    else:
+        from stream_server import run_stream_server
+    run_stream_server(host="127.0.0.1", port=port)
+
+
+# =========================
+# 부모 프로세스: 시청자 + 측정
+# =========================
+def _proc_sample(pid):
+    """(rss MB, 누적 CPU sec)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / CLK_TCK   # utime + stime
+
+    rss_kb = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+    return rss_kb / 1024, cpu
+
+
+def _wait_port(port, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class _Viewer(threading.Thread):
+    """raw socket MJPEG 시청자: 받은 JPEG 수만 셈"""
+
+    def __init__(self, port):
+        super().__init__(daemon=True)
+        self.port = port
+        self.frames = 0
+        self.running = True
+
+    def run(self):
+        sock = socket.create_connection(("127.0.0.1", self.port))
+        sock.sendall(
+            b"GET /usb_video HTTP/1.1\r\nHost: bench\r\nConnection: keep-alive\r\n\r\n"
+        )
+        buf = b""
+        try:
+            while self.running:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+                self.frames += buf.count(b"--frame")
+                buf = buf[-(len(b"--frame") - 1):]
+        finally:
+            sock.close()
+
+
+def _bench_backend(backend, viewer_counts, duration, passthrough, port):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", backend,
+         "--port", str(port)] + ([] if passthrough else ["--reencode"]),
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+    )
+    rows = []
+    try:
+        if not _wait_port(port):
+            raise RuntimeError(f"{backend} server did not start")
+        time.sleep(1.0)
+        base_rss, _ = _proc_sample(proc.pid)
+
+        for n in viewer_counts:
+            viewers = [_Viewer(port) for _ in range(n)]
+            for v in viewers:
+                v.start()
+            time.sleep(1.0)   # 워밍업
+
+            rss0, cpu0 = _proc_sample(proc.pid)
+            frames0 = [v.frames for v in viewers]
+            t0 = time.time()
+            time.sleep(duration)
+            rss1, cpu1 = _proc_sample(proc.pid)
+            elapsed = time.time() - t0
+            fps = [(v.frames - f0) / elapsed for v, f0 in zip(viewers, frames0)]
+
+            rows.append({
+                "backend": backend,
+                "viewers": n,
+                "rss_mb": rss1,
+                "rss_per_viewer_mb": (rss1 - base_rss) / n,
+                "cpu_pct": (cpu1 - cpu0) / elapsed * 100,
+                "cpu_per_viewer_pct": (cpu1 - cpu0) / elapsed * 100 / n,
+                "threads": _thread_count(proc.pid),
+                "fps_min": min(fps),
+                "fps_avg": sum(fps) / n,
+            })
+
+            for v in viewers:
+                v.running = False
+            for v in viewers:
+                v.join(timeout=2.0)
+            time.sleep(1.0)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+    return rows
+
+
+def _thread_count(pid):
+    return len(os.listdir(f"/proc/{pid}/task"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serve", choices=["flask", "asgi"])
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--reencode", action="store_true",
+                        help="passthrough OFF → 서버에서 JPEG 인코딩")
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, args.port, passthrough=not args.reencode)
+        return
+
+    rows = []
+    for i, backend in enumerate(["flask", "asgi"]):
+        rows += _bench_backend(
+            backend, args.viewers, args.duration,
+            passthrough=not args.reencode, port=args.port + i,
+        )
+
+    print()
+    print(f"{'backend':8} {'viewers':>7} {'RSS MB':>8} {'MB/viewer':>10} "
+          f"{'CPU %':>7} {'CPU%/viewer':>12} {'threads':>8} {'fps avg':>8} {'fps min':>8}")
+    for r in rows:
+        print(f"{r['backend']:8} {r['viewers']:>7} {r['rss_mb']:>8.1f} "
+              f"{r['rss_per_viewer_mb']:>10.2f} {r['cpu_pct']:>7.1f} "
+              f"{r['cpu_per_viewer_pct']:>12.2f} {r['threads']:>8} "
+              f"{r['fps_avg']:>8.1f} {r['fps_min']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
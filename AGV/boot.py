@@ -0,0 +1,107 @@
+# boot.py
+# 부팅 순서 / 준비 상태
+#   1) MQTT 연결 + 상태 보고가 먼저 (무거운 모듈 import 전)
+#   2) 백그라운드 스레드에서 무거운 모듈 import → 모터/서보 초기화 → 조향 모델 로드 + 워밍업 추론
+#   3) 끝나면 state = "ready" (리스너로 MQTT 상태 토픽에 발행)
+# 시간은 이 모듈 import 시점(= main.py 시작) 기준
+import threading
+import time
+
+BOOT_T0 = time.perf_counter()
+
+WARMUP_FRAMES = 5           # 워밍업 추론 횟수 (첫 몇 번은 CUDA 커널/메모리 할당으로 느림)
+WARMUP_SHAPE = (224, 224, 3)  # CSI 카메라 프레임 크기 (camera_manager.csi_on 기본값)
+
+state = "booting"           # booting → connected → ready (실패 시 error)
+timings = {}                # 단계 이름 → 부팅 후 경과 초
+error = None
+
+_ready = threading.Event()
+_listeners = []
+_thread = None
+
+
+def mark(name):
+    timings[name] = round(time.perf_counter() - BOOT_T0, 3)
+    print(f"[BOOT] {name}: {timings[name]:.3f}s")
+
+
+def add_state_listener(fn):
+    """상태가 바뀔 때 fn(status dict) 호출"""
+    _listeners.append(fn)
+
+
+def status():
+    return {"state": state, "timings": dict(timings), "error": error}
+
+
+def set_state(new_state):
+    global state
+
+    # 워밍업 결과(ready / error)는 MQTT (재)연결 상태로 덮지 않음 → 부팅 실패가 GUI에서 사라지지 않게
+    if state in ("ready", "error") and new_state == "connected":
+        return
+    state = new_state
+    for fn in list(_listeners):
+        try:
+            fn(status())
+        except Exception as e:
+            print(f"[BOOT] state listener error: {e}")
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def wait_ready(timeout=None):
+    return _ready.wait(timeout)
+
+
+def warm_up():
+    """무거운 모듈 import + 장치 초기화 + 모델 로드 / 워밍업 추론"""
+    global error
+
+    try:
+        import numpy as np
+        import camera_manager  # noqa: F401  (cv2, GStreamer)
+        import stream_encoder
+        stream_encoder.stream_server_module()   # flask 또는 starlette / uvicorn
+        import mission
+        mark("imports")
+
+        import hardware
+        hardware.get_motors()
+        hardware.get_servo()
+        mark("devices")
+
+        frame = np.zeros(WARMUP_SHAPE, np.uint8)
+        if mission.AGV_INFER_PROCESS:
+            # 워커 프로세스가 모델 로드 + 워밍업 추론까지 끝내야 시작 완료
+            mission.start_infer_process(WARMUP_SHAPE)
+            mark("model_loaded")
+        else:
+            import steering_model
+            steering_model.get_backend()
+            mark("model_loaded")
+            for _ in range(WARMUP_FRAMES):
+                steering_model.infer_xy(frame)
+
+        for _ in range(WARMUP_FRAMES):
+            mission.detector.classify(frame)
+        mark("ready")
+
+        _ready.set()
+        set_state("ready")
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        print(f"[BOOT] warm-up failed: {error}")
+        set_state("error")
+
+
+def start_warm_up():
+    global _thread
+
+    if _thread is not None:
+        return
+    _thread = threading.Thread(target=warm_up, daemon=True)
+    _thread.start()
@@ -1,75 +1,243 @@
 # camera_manager.py
 import cv2
-from jetbot import Camera
+import numpy as np
+import hardware
+import threading
 import time
 
 _camera = None       # CSI 카메라 (라인트레이싱용)
 _usb_camera = None   # USB 웹캠 (GUI 출력 전용)
 
-# camera_manager.py (USB 부분만)
-import cv2
+# True: 웹캠의 MJPEG 바이트를 디코딩 없이 그대로 받음 (스트림은 그대로 전송)
+#       픽셀이 필요한 소비자가 요청할 때만 디코딩
+USB_JPEG_PASSTHROUGH = True
+
+
+class FrameSlot:
+    """
+    최신 프레임 1장을 시퀀스 번호와 함께 보관하는 공유 슬롯.
+    - 쓰기: 캡처 스레드 1개만 publish()
+    - 읽기: latest()는 락 없이 참조만 반환 (복사 없음)
+    - 대기: wait_next(seq)로 "seq 이후 새 프레임"을 기다림
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._entry = (0, None, 0.0)   # (seq, frame, timestamp)
+
+    def publish(self, frame):
+        seq = self._entry[0] + 1
+        # 튜플 교체는 원자적 → 읽는 쪽은 락 불필요
+        self._entry = (seq, frame, time.time())
+        with self._cond:
+            self._cond.notify_all()
+        return seq
+
+    def latest(self):
+        return self._entry
+
+    def wait_next(self, after_seq, timeout=1.0):
+        """
+        after_seq 보다 새로운 프레임이 올 때까지 대기. 타임아웃 시 None
+        clear()로 비운 슬롯(frame None)은 새 프레임이 아님 → 다음 publish까지 대기 (호출 쪽 바쁜 루프 방지)
+        """
+        entry = self._entry
+        if entry[0] > after_seq and entry[1] is not None:
+            return entry
+
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._entry[0] <= after_seq or self._entry[1] is None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._entry
+
+    def clear(self):
+        seq = self._entry[0]
+        self._entry = (seq, None, 0.0)
+        with self._cond:
+            self._cond.notify_all()
+
+
+csi_frames = FrameSlot()   # CSI 카메라 프레임 (라인트레이싱)
+usb_frames = FrameSlot()   # 디코딩된 BGR 프레임 (passthrough OFF)
+usb_jpegs = FrameSlot()    # 카메라 원본 JPEG bytes (passthrough ON)
+
+# passthrough 모드 지연 디코딩 캐시 (seq, frame) → 같은 프레임은 1번만 디코딩
+_decode_lock = threading.Lock()
+_decoded = (0, None)
+
+_capture_thread = None
+_capture_running = False
+
+
+def _usb_capture_loop(cap):
+    """USB 웹캠을 단독으로 소유하고 읽은 프레임을 usb_frames / usb_jpegs에 게시"""
+    last = time.time()
+    count = 0
+
+    while _capture_running:
+        ret, frame = cap.read()
+        if not ret:
+            time.sleep(0.01)
+            continue
+
+        if USB_JPEG_PASSTHROUGH:
+            # appsink가 image/jpeg 그대로면 1행 uint8 버퍼(JPEG 바이트)로 나옴
+            usb_jpegs.publish(frame.tobytes())
+        else:
+            usb_frames.publish(frame)
+
+        # FPS 체크용
+        count += 1
+        now = time.time()
+        if now - last >= 1.0:
+            print(f"[USB CAM] FPS: {count}")
+            count = 0
+            last = now
+
+    print("[USB CAM] capture thread stopped")
 
-_usb_camera = None
 
 def system_on():
-    global _usb_camera
+    global _usb_camera, _capture_thread, _capture_running
 
     if _usb_camera is not None:
         return
 
-    gst_pipeline = (
-        "v4l2src device=/dev/video1 ! "
-        "image/jpeg, width=640, height=480, framerate=30/1 ! "
-        "jpegdec ! videoconvert ! "
-        "appsink drop=true sync=false max-buffers=1"
-    )
+    if USB_JPEG_PASSTHROUGH:
+        gst_pipeline = (
+            "v4l2src device=/dev/video1 ! "
+            "image/jpeg, width=640, height=480, framerate=30/1 ! "
+            "appsink drop=true sync=false max-buffers=1"
+        )
+    else:
+        gst_pipeline = (
+            "v4l2src device=/dev/video1 ! "
+            "image/jpeg, width=640, height=480, framerate=30/1 ! "
+            "jpegdec ! videoconvert ! "
+            "appsink drop=true sync=false max-buffers=1"
+        )
 
-    _usb_camera = cv2.VideoCapture(gst_pipeline, cv2.CAP_GSTREAMER)
+    _usb_camera = hardware.open_usb_camera(gst_pipeline)
 
-    if _usb_camera.isOpened():
-        print("USB Webcam (GStreamer MJPG) ON")
-    else:
+    if not _usb_camera.isOpened():
         print("Failed to open USB Webcam via GStreamer")
         _usb_camera = None
+        return
+
+    print("USB Webcam (GStreamer MJPG) ON")
+
+    # ✅ 캡처 스레드 1개가 장치를 독점 → 소비자들은 usb_frames만 참조
+    _capture_running = True
+    _capture_thread = threading.Thread(
+        target=_usb_capture_loop,
+        args=(_usb_camera,),
+        daemon=True
+    )
+    _capture_thread.start()
+
+
+def csi_on(width=224, height=224):
+    """CSI 카메라 시작 (미션 시작 시). 새 프레임마다 csi_frames에 게시"""
+    global _camera
+
+    if _camera is not None:
+        return
+
+    _camera = hardware.create_csi_camera(width, height)
+    _camera.start(csi_frames.publish)
+    print("CSI Camera ON")
 
 
 def system_off():
-    global _camera, _usb_camera
+    global _camera, _usb_camera, _capture_thread, _capture_running
 
     if _camera:
         _camera.stop()
         _camera = None
+        csi_frames.clear()
+
+    _capture_running = False
+    if _capture_thread is not None:
+        _capture_thread.join(timeout=2.0)
+        _capture_thread = None
 
     if _usb_camera:
         _usb_camera.release()
         _usb_camera = None
 
+    usb_frames.clear()
+    usb_jpegs.clear()
     print("All Cameras OFF")
 
 def get_frame():
     """CSI 카메라 (라인트레이싱)"""
-    return _camera.value if _camera else None
+    return csi_frames.latest()[1]
 
-# FPS 체크용
-_last_time = time.time()
-_frame_count = 0
 
-def get_usb_frame():
-    global _last_time, _frame_count
+def wait_frame(after_seq=0, timeout=1.0):
+    """
+    after_seq 이후의 새 CSI 프레임을 기다려 (seq, frame, timestamp) 반환.
+    중간 프레임은 건너뛰고 항상 최신 프레임. 타임아웃 시 (after_seq, None, 0.0)
+    """
+    entry = csi_frames.wait_next(after_seq, timeout)
+    if entry is None or entry[1] is None:
+        return after_seq, None, 0.0
+    return entry
 
-    if _usb_camera and _usb_camera.isOpened():
-        ret, frame = _usb_camera.read()
-        if not ret:
-            return None
 
-        _frame_count += 1
-        now = time.time()
+def _decode_usb_jpeg(seq, jpeg):
+    """passthrough JPEG을 BGR로 디코딩 (seq 단위 캐시)"""
+    global _decoded
 
-        if now - _last_time >= 1.0:
-            print(f"[USB CAM] FPS: {_frame_count}")
-            _frame_count = 0
-            _last_time = now
+    cached = _decoded
+    if cached[0] == seq:
+        return cached[1]
 
+    with _decode_lock:
+        if _decoded[0] == seq:
+            return _decoded[1]
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        _decoded = (seq, frame)
         return frame
 
-    return None
\ No newline at end of file
+
+def get_usb_frame():
+    """USB 웹캠 최신 프레임 (블로킹 없음, 복사 없음 → 읽기 전용으로 사용)"""
+    if USB_JPEG_PASSTHROUGH:
+        seq, jpeg, _ = usb_jpegs.latest()
+        if jpeg is None:
+            return None
+        return _decode_usb_jpeg(seq, jpeg)
+    return usb_frames.latest()[1]
+
+
+def wait_usb_frame(after_seq=0, timeout=1.0):
+    """
+    after_seq 이후의 새 USB 프레임을 기다려 (seq, frame) 반환.
+    타임아웃 또는 카메라 OFF 시 (after_seq, None)
+    """
+    if USB_JPEG_PASSTHROUGH:
+        seq, jpeg = wait_usb_jpeg(after_seq, timeout)
+        if jpeg is None:
+            return after_seq, None
+        return seq, _decode_usb_jpeg(seq, jpeg)
+
+    entry = usb_frames.wait_next(after_seq, timeout)
+    if entry is None or entry[1] is None:
+        return after_seq, None
+    return entry[0], entry[1]
+
+
+def wait_usb_jpeg(after_seq=0, timeout=1.0):
+    """
+    passthrough 모드 전용: 카메라 원본 JPEG bytes를 (seq, jpeg)로 반환.
+    타임아웃 또는 카메라 OFF 시 (after_seq, None)
+    """
+    entry = usb_jpegs.wait_next(after_seq, timeout)
+    if entry is None or entry[1] is None:
+        return after_seq, None
+    return entry[0], entry[1]
@@ -0,0 +1,125 @@
+# color_node.py
+# 색상 노드(green / purple / blue / orange) 검출
+#   CSI 프레임 하단 ROI → 다운샘플 → HSV 1회 변환
+#   → hue LUT로 픽셀마다 색 라벨 + S/V 임계값 → bincount 1번으로 모든 색 픽셀 수
+#   → 연속 N 프레임 같은 색이면 "노드 도착" 이벤트 (떠난 뒤에야 같은 노드 재검출)
+import time
+import cv2
+import numpy as np
+
+# OpenCV HSV: H 0~179. 색끼리 hue 구간이 겹치면 안 됨
+NODE_COLORS = {
+    "orange": (8, 22),
+    "green": (40, 85),
+    "blue": (95, 125),
+    "purple": (126, 160),
+}
+S_MIN = 80
+V_MIN = 60
+
+ROI = (0.6, 1.0)        # 프레임 높이 비율 (바닥 쪽 노드 마커)
+DOWNSAMPLE = 4
+MIN_FRACTION = 0.08     # ROI 중 해당 색 픽셀 비율
+DEBOUNCE_FRAMES = 3     # 연속 검출 프레임 수
+RELEASE_FRAMES = 5      # 이만큼 안 보이면 노드를 떠난 것으로 봄
+
+
+class ColorNodeDetector:
+    def __init__(self, colors=None, roi=ROI, downsample=DOWNSAMPLE,
+                 min_fraction=MIN_FRACTION, debounce=DEBOUNCE_FRAMES,
+                 release=RELEASE_FRAMES):
+        colors = colors or NODE_COLORS
+        self.names = list(colors)
+        self.roi = roi
+        self.downsample = downsample
+        self.min_fraction = min_fraction
+        self.debounce = debounce
+        self.release = release
+
+        # hue → 라벨 (0 = 배경, 1.. = 색 순서)
+        self.hue_lut = np.zeros(256, np.uint8)
+        for i, (lo, hi) in enumerate(colors.values(), start=1):
+            if self.hue_lut[lo:hi + 1].any():
+                raise ValueError(f"hue range overlaps: {self.names[i - 1]}")
+            self.hue_lut[lo:hi + 1] = i
+
+        self._small = None
+        self._hsv = None
+
+        self._candidate = None
+        self._count = 0
+        self._current = None    # 현재 머물고 있는 노드
+        self._missing = 0
+
+        self.cost_ms = 0.0      # 프레임당 처리 시간 EWMA
+        self.last_cost_ms = 0.0
+
+    def reset(self):
+        self._candidate = None
+        self._count = 0
+        self._current = None
+        self._missing = 0
+
+    def _alloc(self, shape):
+        h, w = shape[:2]
+        y0, y1 = int(h * self.roi[0]), int(h * self.roi[1])
+        sh = max((y1 - y0) // self.downsample, 1)
+        sw = max(w // self.downsample, 1)
+        self._rows = (y0, y1)
+        self._small = np.empty((sh, sw, 3), np.uint8)
+        self._hsv = np.empty((sh, sw, 3), np.uint8)
+        self._shape = shape
+
+    def classify(self, frame):
+        """프레임 1장 → (색 이름 또는 None, 비율)"""
+        if self._small is None or frame.shape != self._shape:
+            self._alloc(frame.shape)
+
+        y0, y1 = self._rows
+        sh, sw = self._small.shape[:2]
+        cv2.resize(frame[y0:y1], (sw, sh), dst=self._small, interpolation=cv2.INTER_NEAREST)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2HSV, dst=self._hsv)
+
+        h = self._hsv[..., 0]
+        s = self._hsv[..., 1]
+        v = self._hsv[..., 2]
+        labels = self.hue_lut[h]
+        labels[(s < S_MIN) | (v < V_MIN)] = 0
+
+        counts = np.bincount(labels.ravel(), minlength=len(self.names) + 1)
+        best = int(counts[1:].argmax()) + 1
+        fraction = counts[best] / labels.size
+        if fraction < self.min_fraction:
+            return None, float(fraction)
+        return self.names[best - 1], float(fraction)
+
+    def update(self, frame):
+        """
+        프레임마다 호출. 노드에 새로 도착한 프레임에서만 색 이름 반환, 그 외 None
+        """
+        t0 = time.perf_counter()
+        color, _ = self.classify(frame)
+
+        arrived = None
+        if color is not None and color == self._candidate:
+            self._count += 1
+        else:
+            self._candidate = color
+            self._count = 1 if color is not None else 0
+
+        if color is None or color != self._current:
+            self._missing += 1
+            if self._missing >= self.release:
+                self._current = None
+        else:
+            self._missing = 0
+
+        if self._candidate is not None and self._count >= self.debounce \
+                and self._candidate != self._current:
+            self._current = self._candidate
+            self._missing = 0
+            arrived = self._current
+
+        self.last_cost_ms = (time.perf_counter() - t0) * 1000
+        self.cost_ms += 0.1 * (self.last_cost_ms - self.cost_ms)
+        return arrived
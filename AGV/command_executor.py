@@ -0,0 +1,116 @@
+# command_executor.py
+# MQTT 명령 실행 스레드
+#   paho 콜백에서는 파싱/검증 후 submit만 (네트워크 루프 / keepalive를 막지 않음)
+#   실행은 전용 스레드 1개가 순서대로. 큐는 크기 제한
+#   같은 대상(target)에 대한 새 명령이 오면 큐에 남아 있는 이전 명령은 폐기 (예: ON 대기 중 OFF)
+#   명령마다 수신 → 실행 시작 지연 / 실행 시간 기록
+import threading
+import time
+from collections import deque
+
+from latency_stats import latency_summary
+
+QUEUE_MAX = 16
+STATS_WINDOW = 200
+
+
+class Command:
+    def __init__(self, target, action, fn, supersedes=(), **params):
+        """
+        target: 같은 target의 대기 명령은 이 명령으로 대체됨
+        supersedes: 추가로 폐기할 target (예: system OFF → 대기 중인 mission 명령도 폐기)
+        fn: 실행 함수 fn(**params)
+        """
+        self.target = target
+        self.action = action
+        self.fn = fn
+        self.supersedes = (target, *supersedes)
+        self.params = params
+        self.received = time.time()
+
+    def __repr__(self):
+        return f"{self.target}:{self.action}"
+
+
+class CommandExecutor:
+    def __init__(self, maxlen=QUEUE_MAX):
+        self.maxlen = maxlen
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        self.executed = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.failed = 0
+        self._latency = deque(maxlen=STATS_WINDOW)     # 수신 → 실행 시작
+        self._duration = deque(maxlen=STATS_WINDOW)    # 실행 시간
+
+    def submit(self, cmd):
+        """콜백 스레드에서 호출. 막지 않음"""
+        with self._cond:
+            kept = deque(c for c in self._queue if c.target not in cmd.supersedes)
+            for c in self._queue:
+                if c.target in cmd.supersedes:
+                    print(f"[CMD] {c} superseded by {cmd}")
+                    self.superseded += 1
+            self._queue = kept
+
+            if len(self._queue) >= self.maxlen:
+                old = self._queue.popleft()
+                print(f"[CMD] queue full → dropped {old}")
+                self.dropped += 1
+
+            self._queue.append(cmd)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                cmd = self._queue.popleft()
+
+            t0 = time.time()
+            try:
+                cmd.fn(**cmd.params)
+            except Exception as e:
+                self.failed += 1
+                print(f"[CMD] {cmd} failed: {e}")
+            t1 = time.time()
+
+            self.executed += 1
+            self._latency.append(t0 - cmd.received)
+            self._duration.append(t1 - t0)
+            print(f"[CMD] {cmd}: wait {(t0 - cmd.received) * 1000:.1f} ms, run {(t1 - t0) * 1000:.1f} ms")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._cond:
+            pending = [repr(c) for c in self._queue]
+        return {
+            "executed": self.executed,
+            "superseded": self.superseded,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "pending": pending,
+            "latency": latency_summary(list(self._latency)),
+            "duration": latency_summary(list(self._duration)),
+        }
@@ -0,0 +1,303 @@
+# hardware.py
+# 하드웨어 추상화: 실제 로봇(jetbot / SCSCtrl / GStreamer) ↔ 시뮬레이션 / 녹화 재생
+#   AGV_HARDWARE=real   (기본) Jetson 위에서 실제 장치
+#   AGV_HARDWARE=sim    합성 카메라 + 가상 모터/서보 → 아무 리눅스 PC에서 실행
+#   AGV_HARDWARE=replay AGV_REPLAY_FILE의 녹화 프레임을 CSI 카메라로 재생
+# 실제 장치 라이브러리는 real 구현을 만들 때만 import
+import os
+import threading
+import time
+import numpy as np
+
+AGV_HARDWARE = os.getenv("AGV_HARDWARE", "real")
+AGV_REPLAY_FILE = os.getenv("AGV_REPLAY_FILE", "")
+AGV_REPLAY_SPEED = float(os.getenv("AGV_REPLAY_SPEED", "1.0"))
+
+# =========================
+# 녹화 (recorder.Recorder) 연결
+# =========================
+_recorder = None
+
+
+def start_recording(path, meta=None):
+    global _recorder
+    from recorder import Recorder
+
+    stop_recording()
+    _recorder = Recorder(path, meta={"hardware": AGV_HARDWARE, **(meta or {})})
+    return _recorder
+
+
+def stop_recording():
+    global _recorder
+
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+# =========================
+# 인터페이스
+# =========================
+class Motors:
+    """좌/우 모터. set()/stop()은 녹화 중이면 자동 기록 (frame_seq = 명령을 계산한 프레임)"""
+
+    def set(self, left, right, frame_seq=0):
+        if _recorder is not None:
+            _recorder.motor(left, right, frame_seq)
+        self._set(left, right)
+
+    def stop(self):
+        if _recorder is not None:
+            _recorder.stop()
+        self._stop()
+
+    def _set(self, left, right):
+        raise NotImplementedError
+
+    def _stop(self):
+        raise NotImplementedError
+
+
+class Servo:
+    def angle(self, servo_id, angle, speed, duration):
+        if _recorder is not None:
+            _recorder.servo(servo_id, angle, speed, duration)
+        self._angle(servo_id, angle, speed, duration)
+
+    def _angle(self, servo_id, angle, speed, duration):
+        raise NotImplementedError
+
+
+class CSICamera:
+    """
+    start(callback): 새 프레임마다 callback(frame) 호출 (녹화 중이면 기록)
+    callback은 프레임 seq를 반환 (FrameSlot.publish) → 녹화에 같은 seq로 기록
+    """
+
+    def start(self, callback):
+        def _emit(frame):
+            seq = callback(frame)
+            if _recorder is not None:
+                _recorder.frame(frame, seq or 0)
+
+        self._start(_emit)
+
+    def _start(self, emit):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+# =========================
+# 실제 장치
+# =========================
+class RealMotors(Motors):
+    def __init__(self):
+        from jetbot import Robot
+        self._robot = Robot()
+
+    def _set(self, left, right):
+        self._robot.left_motor.value = left
+        self._robot.right_motor.value = right
+
+    def _stop(self):
+        self._robot.stop()
+
+
+class RealServo(Servo):
+    def __init__(self):
+        from SCSCtrl import TTLServo
+        self._ttl = TTLServo
+
+    def _angle(self, servo_id, angle, speed, duration):
+        self._ttl.servoAngleCtrl(servo_id, angle, speed, duration)
+
+
+class RealCSICamera(CSICamera):
+    def __init__(self, width, height):
+        from jetbot import Camera
+        self._camera = Camera.instance(width=width, height=height)
+        self._observer = None
+
+    def _start(self, emit):
+        # Camera.instance()는 싱글톤 → 이전 stop()으로 멈춘 상태일 수 있음 (start는 이미 동작 중이면 무시됨)
+        self._camera.start()
+        self._observer = lambda change: emit(change["new"])
+        self._camera.observe(self._observer, names="value")
+
+    def stop(self):
+        if self._observer is not None:
+            self._camera.unobserve(self._observer, names="value")
+            self._observer = None
+        self._camera.stop()
+
+
+def _open_real_usb_camera(pipeline):
+    import cv2
+    return cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+
+
+# =========================
+# 시뮬레이션
+# =========================
+class SimMotors(Motors):
+    def __init__(self):
+        self.left = 0.0
+        self.right = 0.0
+
+    def _set(self, left, right):
+        self.left, self.right = left, right
+
+    def _stop(self):
+        self.left = self.right = 0.0
+
+
+class SimServo(Servo):
+    def __init__(self):
+        self.angles = {}
+
+    def _angle(self, servo_id, angle, speed, duration):
+        self.angles[servo_id] = angle
+
+
+def _synthetic_frame(width, height, t):
+    """천천히 좌우로 흔들리는 검은 라인 (라인트레이싱 입력 흉내)"""
+    frame = np.full((height, width, 3), 180, np.uint8)
+    center = int(width * (0.5 + 0.2 * np.sin(t)))
+    half = max(width // 20, 1)
+    frame[:, max(center - half, 0):center + half] = 20
+    return frame
+
+
+class _ThreadedCamera(CSICamera):
+    def __init__(self):
+        self._thread = None
+        self._running = False
+
+    def _start(self, emit):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(emit,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+
+class SimCSICamera(_ThreadedCamera):
+    def __init__(self, width, height, fps=30):
+        super().__init__()
+        self.width, self.height, self.fps = width, height, fps
+
+    def _run(self, emit):
+        t0 = time.time()
+        while self._running:
+            emit(_synthetic_frame(self.width, self.height, time.time() - t0))
+            time.sleep(1.0 / self.fps)
+
+
+class ReplayCSICamera(_ThreadedCamera):
+    """녹화 프레임을 원래 간격 / speed 배속으로 재생 (speed <= 0 이면 대기 없이)"""
+
+    def __init__(self, path, speed=1.0):
+        super().__init__()
+        from recorder import Recording
+        self.recording = Recording(path)
+        self.speed = speed
+        self.done = threading.Event()
+
+    def _run(self, emit):
+        rec = self.recording
+        if not rec.frames:
+            self.done.set()
+            return
+
+        t_rec0 = rec.frames[0][0]
+        t0 = time.time()
+        for i in range(len(rec.frames)):
+            if not self._running:
+                break
+            ts, frame = rec.frame(i)
+            if self.speed > 0:
+                delay = (ts - t_rec0) / self.speed - (time.time() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+            emit(frame)
+        self.done.set()
+
+
+class SimUSBCamera:
+    """cv2.VideoCapture 흉내. jpegdec 없는 파이프라인이면 JPEG 바이트(1행)를 반환"""
+
+    def __init__(self, pipeline, width=640, height=480, fps=30):
+        import cv2
+        self._cv2 = cv2
+        self.width, self.height, self.fps = width, height, fps
+        self.passthrough = "jpegdec" not in pipeline
+        self._opened = True
+        self._t0 = time.time()
+        self._next = self._t0
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        self._next += 1.0 / self.fps
+        delay = self._next - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+        frame = _synthetic_frame(self.width, self.height, time.time() - self._t0)
+        if self.passthrough:
+            ok, jpeg = self._cv2.imencode(".jpg", frame)
+            return ok, jpeg.reshape(1, -1)
+        return True, frame
+
+    def release(self):
+        self._opened = False
+
+
+# =========================
+# 팩토리 (프로세스당 1개씩)
+# =========================
+_motors = None
+_servo = None
+_lock = threading.Lock()
+
+
+def get_motors():
+    global _motors
+
+    with _lock:
+        if _motors is None:
+            _motors = RealMotors() if AGV_HARDWARE == "real" else SimMotors()
+    return _motors
+
+
+def get_servo():
+    global _servo
+
+    with _lock:
+        if _servo is None:
+            _servo = RealServo() if AGV_HARDWARE == "real" else SimServo()
+    return _servo
+
+
+def create_csi_camera(width=224, height=224):
+    if AGV_HARDWARE == "real":
+        return RealCSICamera(width, height)
+    if AGV_HARDWARE == "replay":
+        return ReplayCSICamera(AGV_REPLAY_FILE, AGV_REPLAY_SPEED)
+    return SimCSICamera(width, height)
+
+
+def open_usb_camera(pipeline):
+    if AGV_HARDWARE == "real":
+        return _open_real_usb_camera(pipeline)
+    return SimUSBCamera(pipeline)
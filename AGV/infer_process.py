@@ -0,0 +1,170 @@
+# infer_process.py
+# 추론을 별도 프로세스로 (GIL 분리: 스트림 / MQTT / 제어 루프와 CPU 코어를 나눠 씀)
+#   프레임: multiprocessing.shared_memory 링 버퍼 (슬롯 N개) → 프레임은 pickle 안 함
+#   요청:   Pipe로 프레임 seq(int)만 전송. 워커는 밀린 요청을 버리고 항상 최신 seq만 추론
+#   결과:   같은 Pipe로 (seq, x, y, capture_ts, infer_start, infer_end) 튜플
+#
+# 링 슬롯 헤더의 seq를 프레임 쓰기 전에 -1, 쓴 후에 seq로 기록 → 읽는 쪽은 복사 전후 seq가
+# 같을 때만 사용 (쓰는 도중 / 덮어쓴 슬롯은 버림)
+import importlib
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+RING_SLOTS = 4
+START_TIMEOUT_S = 120.0     # 워커 모델 로드 + 워밍업 대기
+
+
+class FrameRing:
+    def __init__(self, shape, slots=RING_SLOTS, name=None):
+        """name이 없으면 새로 만들고, 있으면 기존 링에 연결"""
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        header = slots * 16         # 슬롯마다 seq(int64) + ts(float64)
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=header + slots * frame_bytes
+        )
+
+        buf = self.shm.buf
+        self._seqs = np.ndarray((slots,), np.int64, buffer=buf, offset=0)
+        self._ts = np.ndarray((slots,), np.float64, buffer=buf, offset=slots * 8)
+        self._frames = np.ndarray((slots, *self.shape), np.uint8, buffer=buf, offset=header)
+        if self.owner:
+            self._seqs[:] = 0
+        self.seq = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame, ts):
+        """생산자(메인 프로세스) 전용. 기록한 seq 반환"""
+        seq = self.seq + 1
+        i = seq % self.slots
+        self._seqs[i] = -1
+        np.copyto(self._frames[i], frame)
+        self._ts[i] = ts
+        self._seqs[i] = seq
+        self.seq = seq
+        return seq
+
+    def read(self, seq, out):
+        """out에 복사 → capture ts. 이미 덮어쓴 슬롯이면 None"""
+        i = seq % self.slots
+        if self._seqs[i] != seq:
+            return None
+        np.copyto(out, self._frames[i])
+        ts = float(self._ts[i])
+        if self._seqs[i] != seq:
+            return None
+        return ts
+
+    def close(self):
+        # numpy view가 남아 있으면 SharedMemory.close가 실패하므로 먼저 해제
+        self._seqs = self._ts = self._frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def resolve_infer(path):
+    """"module:function" → 함수 (자식 프로세스에서 import)"""
+    module, attr = path.split(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _worker_main(infer_path, ring_name, shape, slots, conn):
+    infer = resolve_infer(infer_path)
+    ring = FrameRing(shape, slots, name=ring_name)
+    frame = np.empty(shape, np.uint8)
+
+    # 모델 로드 + 워밍업 (첫 추론은 느림) 후 준비 완료 알림
+    infer(frame)
+    conn.send("ready")
+
+    try:
+        while True:
+            seq = conn.recv()
+            # 추론하는 동안 쌓인 요청은 건너뛰고 최신 것만
+            while seq is not None and conn.poll():
+                seq = conn.recv()
+            if seq is None:
+                break
+
+            captured = ring.read(seq, frame)
+            if captured is None:
+                continue
+            t0 = time.time()
+            x, y = infer(frame)
+            t1 = time.time()
+            conn.send((seq, float(x), float(y), captured, t0, t1))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring.close()
+
+
+class InferenceProcess:
+    """추론 워커 프로세스 1개 + 프레임 링"""
+
+    def __init__(self, infer_path, shape, slots=RING_SLOTS):
+        self.infer_path = infer_path
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.ring = None
+        self.proc = None
+        self._conn = None
+
+    def start(self):
+        # CUDA / torch는 fork 후 사용 불가 → spawn
+        ctx = mp.get_context("spawn")
+        self.ring = FrameRing(self.shape, self.slots)
+        self._conn, child = ctx.Pipe()
+        self.proc = ctx.Process(
+            target=_worker_main,
+            args=(self.infer_path, self.ring.name, self.shape, self.slots, child),
+            daemon=True,
+        )
+        self.proc.start()
+        child.close()
+
+        if not self._conn.poll(START_TIMEOUT_S):
+            self.stop()
+            raise RuntimeError("inference worker did not become ready")
+        self._conn.recv()
+        print(f"[INFER] worker pid {self.proc.pid} ready ({self.infer_path}, {self.shape})")
+
+    def submit(self, frame, ts):
+        """프레임을 링에 쓰고 seq만 전송 (막지 않음)"""
+        seq = self.ring.write(frame, ts)
+        self._conn.send(seq)
+        return seq
+
+    def result(self, timeout):
+        """(seq, x, y, capture_ts, infer_start, infer_end) 또는 시간 초과 시 None"""
+        if not self._conn.poll(timeout):
+            return None
+        return self._conn.recv()
+
+    def alive(self):
+        return self.proc is not None and self.proc.is_alive()
+
+    def stop(self):
+        if self.proc is not None:
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.proc.join(timeout=5.0)
+            if self.proc.is_alive():
+                self.proc.terminate()
+            self.proc = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
@@ -0,0 +1,17 @@
+# latency_stats.py
+# 지연시간 요약 (제어 루프 단계 / 명령 실행 / 재생 / 벤치마크 공용)
+# command_executor가 MQTT 연결 전에 import하므로 numpy는 요약할 때 import (boot: 연결 먼저, 무거운 모듈은 나중)
+
+
+def latency_summary(values_s):
+    """초 단위 값들 → {"mean_ms", "p95_ms", "max_ms"} (소수 2자리). 값이 없으면 {}"""
+    if len(values_s) == 0:
+        return {}
+    import numpy as np
+
+    v = np.asarray(values_s, dtype=np.float64) * 1000
+    return {
+        "mean_ms": round(float(v.mean()), 2),
+        "p95_ms": round(float(np.percentile(v, 95)), 2),
+        "max_ms": round(float(v.max()), 2),
+    }
@@ -1,11 +1,24 @@
 # main.py
+# 부팅: MQTT 연결 / 상태 보고 먼저 → 무거운 모듈 + 모델 로드는 백그라운드 (boot.py)
+#   python main.py            # 기본
+#   python main.py --eager    # 이전 순서 (전부 로드 후 MQTT 연결) — 부팅 시간 비교용
+import boot  # 부팅 시각 기준점: 가장 먼저 import
+import argparse
 import threading
 import time
 from mqtt_listener import start_mqtt_loop
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eager", action="store_true",
+                        help="모델 로드 / 워밍업을 끝낸 뒤 MQTT 연결 (이전 부팅 순서)")
+    args = parser.parse_args()
+
     print("AGV BOOTING...")
 
+    if args.eager:
+        boot.warm_up()
+
     mqtt_thread = threading.Thread(
         target=start_mqtt_loop,
         daemon=True
@@ -14,12 +27,16 @@ def main():
 
     print("MQTT listener running")
 
+    if not args.eager:
+        boot.start_warm_up()
+
     # 프로세스 유지용 루프
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         print("AGV SHUTDOWN")
+        print(f"[BOOT] {boot.timings}")
 
 if __name__ == "__main__":
     main()
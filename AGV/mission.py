@@ -1,46 +1,381 @@
-# mission.py 수정본
+# mission.py
+# 라인트레이싱 제어 파이프라인 (단계가 서로 겹쳐서 동작)
+#   [캡처]  jetbot Camera 스레드 → camera_manager.csi_frames (최신 1장만 유지)
+#   [추론]  추론 스레드: 항상 최신 프레임만 infer_xy → 결과 슬롯 (밀린 프레임은 버림)
+#   [제어]  고정 주기 스레드: 최신 추론 결과로 compute → drive
+#           결과가 데드라인보다 오래됐거나 주기를 넘기면 즉시 모터 정지
+#   [노드]  추론 스레드에서 같은 프레임으로 색상 노드 검출 → 도착 이벤트 + 정차(dwell)
+#
+# AGV_INFER_PROCESS=1 이면 조향 추론을 별도 프로세스에서 (infer_process.py)
+#   [전달]  전달 스레드: 최신 CSI 프레임 → 공유 메모리 링 + seq 전송, 같은 프레임으로 노드 검출
+#   [결과]  결과 스레드: 워커 결과 수신 → 결과 슬롯
+import atexit
+import os
 import threading
 import time
-from camera_manager import get_frame
-from steering_model import infer_xy
+import numpy as np
+import hardware
+from camera_manager import FrameSlot, csi_on, wait_frame
+from infer_process import InferenceProcess, resolve_infer
+from latency_stats import latency_summary
 from line_follow import LineFollower
+from color_node import ColorNodeDetector
 from motor_controller import drive, stop
 from servo_controller import set_line_follow_pose
 
+CONTROL_HZ = 20.0
+# 프레임 캡처 ~ 모터 출력까지 허용 시간 (이보다 오래된 결과로는 주행 안 함)
+DEADLINE_S = 2.0 / CONTROL_HZ
+# 지정하면 미션마다 {cycle_id}.agvrec 로 프레임/모터 명령 녹화 (replay.py로 재생)
+AGV_RECORD_DIR = os.getenv("AGV_RECORD_DIR", "")
+# 노드 도착 시 정차 시간 (sec)
+NODE_DWELL_S = 2.0
+# 조향 추론 함수 ("module:function") / 별도 프로세스 실행 여부
+AGV_STEERING_INFER = os.getenv("AGV_STEERING_INFER", "steering_model:infer_xy")
+AGV_INFER_PROCESS = os.getenv("AGV_INFER_PROCESS", "0") == "1"
+
 _running = False
 _mission_thread = None # 미션 스레드 관리를 위한 변수
+_infer_thread = None
+_result_thread = None
+_worker = None          # InferenceProcess (AGV_INFER_PROCESS=1, 미션 사이에도 유지)
+_worker_lock = threading.Lock()     # boot 워밍업 / 미션 시작이 동시에 워커를 만들지 않게
+_cycle_id = None
+_dwell_until = 0.0
+last_node = None        # 마지막으로 도착한 노드 (미션이 끝나도 유지 → 다음 경로의 출발점)
 
-follower = LineFollower(
+FOLLOWER_GAINS = dict(
     speed_gain=0.15,
     steering_gain=0.12,
     steering_dgain=0.0,
     steering_bias=0.0,
 )
+follower = LineFollower(**FOLLOWER_GAINS)
+
+# (결과 seq, (x, y, capture_ts, infer_start, infer_end, 프레임 seq), publish ts)
+_results = FrameSlot()
+_ring_frames = {}       # (프로세스 모드) 워커 링 seq → CSI 프레임 seq
+_infer = resolve_infer(AGV_STEERING_INFER)
+
+detector = ColorNodeDetector()
+node_events = []        # [{"node", "ts", "cycle_id"}, ...] 이번 미션의 도착 이벤트
+_node_listeners = []
+
+
+def add_node_listener(fn):
+    """노드 도착 시 fn(event) 호출 (추론 스레드에서 호출되므로 오래 막지 말 것)"""
+    _node_listeners.append(fn)
+
+
+def remove_node_listener(fn):
+    if fn in _node_listeners:
+        _node_listeners.remove(fn)
+
+
+def _on_node_arrived(node, ts):
+    global _dwell_until, last_node
+
+    last_node = node
+    event = {"node": node, "ts": ts, "cycle_id": _cycle_id}
+    node_events.append(event)
+    _dwell_until = time.time() + NODE_DWELL_S
+    print(f"[MISSION] arrived at node {node}")
+
+    for fn in list(_node_listeners):
+        try:
+            fn(event)
+        except Exception as e:
+            print(f"[MISSION] node listener error: {e}")
+
+
+def hold(seconds):
+    """지금 위치에서 seconds 동안 정차 (도착 정차 시간보다 길게 잡을 때)"""
+    global _dwell_until
+    _dwell_until = max(_dwell_until, time.time() + seconds)
+
+
+def release():
+    """정차 해제 → 다음 제어 주기부터 다시 주행"""
+    global _dwell_until
+    _dwell_until = 0.0
+
+
+def is_running():
+    return _running
+
+
+def dwelling_at(node):
+    """미션 중 node에 정차해 있는지 (도착 정차 / hold 중)"""
+    return _running and last_node == node and time.time() < _dwell_until
+
+
+class ControlStats:
+    """제어 루프 통계: 달성 Hz, 주기 지터, 단계별 지연, 데드라인 미스"""
+
+    def __init__(self, hz, window=600):
+        self.period = 1.0 / hz
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.ticks = 0
+        self.deadline_misses = 0
+        self.overruns = 0
+        self.frames_inferred = 0
+        self.frames_dropped = 0
+        self._intervals = []
+        self._stages = {"queue": [], "infer": [], "color": [], "actuate": [], "total": []}
+        self._last_tick = None
+
+    def _push(self, values, value):
+        values.append(value)
+        if len(values) > self.window:
+            del values[0]
+
+    def tick(self, now):
+        if self._last_tick is not None:
+            self._push(self._intervals, now - self._last_tick)
+        self._last_tick = now
+        self.ticks += 1
+
+    def stage(self, name, seconds):
+        self._push(self._stages[name], seconds)
+
+    def report(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        intervals = np.array(self._intervals) if self._intervals else np.zeros(1)
+
+        stages = {name: latency_summary(values) for name, values in self._stages.items() if values}
+
+        return {
+            "cycle_id": _cycle_id,
+            "target_hz": round(1.0 / self.period, 1),
+            "achieved_hz": round(self.ticks / elapsed, 2),
+            "jitter_ms": round(float(intervals.std()) * 1000, 2),
+            "max_interval_ms": round(float(intervals.max()) * 1000, 2),
+            "ticks": self.ticks,
+            "deadline_misses": self.deadline_misses,
+            "overruns": self.overruns,
+            "frames_inferred": self.frames_inferred,
+            "frames_dropped": self.frames_dropped,
+            "nodes": [e["node"] for e in node_events],
+            "stages": stages,
+        }
+
+
+stats = ControlStats(CONTROL_HZ)
+
+
+def _infer_loop():
+    """최신 CSI 프레임만 추론 (추론 중 도착한 프레임은 건너뜀)"""
+    seq = 0
+    while _running:
+        new_seq, frame, captured = wait_frame(seq, timeout=0.5)
+        if frame is None:
+            continue
+
+        if seq and new_seq > seq + 1:
+            stats.frames_dropped += new_seq - seq - 1
+        seq = new_seq
+
+        t0 = time.time()
+        x, y = _infer(frame)
+        t1 = time.time()
+
+        stats.frames_inferred += 1
+        stats.stage("queue", t0 - captured)
+        stats.stage("infer", t1 - t0)
+        _results.publish((x, y, captured, t0, t1, seq))
+
+        # 조향 결과를 먼저 내보낸 뒤 같은 프레임으로 노드 검출
+        node = detector.update(frame)
+        stats.stage("color", detector.last_cost_ms / 1000)
+        if node is not None:
+            _on_node_arrived(node, captured)
+
+
+def _forward_loop():
+    """(프로세스 모드) 최신 CSI 프레임을 워커로 전달 + 노드 검출"""
+    seq = 0
+    while _running:
+        new_seq, frame, captured = wait_frame(seq, timeout=0.5)
+        if frame is None:
+            continue
+        seq = new_seq
+
+        _ring_frames[_worker.submit(frame, captured)] = seq
+
+        node = detector.update(frame)
+        stats.stage("color", detector.last_cost_ms / 1000)
+        if node is not None:
+            _on_node_arrived(node, captured)
+
+
+def _result_loop():
+    """(프로세스 모드) 워커 결과 → 결과 슬롯. 링 seq가 건너뛴 만큼 = 워커가 버린 프레임"""
+    last = None
+    while _running:
+        result = _worker.result(timeout=0.5)
+        if result is None:
+            continue
+
+        seq, x, y, captured, t0, t1 = result
+        if last is not None and seq > last + 1:
+            stats.frames_dropped += seq - last - 1
+        last = seq
+
+        # 워커가 건너뛴 링 seq도 함께 정리
+        frame_seq = _ring_frames.pop(seq, 0)
+        for k in [k for k in list(_ring_frames) if k < seq]:
+            _ring_frames.pop(k, None)
+
+        stats.frames_inferred += 1
+        stats.stage("queue", t0 - captured)
+        stats.stage("infer", t1 - t0)
+        _results.publish((x, y, captured, t0, t1, frame_seq))
+
+
+def start_infer_process(shape=(224, 224, 3)):
+    """추론 워커 시작 (모델 로드 + 워밍업까지 대기). 이미 실행 중이면 그대로"""
+    global _worker
+
+    with _worker_lock:
+        if _worker is None or not _worker.alive():
+            _worker = InferenceProcess(AGV_STEERING_INFER, shape)
+            _worker.start()
+            atexit.register(stop_infer_process)
+        return _worker
+
+
+def stop_infer_process():
+    global _worker
+
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
 
 def _mission_loop():
-    print("[MISSION] Running (no control, stream only)")
+    print(f"[MISSION] Running (control {CONTROL_HZ:.0f} Hz, deadline {DEADLINE_S * 1000:.0f} ms)")
+    period = 1.0 / CONTROL_HZ
+    next_tick = time.time()
+    last_seq = 0
+    stopped = True
+
     while _running:
-        time.sleep(0.1)
+        now = time.time()
+        stats.tick(now)
+
+        seq, result, _ = _results.latest()
+        fresh = result is not None and now - result[2] <= DEADLINE_S
+
+        if now < _dwell_until:
+            # 노드 정차 중
+            if not stopped:
+                stop()
+                stopped = True
+        elif not fresh:
+            # 결과 없음 / 너무 오래됨 → 오래된 조향으로 달리지 않도록 정지
+            if result is not None:
+                stats.deadline_misses += 1
+            if not stopped:
+                stop()
+                stopped = True
+        elif seq != last_seq:
+            x, y, captured, _, infer_end, frame_seq = result
+            steering, speed = follower.compute(x, y)
+            drive(steering, speed, frame_seq)
+            stopped = False
+            last_seq = seq
+
+            done = time.time()
+            stats.stage("actuate", done - infer_end)
+            stats.stage("total", done - captured)
+
+        # 고정 주기 유지: 밀렸으면 따라잡지 않고 다음 주기부터 다시
+        next_tick += period
+        delay = next_tick - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            stats.overruns += 1
+            if -delay > period:
+                stats.deadline_misses += 1
+                stop()
+                stopped = True
+                next_tick = time.time()
+
+    stop()
     print("[MISSION] Stopped")
 
 
 def start_mission(cycle_id):
-    global _running, _mission_thread
+    global _running, _mission_thread, _infer_thread, _result_thread, _cycle_id, _dwell_until
 
     if _running:
-        return
+        return get_mission_stats()
 
     print(f"[MISSION] START {cycle_id}")
+    _cycle_id = cycle_id
+    if AGV_RECORD_DIR:
+        os.makedirs(AGV_RECORD_DIR, exist_ok=True)
+        hardware.start_recording(
+            os.path.join(AGV_RECORD_DIR, f"{cycle_id}.agvrec"),
+            meta={"cycle_id": cycle_id, "control_hz": CONTROL_HZ,
+                  "follower": FOLLOWER_GAINS},
+        )
+    csi_on()
+    if AGV_INFER_PROCESS:
+        start_infer_process()
+    set_line_follow_pose()
+    stats.reset()
+    detector.reset()
+    node_events.clear()
+    _ring_frames.clear()
+    _dwell_until = 0.0
     _running = True
 
+    _infer_thread = threading.Thread(
+        target=_forward_loop if AGV_INFER_PROCESS else _infer_loop,
+        daemon=True
+    )
+    _infer_thread.start()
+
+    if AGV_INFER_PROCESS:
+        _result_thread = threading.Thread(
+            target=_result_loop,
+            daemon=True
+        )
+        _result_thread.start()
+
     _mission_thread = threading.Thread(
         target=_mission_loop,
         daemon=True
     )
     _mission_thread.start()
 
+    return {
+        "cycle_id": cycle_id,
+        "target_hz": CONTROL_HZ,
+        "deadline_ms": round(DEADLINE_S * 1000, 1),
+    }
+
 
 def stop_mission():
     global _running
     print("[MISSION] STOP")
-    _running = False
\ No newline at end of file
+    _running = False
+
+    for t in (_mission_thread, _infer_thread, _result_thread):
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout=2.0)
+
+    hardware.stop_recording()
+    report = stats.report()
+    print(f"[MISSION] {report}")
+    return report
+
+
+def get_mission_stats():
+    return stats.report()
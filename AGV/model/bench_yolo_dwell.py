@@ -0,0 +1,94 @@
+# bench_yolo_dwell.py
+# 노드당 정차(dwell) 시간 비교: 이전 1장씩 루프 vs 배치 1번 vs 조기 종료 투표
+#
+#   python bench_yolo_dwell.py                    # 폴더의 테스트 이미지를 30fps 카메라처럼 재생
+#   python bench_yolo_dwell.py --camera 0         # 실제 웹캠
+#   python bench_yolo_dwell.py --n 1 5 10 --repeat 5
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+import yolo_backend
+
+from inference import yolo_multi_inference, yolo_multi_inference_sequential, yolo_vote_inference
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ImageCamera:
+    """cv2.VideoCapture 흉내: 이미지들을 fps 간격으로 돌려가며 반환"""
+
+    def __init__(self, paths, fps=30):
+        self.frames = [cv2.imread(p) for p in paths]
+        self.interval = 1.0 / fps
+        self._i = 0
+        self._next = time.time()
+
+    def read(self):
+        self._next = max(self._next + self.interval, time.time())
+        delay = self._next - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        frame = self.frames[self._i % len(self.frames)]
+        self._i += 1
+        return True, frame.copy()
+
+    def release(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default=yolo_backend.YOLO_BACKEND, choices=list(yolo_backend.BACKENDS))
+    parser.add_argument("--imgsz", type=int, default=yolo_backend.YOLO_IMGSZ)
+    parser.add_argument("--camera", type=int, help="웹캠 번호 (없으면 테스트 이미지)")
+    parser.add_argument("--n", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = yolo_backend.load_model(args.backend, args.imgsz)
+    if args.camera is not None:
+        cap = cv2.VideoCapture(args.camera)
+        time.sleep(1)
+    else:
+        cap = ImageCamera([
+            os.path.join(BASE_DIR, f"{c}.jpg") for c in ("green", "purple", "blue")
+        ])
+
+    # 워밍업 (첫 호출의 모델 초기화 비용 제외)
+    yolo_multi_inference(2, cap=cap, model=model)
+
+    def _as_tuple(fn):
+        def run(n, cap, model):
+            obs = fn(n, cap=cap, model=model)
+            return obs["frame"], obs["result"], obs["confidence"]
+        return run
+
+    modes = [
+        ("sequential", yolo_multi_inference_sequential),
+        ("batched", _as_tuple(yolo_multi_inference)),
+        # N = 프레임 예산, 확신이 서면 일찍 종료
+        ("early_exit", _as_tuple(yolo_vote_inference)),
+    ]
+    rows = []
+    for n in args.n:
+        for name, fn in modes:
+            times, result = [], None
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                _, cls, conf = fn(n, cap=cap, model=model)
+                times.append(time.perf_counter() - t)
+                result = (cls, conf)
+            rows.append((n, name, float(np.mean(times)), float(np.min(times)), result))
+
+    cap.release()
+
+    print()
+    print(f"{'N':>3} {'mode':11} {'dwell s':>8} {'min s':>7}  result")
+    for n, name, mean_s, min_s, result in rows:
+        print(f"{n:>3} {name:11} {mean_s:>8.3f} {min_s:>7.3f}  {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# bench_yolo_export.py
+# best.pt export(ONNX / OpenVINO / OpenVINO INT8) × 입력 크기별 비교
+#   지연시간(1장), 처리량(배치), 메모리(RSS), PyTorch 기준과 결과 일치율
+#
+#   python bench_yolo_export.py                                   # 폴더의 테스트 이미지, 기본 조합
+#   python bench_yolo_export.py --backends pytorch onnx --imgsz 320 480 640
+#   python bench_yolo_export.py --images ~/lettuce_set --int8-data lettuce.yaml
+#
+# 조합마다 별도 프로세스에서 로드 → 메모리 수치가 서로 섞이지 않음 (export는 부모에서 먼저)
+# export / 로드 실패(openvino 미설치, int8 보정 데이터 없음 등) 조합은 건너뛰고 사유 출력
+# 결과를 보고 inference 쪽은 YOLO_BACKEND / YOLO_IMGSZ 환경변수로 선택
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import sys
+import time
+import numpy as np
+
+import yolo_backend
+
+# AGV/ 공용 모듈 (latency_stats) — 이 스크립트는 model/에서 실행
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from latency_stats import latency_summary  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _rss_mb():
+    """(현재 RSS, 최대 RSS) MB"""
+    out = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                out[line.split(":")[0]] = int(line.split()[1]) / 1024
+    return out.get("VmRSS", 0.0), out.get("VmHWM", 0.0)
+
+
+def _top(result, names):
+    boxes = result.boxes
+    if len(boxes) == 0:
+        return "unknown", 0.0
+    return names[int(boxes.cls[0])], float(boxes.conf[0])
+
+
+def _run_variant(backend, imgsz, paths, iters, batch, queue):
+    """자식 프로세스: 로드 → 워밍업 → 측정 → 결과 dict를 queue로"""
+    try:
+        import cv2
+        frames = [cv2.imread(p) for p in paths]
+
+        rss_base, _ = _rss_mb()
+        t = time.perf_counter()
+        model = yolo_backend.load_model(backend, imgsz)
+        model(frames[0], verbose=False)         # 첫 호출 = 그래프 / 세션 초기화
+        load_s = time.perf_counter() - t
+        rss_loaded, _ = _rss_mb()
+
+        # 1장씩 (노드 정차 중 조기 종료 투표와 같은 호출 방식)
+        lat, tops = [], []
+        for i in range(iters):
+            f = frames[i % len(frames)]
+            t = time.perf_counter()
+            r = model(f, verbose=False)[0]
+            lat.append(time.perf_counter() - t)
+            if i < len(frames):
+                tops.append(_top(r, model.names))
+
+        # 배치 (yolo_multi_inference 방식)
+        chunk = [frames[i % len(frames)] for i in range(batch)]
+        rounds = max(iters // batch, 1)
+        t = time.perf_counter()
+        for _ in range(rounds):
+            model(chunk, verbose=False)
+        batch_fps = rounds * batch / (time.perf_counter() - t)
+
+        _, rss_peak = _rss_mb()
+        queue.put({
+            "load_s": round(load_s, 2),
+            **latency_summary(lat),
+            "fps": round(len(lat) / sum(lat), 1),
+            "batch_fps": round(batch_fps, 1),
+            "rss_mb": round(rss_loaded - rss_base, 1),
+            "peak_mb": round(rss_peak, 1),
+            "tops": tops,
+        })
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def bench_variant(backend, imgsz, paths, iters, batch, int8_data):
+    ctx = mp.get_context("spawn")
+    if backend != "pytorch":
+        # export는 부모 프로세스에서 (자식의 로드 시간 / 메모리에 섞이지 않게)
+        try:
+            yolo_backend.export(backend, imgsz, data=int8_data)
+        except Exception as e:
+            return {"error": f"export: {type(e).__name__}: {e}"}
+
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_variant, args=(backend, imgsz, paths, iters, batch, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def _agreement(tops, base):
+    """PyTorch(같은 imgsz) 기준: 클래스 일치율, confidence 평균 차이"""
+    if not tops or not base:
+        return None, None
+    same = [a[0] == b[0] for a, b in zip(tops, base)]
+    diff = [abs(a[1] - b[1]) for a, b in zip(tops, base)]
+    return round(float(np.mean(same)), 3), round(float(np.mean(diff)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(yolo_backend.BACKENDS))
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[320, 480, 640])
+    parser.add_argument("--images", help="이미지 폴더 (기본: 이 폴더의 *.jpg)")
+    parser.add_argument("--iters", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=5)
+    parser.add_argument("--int8-data", default=yolo_backend.YOLO_INT8_DATA,
+                        help="INT8 보정 데이터셋 yaml")
+    args = parser.parse_args()
+
+    folder = args.images or BASE_DIR
+    paths = sorted(glob.glob(os.path.join(os.path.expanduser(folder), "*.jpg")))
+    if not paths:
+        raise SystemExit(f"no images in {folder}")
+    print(f"images: {len(paths)}, iters: {args.iters}, batch: {args.batch}")
+
+    rows = []
+    for imgsz in args.imgsz:
+        base = None
+        # 기준(pytorch)을 먼저 돌려서 일치율 비교
+        for backend in sorted(args.backends, key=lambda b: b != "pytorch"):
+            print(f"--- {backend} imgsz={imgsz}")
+            r = bench_variant(backend, imgsz, paths, args.iters, args.batch, args.int8_data)
+            if "error" in r:
+                print(f"    skipped: {r['error']}")
+                continue
+            if backend == "pytorch":
+                base = r["tops"]
+            r["agree"], r["conf_diff"] = _agreement(r["tops"], base)
+            rows.append((backend, imgsz, r))
+
+    print()
+    print(f"{'backend':14} {'imgsz':>5} {'load s':>7} {'mean ms':>8} {'p95 ms':>7} {'fps':>6} "
+          f"{'batch fps':>9} {'RSS MB':>7} {'peak MB':>8} {'agree':>6} {'Δconf':>6}")
+    for backend, imgsz, r in rows:
+        print(f"{backend:14} {imgsz:>5} {r['load_s']:>7} {r['mean_ms']:>8} {r['p95_ms']:>7} {r['fps']:>6} "
+              f"{r['batch_fps']:>9} {r['rss_mb']:>7} {r['peak_mb']:>8} "
+              f"{str(r['agree']):>6} {str(r['conf_diff']):>6}")
+
+
+if __name__ == "__main__":
+    main()
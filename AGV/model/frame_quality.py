@@ -0,0 +1,71 @@
+# frame_quality.py
+# 프레임 품질 점수: 선명도(Laplacian 분산) + 노출(히스토그램 양끝 클리핑)
+# 투표 중 캡처한 프레임 N장을 한 번에 (N, h, w) 배열로 계산 → 가장 좋은 프레임 선택
+import cv2
+import numpy as np
+
+QUALITY_WIDTH = 160         # 점수 계산용 축소 폭 (선명도 비교에는 충분)
+CLIP_LOW = 8                # 이하 = 검게 뭉개진 픽셀
+CLIP_HIGH = 247             # 이상 = 하얗게 날아간 픽셀
+MAX_CLIPPED = 0.25          # 클리핑 픽셀 비율 상한 (넘으면 노출 불량)
+MIN_SHARPNESS = 20.0        # Laplacian 분산 하한 (넘지 못하면 흔들림)
+
+
+def _gray_stack(frames):
+    h, w = frames[0].shape[:2]
+    size = (QUALITY_WIDTH, max(int(h * QUALITY_WIDTH / w), 1))
+    out = np.empty((len(frames), size[1], size[0]), np.float32)
+    for i, f in enumerate(frames):
+        small = cv2.resize(f, size, interpolation=cv2.INTER_AREA)
+        out[i] = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return out
+
+
+def score_frames(frames):
+    """
+    frames: BGR 프레임 리스트 (같은 크기)
+    반환: 프레임별 dict 리스트 {sharpness, clipped, brightness, acceptable, score}
+    """
+    if not frames:
+        return []
+
+    g = _gray_stack(frames)
+
+    # 4-이웃 Laplacian을 모든 프레임에 한 번에
+    lap = (
+        4 * g[:, 1:-1, 1:-1]
+        - g[:, :-2, 1:-1] - g[:, 2:, 1:-1]
+        - g[:, 1:-1, :-2] - g[:, 1:-1, 2:]
+    )
+    sharpness = lap.var(axis=(1, 2))
+    clipped = ((g <= CLIP_LOW) | (g >= CLIP_HIGH)).mean(axis=(1, 2))
+    brightness = g.mean(axis=(1, 2))
+
+    acceptable = (clipped <= MAX_CLIPPED) & (sharpness >= MIN_SHARPNESS)
+    score = sharpness * (1.0 - clipped)
+
+    return [
+        {
+            "sharpness": round(float(sharpness[i]), 1),
+            "clipped": round(float(clipped[i]), 3),
+            "brightness": round(float(brightness[i]), 1),
+            "acceptable": bool(acceptable[i]),
+            "score": round(float(score[i]), 1),
+        }
+        for i in range(len(frames))
+    ]
+
+
+def select_best(frames, candidates=None):
+    """
+    가장 좋은 프레임 (index, quality). 합격 프레임 중 점수 최고,
+    합격이 없으면 전체 중 점수 최고. candidates가 있으면 그 index 중에서만
+    """
+    if not frames:
+        return None, None
+
+    qualities = score_frames(frames)
+    pool = list(candidates) if candidates else list(range(len(frames)))
+    good = [i for i in pool if qualities[i]["acceptable"]] or pool
+    best = max(good, key=lambda i: qualities[i]["score"])
+    return best, qualities[best]
@@ -1,32 +1,157 @@
 import cv2
 import time
-import json
-import requests
 import numpy as np
 from datetime import datetime
-from ultralytics import YOLO
-import os
+from frame_quality import select_best
+from uploader import SpoolUploader
+from node_index import NodeIndex
+from yolo_backend import load_model
 
 # -----------------------------
 # 서버 설정
 # -----------------------------
 SERVER_URL = "http://서버IP:8000/agv/upload_observation"
+UPLOAD_JPEG_QUALITY = 90
+
+model = None
+cap = None
+uploader = None
+node_index = None
 
 # -----------------------------
-# YOLO 모델 로드
+# 다수결 + 평균 confidence
 # -----------------------------
-model = YOLO("best.pt")
+def vote(names, confs):
+    if not names:
+        return "unknown", 0.0
+
+    final_class = max(set(names), key=names.count)
+    final_conf = float(np.mean([c for c, n in zip(confs, names) if n == final_class]))
+    return final_class, round(final_conf, 3)
+
+
+def _observation(frames, tops):
+    """
+    투표 결과 + 업로드할 프레임 선택
+    tops: 프레임별 (클래스명, conf) 또는 None
+    → 다수 클래스로 검출된 프레임 중 가장 선명하고 노출이 좋은 프레임
+    """
+    names = [t[0] for t in tops if t is not None]
+    confs = [t[1] for t in tops if t is not None]
+    final_class, final_conf = vote(names, confs)
+
+    agreeing = [i for i, t in enumerate(tops) if t is not None and t[0] == final_class]
+    best, quality = select_best(frames, agreeing)
+
+    return {
+        "frame": frames[best] if best is not None else None,
+        "result": final_class,
+        "confidence": final_conf,
+        "frames_used": len(frames),
+        "quality": quality,
+    }
+
+
+def _top_box(result, names_map):
+    """결과 1개에서 첫 번째 박스의 (클래스명, conf). 박스 없으면 None"""
+    boxes = result.boxes
+    if len(boxes) == 0:
+        return None
+    box = boxes[0]
+    return names_map[int(box.cls[0])], float(box.conf[0])
+
 
 # -----------------------------
-# 카메라 초기화
+# 프레임 N장 연속 캡처
 # -----------------------------
-cap = cv2.VideoCapture(0)
-time.sleep(1)
+def capture_frames(N, cap=None):
+    cap = cap or globals()["cap"]
+    frames = []
+    for _ in range(N):
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    return frames
+
+
+# -----------------------------
+# YOLO N회 실행 (배치 1번)
+# -----------------------------
+def yolo_multi_inference(N=5, cap=None, model=None):
+    """
+    N장을 연달아 캡처 → YOLO 배치 호출 1번 → 다수결 / 평균 confidence
+    반환: {"frame", "result", "confidence", "frames_used", "quality"}
+    """
+    model = model or globals()["model"]
+    frames = capture_frames(N, cap)
+    if not frames:
+        return _observation([], [])
+
+    tops = [_top_box(r, model.names) for r in model(frames, verbose=False)]
+    return _observation(frames, tops)
+
+
+# -----------------------------
+# 조기 종료 투표: 확신이 서면 바로 종료
+# -----------------------------
+VOTE_MAX_FRAMES = 10        # 프레임 예산
+VOTE_MIN_AGREE = 2          # 다수 클래스 최소 표 수
+VOTE_CONF = 0.80            # 다수 클래스 평균 confidence 기준
+VOTE_AGREEMENT = 0.75       # 검출된 프레임 중 다수 클래스 비율
+VOTE_SINGLE_CONF = 0.95     # 첫 프레임이 이 이상이면 1장으로 종료
+
+
+def _confident(names, confs):
+    final_class, final_conf = vote(names, confs)
+    count = names.count(final_class)
+
+    if len(names) == 1 and final_conf >= VOTE_SINGLE_CONF:
+        return True
+    return (
+        count >= VOTE_MIN_AGREE
+        and final_conf >= VOTE_CONF
+        and count / len(names) >= VOTE_AGREEMENT
+    )
+
+
+def yolo_vote_inference(max_frames=VOTE_MAX_FRAMES, cap=None, model=None):
+    """
+    1장씩 캡처 → 추론 → 투표. 기준을 만족하거나 프레임 예산을 다 쓰면 종료
+    반환: {"frame", "result", "confidence", "frames_used", "quality"}
+    """
+    cap = cap or globals()["cap"]
+    model = model or globals()["model"]
+    frames, tops = [], []
+    confs, names = [], []
+    attempts = 0
+
+    while attempts < max_frames:
+        ret, frame = cap.read()
+        attempts += 1
+        if not ret:
+            continue
+
+        top = _top_box(model(frame, verbose=False)[0], model.names)
+        frames.append(frame)
+        tops.append(top)
+        if top is None:
+            continue
+
+        names.append(top[0])
+        confs.append(top[1])
+        if _confident(names, confs):
+            break
+
+    return _observation(frames, tops)
+
 
 # -----------------------------
-# YOLO N회 실행
+# (이전 방식) 1장씩 캡처 → 추론 → 검출 시 0.2초 대기
+# 벤치마크 비교용
 # -----------------------------
-def yolo_multi_inference(N=5):
+def yolo_multi_inference_sequential(N=5, cap=None, model=None):
+    cap = cap or globals()["cap"]
+    model = model or globals()["model"]
     confs, names = [], []
     last_frame = None
 
@@ -36,92 +161,115 @@ def yolo_multi_inference(N=5):
             continue
 
         last_frame = frame
-        results = model(frame)
-        boxes = results[0].boxes
-
-        if len(boxes) == 0:
+        top = _top_box(model(frame, verbose=False)[0], model.names)
+        if top is None:
             continue
 
-        box = boxes[0]
-        cls_name = model.names[int(box.cls[0])]
-        conf = float(box.conf[0])
-
-        names.append(cls_name)
-        confs.append(conf)
+        names.append(top[0])
+        confs.append(top[1])
         time.sleep(0.2)
 
-    if not names:
-        return last_frame, "unknown", 0.0
+    final_class, final_conf = vote(names, confs)
+    return last_frame, final_class, final_conf
 
-    final_class = max(set(names), key=names.count)
-    final_conf = float(np.mean([c for c, n in zip(confs, names) if n == final_class]))
-    return last_frame, final_class, round(final_conf, 3)
 
 # -----------------------------
-# 정찰 사이클 시작
+# 정찰 사이클
 # -----------------------------
-nodes = ["green", "purple", "blue", "orange"]
-cycle_id = datetime.now().strftime("%Y_%m_%d_%H%M")
-agv_id = "AGV1"
-timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+VOTE_MODE = "early_exit"    # "early_exit" | "batch"
+BATCH_FRAMES = 5
 
-observations = []
-image_files = []
 
-os.makedirs("images", exist_ok=True)
+def run_cycle(nodes):
+    """
+    노드마다 관찰 → JPEG 메모리 인코딩 → 업로더 스풀에 바로 추가
+    지난번과 이미지(dHash) + YOLO 결과가 같은 노드는 이미지 없이 unchanged_since만
+    전송은 업로더 스레드가 사이클 종료 후 백그라운드로 (여기서는 네트워크 대기 없음)
+    """
+    cycle_id = datetime.now().strftime("%Y_%m_%d_%H%M")
+    agv_id = "AGV1"
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-print(f"[AGV] Cycle {cycle_id} 시작")
+    cycle_id = uploader.open_cycle(cycle_id, agv_id, timestamp)
+    print(f"[AGV] Cycle {cycle_id} 시작")
 
-for node in nodes:
-    print(f"[AGV] {node} 도착")
+    for node in nodes:
+        print(f"[AGV] {node} 도착")
 
-    frame, result, conf = yolo_multi_inference()
+        if VOTE_MODE == "early_exit":
+            obs = yolo_vote_inference()
+        else:
+            obs = yolo_multi_inference(BATCH_FRAMES)
+        print(f"[AGV] {node}: {obs['result']} ({obs['confidence']}), "
+              f"frames={obs['frames_used']}, quality={obs['quality']}")
 
-    # 🔹 이미지 저장 (node 이름으로!)
-    img_path = f"images/{node}.jpg"
-    cv2.imwrite(img_path, frame)
+        if obs["frame"] is None:
+            print(f"[AGV] {node}: 캡처 실패 → 건너뜀")
+            continue
 
-    observations.append({
-        "node": node,
-        "image_url": "",
-        "yolo": {
-            "result": result,
-            "confidence": conf
+        observation = {
+            "node": node,
+            "image_url": "",
+            "yolo": {
+                "result": obs["result"],
+                "confidence": obs["confidence"],
+                "frames_used": obs["frames_used"]
+            },
+            "quality": obs["quality"]
         }
-    })
 
-    image_files.append(
-        ("images", (f"{node}.jpg", open(img_path, "rb"), "image/jpeg"))
-    )
+        h, since = node_index.check(node, obs["frame"], obs["result"])
+        if since is not None:
+            print(f"[AGV] {node}: {since} 이후 변화 없음 → 이미지 생략")
+            observation["unchanged_since"] = since
+            uploader.add(cycle_id, observation, None)
+            node_index.skipped(node)
+            continue
 
-print("[AGV] 한 바퀴 완료 → 서버 전송")
+        # 🔹 가장 선명한 프레임 → 메모리에서 JPEG 인코딩 (파일 저장/재오픈 없음)
+        ok, jpeg = cv2.imencode(".jpg", obs["frame"], [cv2.IMWRITE_JPEG_QUALITY, UPLOAD_JPEG_QUALITY])
+        if not ok:
+            print(f"[AGV] {node}: JPEG 인코딩 실패 → 건너뜀")
+            continue
 
-# -----------------------------
-# 서버로 보낼 payload (JSON 문자열)
-# -----------------------------
-payload = {
-    "cycle_id": cycle_id,
-    "agv_id": agv_id,
-    "timestamp": timestamp,
-    "observations": observations
-}
+        uploader.add(cycle_id, observation, jpeg)
+        node_index.uploaded(node, h, obs["result"], cycle_id)
 
-data = {
-    "payload": json.dumps(payload, ensure_ascii=False)
-}
+    uploader.close_cycle(cycle_id)
+    print("[AGV] 한 바퀴 완료 → 업로드 대기열에 추가")
+    return cycle_id
 
-# -----------------------------
-# POST 전송 (JSON + 이미지 같이)
-# -----------------------------
-response = requests.post(
-    SERVER_URL,
-    data=data,
-    files=image_files,
-    timeout=30
-)
-
-print("[서버 응답]", response.status_code)
-print(response.text)
-
-cap.release()
-cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    # -----------------------------
+    # YOLO 모델 로드 (YOLO_BACKEND / YOLO_IMGSZ 로 백엔드 선택)
+    # -----------------------------
+    model = load_model()
+
+    # -----------------------------
+    # 카메라 초기화
+    # -----------------------------
+    cap = cv2.VideoCapture(0)
+    time.sleep(1)
+
+    # -----------------------------
+    # 업로더 시작 (스풀에 남은 이전 사이클도 재전송)
+    # -----------------------------
+    node_index = NodeIndex()
+    uploader = SpoolUploader(SERVER_URL)
+    uploader.on_rejected = node_index.forget_cycle
+    uploader.start()
+
+    # -----------------------------
+    # 정찰 사이클 시작
+    # -----------------------------
+    nodes = ["green", "purple", "blue", "orange"]
+    run_cycle(nodes)
+
+    cap.release()
+    cv2.destroyAllWindows()
+
+    # 스크립트 종료 전 전송 마무리 (실패해도 스풀에 남아 다음 실행 때 재전송)
+    if not uploader.flush(timeout=60):
+        print(f"[AGV] 전송 미완료: {uploader.last_error} (스풀에 보관)")
+    uploader.stop()
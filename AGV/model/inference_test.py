@@ -1,7 +1,7 @@
 import json
 import requests
 from datetime import datetime
-from ultralytics import YOLO
+from yolo_backend import load_model
 import os
 
 # -----------------------------
@@ -17,9 +17,9 @@ SERVER_URL = "http://172.20.10.6:8888/agv/upload_observation"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # -----------------------------
-# YOLO 모델 로드
+# YOLO 모델 로드 (YOLO_BACKEND / YOLO_IMGSZ 로 백엔드 선택)
 # -----------------------------
-model = YOLO(os.path.join(BASE_DIR, "best.pt"))
+model = load_model()
 
 # -----------------------------
 # 테스트 이미지 목록
@@ -0,0 +1,89 @@
+# node_index.py
+# 노드별 마지막 업로드 이미지의 perceptual hash(dHash) + YOLO 결과 로컬 인덱스
+#   이번 프레임 hash가 지난번과 거의 같고 YOLO 결과도 같으면 → 이미지 대신
+#   "unchanged_since: <cycle_id>" 관찰만 보냄 (서버가 이전 분석 재사용)
+#   오래 안 바뀌어도 MAX_UNCHANGED 사이클마다 한 번은 전체 업로드 (천천히 변하는 변화 누적 방지)
+import json
+import os
+import threading
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.environ.get("AGV_NODE_INDEX", os.path.join(BASE_DIR, "node_index.json"))
+
+HASH_SIZE = 8           # dHash 8x8 = 64bit
+HASH_THRESHOLD = 6      # 해밍 거리 이하면 "같은 이미지"
+MAX_UNCHANGED = 6       # 연속 생략 최대 사이클 수
+
+
+def dhash(frame, size=HASH_SIZE):
+    """BGR 프레임 → 64bit 정수. 옆 픽셀보다 밝은지 비교라 전체 밝기 변화에 강함"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    # int.bit_count()는 Python 3.10+ (Jetson Nano JetPack은 3.6~3.8)
+    return bin(a ^ b).count("1")
+
+
+class NodeIndex:
+    def __init__(self, path=INDEX_PATH, threshold=HASH_THRESHOLD, max_unchanged=MAX_UNCHANGED):
+        self.path = path
+        self.threshold = threshold
+        self.max_unchanged = max_unchanged
+        self._lock = threading.Lock()
+        self._nodes = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._nodes = json.load(f)
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._nodes, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def check(self, node, frame, result):
+        """
+        반환: (hash, 재사용할 cycle_id 또는 None)
+        None이면 이미지를 새로 올려야 함
+        """
+        h = dhash(frame)
+        with self._lock:
+            prev = self._nodes.get(node)
+        if prev is None or prev["result"] != result:
+            return h, None
+        if prev["skipped"] >= self.max_unchanged:
+            return h, None
+        if hamming(h, int(prev["hash"], 16)) > self.threshold:
+            return h, None
+        return h, prev["cycle_id"]
+
+    def uploaded(self, node, h, result, cycle_id):
+        """이미지를 새로 올린 노드 기록"""
+        with self._lock:
+            self._nodes[node] = {
+                "hash": f"{h:016x}",
+                "result": result,
+                "cycle_id": cycle_id,
+                "skipped": 0,
+            }
+            self._save()
+
+    def skipped(self, node):
+        with self._lock:
+            self._nodes[node]["skipped"] += 1
+            self._save()
+
+    def forget_cycle(self, cycle_id):
+        """서버가 거절한 사이클을 참조하는 노드는 다음에 다시 전체 업로드"""
+        with self._lock:
+            stale = [n for n, v in self._nodes.items() if v["cycle_id"] == cycle_id]
+            for n in stale:
+                del self._nodes[n]
+            if stale:
+                self._save()
@@ -0,0 +1,233 @@
+# uploader.py
+# 관찰 결과 백그라운드 업로더
+#   노드마다: JPEG(메모리 인코딩) + 관찰 JSON → 디스크 스풀에 바로 기록 (원자적 rename)
+#   사이클 종료: 스풀 디렉터리에 ready 표시 → 업로드 스레드가 전송 (주행은 계속)
+#   전송 실패(Wi-Fi 끊김 등): 지수 백오프로 재시도. 재시작해도 스풀에 남은 사이클부터 다시 전송
+#
+# 스풀 구조
+#   spool/<cycle_id>/meta.json          {cycle_id, agv_id, timestamp}
+#   spool/<cycle_id>/00_green.json      관찰 1건 (순서 = 파일명 앞 번호)
+#   spool/<cycle_id>/00_green.jpg       (unchanged_since 관찰은 이미지 없음)
+#   spool/<cycle_id>/ready              사이클 완료 표시 (이게 있어야 전송)
+#   spool/failed/<cycle_id>/            서버가 4xx로 거절했거나 스풀 파일이 깨진 사이클 (재시도 안 함)
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SPOOL_DIR = os.environ.get("AGV_SPOOL_DIR", os.path.join(BASE_DIR, "spool"))
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 60
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = 60.0
+
+
+def _write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SpoolUploader:
+    def __init__(self, url, spool_dir=SPOOL_DIR):
+        self.url = url
+        self.spool_dir = spool_dir
+        os.makedirs(spool_dir, exist_ok=True)
+
+        # 연결 재사용 (사이클마다 TCP/TLS 핸드셰이크 반복 안 함)
+        self.session = requests.Session()
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counts = {}           # cycle_id → 다음 관찰 번호
+        self._opened = set()        # 이 프로세스에서 연 cycle_id (전송이 끝나 스풀에서 지워진 것 포함)
+        self.on_rejected = None     # 서버가 거절한 cycle_id 콜백
+
+        self.sent = 0
+        self.failures = 0
+        self.last_error = None
+
+    # -----------------------------
+    # 생산자 (inference 쪽)
+    # -----------------------------
+    def _cycle_dir(self, cycle_id):
+        return os.path.join(self.spool_dir, cycle_id)
+
+    def open_cycle(self, cycle_id, agv_id, timestamp):
+        """
+        새 사이클 스풀 디렉터리 생성. 반환: 실제 cycle_id
+        같은 cycle_id가 이미 있으면 (분 단위 id → 같은 분에 두 번째 사이클) _2, _3 ... 을 붙임
+        → 전송 대기 / 전송 중인 스풀이나 서버의 이전 사이클을 덮어쓰지 않음
+        """
+        base, n = cycle_id, 1
+        while cycle_id in self._opened or os.path.exists(self._cycle_dir(cycle_id)):
+            n += 1
+            cycle_id = f"{base}_{n}"
+        self._opened.add(cycle_id)
+
+        d = self._cycle_dir(cycle_id)
+        os.makedirs(d)
+        meta = {"cycle_id": cycle_id, "agv_id": agv_id, "timestamp": timestamp}
+        _write_atomic(os.path.join(d, "meta.json"), json.dumps(meta, ensure_ascii=False).encode())
+        self._counts[cycle_id] = 0
+        return cycle_id
+
+    def add(self, cycle_id, observation, jpeg):
+        """노드 1개 관찰 + JPEG bytes(없으면 None) → 스풀. 네트워크 대기 없음"""
+        d = self._cycle_dir(cycle_id)
+        i = self._counts.get(cycle_id, 0)
+        self._counts[cycle_id] = i + 1
+
+        stem = os.path.join(d, f"{i:02d}_{observation['node']}")
+        if jpeg is not None:
+            _write_atomic(stem + ".jpg", bytes(jpeg))
+        _write_atomic(stem + ".json", json.dumps(observation, ensure_ascii=False).encode())
+
+    def close_cycle(self, cycle_id):
+        """사이클 완료 → 전송 대상으로 표시"""
+        _write_atomic(os.path.join(self._cycle_dir(cycle_id), "ready"), b"")
+        self._counts.pop(cycle_id, None)
+        self._wake.set()
+
+    # -----------------------------
+    # 업로드 스레드
+    # -----------------------------
+    def pending(self):
+        """전송 대기 중인 사이클 (오래된 순)"""
+        out = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if os.path.exists(os.path.join(self.spool_dir, name, "ready")):
+                out.append(name)
+        return out
+
+    def _load(self, cycle_id):
+        d = self._cycle_dir(cycle_id)
+        with open(os.path.join(d, "meta.json"), encoding="utf-8") as f:
+            payload = json.load(f)
+
+        observations, files = [], []
+        for name in sorted(os.listdir(d)):
+            if not name.endswith(".json") or name == "meta.json":
+                continue
+            stem = name[:-5]
+            with open(os.path.join(d, name), encoding="utf-8") as f:
+                obs = json.load(f)
+            observations.append(obs)
+
+            # 이미지 순서 = 이미지가 있는 관찰 순서 (서버가 같은 순서로 매칭)
+            jpg = os.path.join(d, stem + ".jpg")
+            if os.path.exists(jpg):
+                with open(jpg, "rb") as f:
+                    files.append(("images", (f"{obs['node']}.jpg", f.read(), "image/jpeg")))
+
+        payload["observations"] = observations
+        return payload, files
+
+    def _quarantine(self, cycle_id):
+        """다시 보내도 안 될 사이클 → failed/로 옮기고 기준 cycle에서 빼도록 알림"""
+        failed = os.path.join(self.spool_dir, "failed")
+        os.makedirs(failed, exist_ok=True)
+        dst, n = os.path.join(failed, cycle_id), 1
+        while os.path.exists(dst):
+            n += 1
+            dst = os.path.join(failed, f"{cycle_id}.{n}")
+        shutil.move(self._cycle_dir(cycle_id), dst)
+        if self.on_rejected is not None:
+            self.on_rejected(cycle_id)
+
+    def _send(self, cycle_id):
+        """True: 처리 끝 (성공 또는 영구 실패), False: 재시도 필요"""
+        try:
+            payload, files = self._load(cycle_id)
+        except (OSError, ValueError, KeyError) as e:
+            # 깨진 / 일부만 기록된 스풀 (JSON 오류, meta / 이미지 없음) → 재시도해도 같음
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[Uploader] {cycle_id} 스풀 손상: {self.last_error} → failed/로 이동")
+            self._quarantine(cycle_id)
+            return True
+
+        try:
+            response = self.session.post(
+                self.url,
+                data={"payload": json.dumps(payload, ensure_ascii=False)},
+                files=files,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            )
+        except requests.RequestException as e:
+            self.last_error = str(e)
+            return False
+
+        if response.ok:
+            print(f"[Uploader] {cycle_id} 전송 완료 ({response.status_code})")
+            shutil.rmtree(self._cycle_dir(cycle_id), ignore_errors=True)
+            self.sent += 1
+            return True
+
+        self.last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            # 다시 보내도 거절될 요청 → 따로 보관
+            print(f"[Uploader] {cycle_id} 거절됨: {self.last_error}")
+            self._quarantine(cycle_id)
+            return True
+        return False
+
+    def _run(self):
+        backoff = BACKOFF_MIN
+        while not self._stop.is_set():
+            cycles = self.pending()
+            if not cycles:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            try:
+                if self._send(cycles[0]):
+                    backoff = BACKOFF_MIN
+                    continue
+            except Exception as e:
+                # 예상 못 한 오류로 스레드가 죽으면 재시작 전까지 전송이 멈춤 → 기록하고 백오프 후 재시도
+                self.last_error = f"{type(e).__name__}: {e}"
+
+            self.failures += 1
+            delay = backoff * random.uniform(0.5, 1.0)
+            print(f"[Uploader] {cycles[0]} 전송 실패 ({self.last_error}) → {delay:.1f}s 후 재시도")
+            backoff = min(backoff * 2, BACKOFF_MAX)
+            # 새 사이클이 들어와도 백오프는 지킴, 종료 요청만 바로 반영
+            self._stop.wait(delay)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if self.pending():
+            print(f"[Uploader] 스풀에 남은 사이클 {len(self.pending())}개 재전송")
+        self._wake.set()
+
+    def flush(self, timeout=None):
+        """대기 중인 사이클이 모두 전송될 때까지 대기. 전송 완료면 True"""
+        deadline = None if timeout is None else time.time() + timeout
+        self._wake.set()
+        while self.pending():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.session.close()
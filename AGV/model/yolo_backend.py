@@ -0,0 +1,75 @@
+# yolo_backend.py
+# 작물 분류 YOLO(best.pt) 실행 백엔드 선택 / export
+#   YOLO_BACKEND=pytorch        best.pt 그대로 (기본)
+#   YOLO_BACKEND=onnx           best_<imgsz>.onnx              (onnxruntime CPU)
+#   YOLO_BACKEND=openvino       best_<imgsz>_openvino_model/   (Intel/ARM CPU)
+#   YOLO_BACKEND=openvino_int8  best_<imgsz>_int8_openvino_model/  (INT8 양자화, 보정 데이터 필요)
+#   YOLO_IMGSZ=320              입력 크기 (export된 모델은 이 크기로 고정)
+#
+# export 파일이 없으면 처음 로드할 때 만들어 둠 → bench_yolo_export.py로 어떤 조합이 빠른지 확인
+import os
+import shutil
+from ultralytics import YOLO
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEIGHTS = os.path.join(BASE_DIR, "best.pt")
+
+YOLO_BACKEND = os.getenv("YOLO_BACKEND", "pytorch")
+YOLO_IMGSZ = int(os.getenv("YOLO_IMGSZ", "640"))
+# INT8 보정용 데이터셋 yaml (ultralytics 형식). 없으면 int8 export 불가
+YOLO_INT8_DATA = os.getenv("YOLO_INT8_DATA", "")
+
+# 백엔드 이름 → (export 인자, 결과 파일 이름 규칙)
+# dynamic: 배치 크기 가변 (yolo_multi_inference의 N장 배치 호출용)
+BACKENDS = {
+    "pytorch": (None, None),
+    "onnx": ({"format": "onnx", "simplify": True, "dynamic": True}, "{stem}_{imgsz}.onnx"),
+    "openvino": ({"format": "openvino", "dynamic": True}, "{stem}_{imgsz}_openvino_model"),
+    "openvino_int8": ({"format": "openvino", "dynamic": True, "int8": True}, "{stem}_{imgsz}_int8_openvino_model"),
+}
+
+
+def exported_path(backend, imgsz, weights=WEIGHTS):
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown yolo backend: {backend} (choose from {list(BACKENDS)})")
+    _, pattern = BACKENDS[backend]
+    if pattern is None:
+        return weights
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(os.path.dirname(weights), pattern.format(stem=stem, imgsz=imgsz))
+
+
+def export(backend, imgsz, weights=WEIGHTS, data=None):
+    """best.pt → backend 형식으로 export. 결과 경로 반환 (이미 있으면 그대로)"""
+    target = exported_path(backend, imgsz, weights)
+    if os.path.exists(target):
+        return target
+
+    kwargs, _ = BACKENDS[backend]
+    kwargs = dict(kwargs, imgsz=imgsz)
+    if kwargs.get("int8"):
+        data = data or YOLO_INT8_DATA
+        if not data:
+            raise ValueError("int8 export needs a calibration dataset (YOLO_INT8_DATA or data=)")
+        kwargs["data"] = data
+
+    print(f"[YOLO] export {backend} imgsz={imgsz} ...")
+    # ultralytics는 best.onnx / best_openvino_model 처럼 imgsz 없이 저장 → 크기별 이름으로 옮김
+    out = YOLO(weights).export(**kwargs)
+    shutil.move(out, target)
+    return target
+
+
+def load_model(backend=None, imgsz=None, weights=WEIGHTS):
+    """
+    설정한 백엔드로 YOLO 로드. 호출하는 쪽은 model(frames) 그대로 사용
+    (입력 크기는 overrides로 고정 → export된 크기와 항상 일치)
+    """
+    backend = backend or YOLO_BACKEND
+    imgsz = imgsz or YOLO_IMGSZ
+
+    path = weights if backend == "pytorch" else export(backend, imgsz, weights)
+    model = YOLO(path, task="detect")
+    model.overrides["imgsz"] = imgsz
+    print(f"[YOLO] backend: {backend}, imgsz={imgsz} ({os.path.basename(path)})")
+    return model
@@ -1,13 +1,13 @@
 # motor_controller.py
-from jetbot import Robot
+from hardware import get_motors
 
-robot = Robot()
-
-def drive(steering, speed):
+def wheel_speeds(steering, speed):
     left = max(min(speed + steering, 1.0), 0.0)
     right = max(min(speed - steering, 1.0), 0.0)
-    robot.left_motor.value = left
-    robot.right_motor.value = right
+    return left, right
+
+def drive(steering, speed, frame_seq=0):
+    get_motors().set(*wheel_speeds(steering, speed), frame_seq=frame_seq)
 
 def stop():
-    robot.stop()
+    get_motors().stop()
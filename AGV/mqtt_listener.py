@@ -1,11 +1,12 @@
 # mqtt_listener.py
 import json
-import threading
 import paho.mqtt.client as mqtt
 
-from camera_manager import system_on, system_off
-from stream_server import run_stream_server
-from mission import start_mission, stop_mission
+import boot
+from command_executor import Command, CommandExecutor
+
+# camera_manager / stream_server / mission 은 무거운 import (cv2, flask / starlette, 조향 모델)
+# → MQTT 연결을 먼저 하기 위해 명령을 처리할 때 import (boot 워밍업 스레드가 미리 로드해 둠)
 
 AGV_ID = "AGV1"
 MQTT_HOST = "172.20.10.6"
@@ -13,67 +14,163 @@ MQTT_PORT = 1883
 
 RUN_TOPIC = f"agv/{AGV_ID}/run"   # ON / OFF
 CMD_TOPIC = f"agv/{AGV_ID}/cmd"   # START / PAUSE
-
-_stream_thread = None
+ZONE_TOPIC = f"agv/{AGV_ID}/zone_action"   # {"cycle_id", "commands": [{"zone", "action"}]}
+STATUS_TOPIC = f"agv/{AGV_ID}/status"   # booting / connected / ready / error / offline (retained)
 
 
 def on_connect(client, userdata, flags, rc):
     print("MQTT connected:", rc)
     client.subscribe(RUN_TOPIC)
     client.subscribe(CMD_TOPIC)
+    client.subscribe(ZONE_TOPIC)
 
+    if "connected" not in boot.timings:
+        boot.mark("connected")
+    boot.set_state("connected")
+    # 재연결 시에도 현재 상태 다시 보고
+    publish_status(client, boot.status())
+
+
+def publish_status(client, status):
+    client.publish(STATUS_TOPIC, json.dumps({"agv_id": AGV_ID, **status}), qos=1, retain=True)
+
+
+# ==========================
+# 명령 실행 (executor 스레드)
+# ==========================
+def _system_on():
+    from camera_manager import system_on
+    from stream_encoder import stream_server_module
+
+    print("[SYSTEM] ON")
+
+    # ✅ 카메라 초기화
+    system_on()
+
+    # ✅ 스트림 서버 시작 (이미 실행 중이면 무시)
+    stream_server_module().start_stream_server()
+
+
+def _system_off():
+    from camera_manager import system_off
+    from stream_encoder import stream_server_module
+    from mission import stop_mission
+    from zone_executor import cancel_zone_run
+
+    print("[SYSTEM] OFF")
+    cancel_zone_run()
+    stop_mission()
+    stream_server_module().stop_stream_server()
+    system_off()
+
+
+def _mission_start(cycle_id):
+    from mission import start_mission
+
+    print(f"[MISSION] START ({cycle_id})")
+    if not boot.is_ready():
+        # 모델 로드 전이면 추론 스레드가 로드를 기다림 (그동안 데드라인으로 모터 정지)
+        print(f"[MISSION] model not ready yet (state={boot.state})")
+    start_mission(cycle_id)
+
+
+def _mission_pause():
+    from mission import stop_mission
+    from zone_executor import cancel_zone_run
+
+    print("[MISSION] PAUSE")
+    cancel_zone_run()
+    stop_mission()
+    # ❗ system_off() 절대 호출하지 않음
 
-def on_message(client, userdata, msg):
-    global _stream_thread
-    data = json.loads(msg.payload.decode())
+
+def _zone_run(cycle_id, commands):
+    from zone_executor import start_zone_run
+
+    print(f"[ZONE] {len(commands)} commands ({cycle_id})")
+    start_zone_run(cycle_id, commands, AGV_ID)
+
+
+executor = CommandExecutor()
+
+
+def get_command_stats():
+    return executor.stats()
+
+
+# ==========================
+# paho 콜백: 파싱 / 검증만 하고 바로 반환
+# ==========================
+def parse_command(topic, payload):
+    """MQTT 메시지 → Command. 잘못된 메시지는 ValueError"""
+    data = json.loads(payload.decode())
+    if not isinstance(data, dict):
+        raise ValueError("payload must be a JSON object")
 
     # ==========================
     # SYSTEM ON / OFF
     # ==========================
-    if msg.topic == RUN_TOPIC:
+    if topic == RUN_TOPIC:
         running = data.get("running")
-
+        if not isinstance(running, bool):
+            raise ValueError(f"'running' must be true/false: {running!r}")
         if running:
-            print("[SYSTEM] ON")
-
-            # ✅ 카메라 초기화
-            system_on()
-
-            # ✅ 스트림 서버 시작 (1회)
-            if _stream_thread is None or not _stream_thread.is_alive():
-                _stream_thread = threading.Thread(
-                    target=run_stream_server,
-                    daemon=True
-                )
-                _stream_thread.start()
-                print("Stream server thread started")
-
-        else:
-            print("[SYSTEM] OFF")
-            stop_mission()
-            system_off()
+            return Command("system", "on", _system_on)
+        # OFF는 대기 중인 미션 명령도 의미 없음
+        return Command("system", "off", _system_off, supersedes=("mission", "zone"))
 
     # ==========================
     # MISSION COMMAND
     # ==========================
-    elif msg.topic == CMD_TOPIC:
+    if topic == CMD_TOPIC:
         cmd_type = data.get("type")
-
         if cmd_type == "start":
             cycle_id = data.get("cycle_id")
-            print(f"[MISSION] START ({cycle_id})")
-            start_mission(cycle_id)
+            if not cycle_id:
+                raise ValueError("start needs cycle_id")
+            return Command("mission", "start", _mission_start, cycle_id=cycle_id)
+        if cmd_type == "pause":
+            return Command("mission", "pause", _mission_pause)
+        raise ValueError(f"unknown mission command: {cmd_type!r}")
 
-        elif cmd_type == "pause":
-            print("[MISSION] PAUSE")
-            stop_mission()
-            # ❗ system_off() 절대 호출하지 않음
+    # ==========================
+    # ZONE ACTION
+    # ==========================
+    if topic == ZONE_TOPIC:
+        # 구역 결과 보고가 어떤 작업 목록(cycle)에서 나왔는지 연결 → cycle_id 필수
+        cycle_id = data.get("cycle_id")
+        if not isinstance(cycle_id, str) or not cycle_id:
+            raise ValueError("zone_action needs cycle_id")
+        commands = data.get("commands")
+        if not isinstance(commands, list) or not commands:
+            raise ValueError("'commands' must be a non-empty list")
+        for c in commands:
+            if not isinstance(c, dict) or not isinstance(c.get("zone"), str) \
+                    or not isinstance(c.get("action"), str):
+                raise ValueError(f"bad zone command: {c!r}")
+        return Command("zone", "run", _zone_run,
+                       cycle_id=cycle_id, commands=commands)
+
+    raise ValueError(f"unexpected topic: {topic}")
+
+
+def on_message(client, userdata, msg):
+    try:
+        cmd = parse_command(msg.topic, msg.payload)
+    except ValueError as e:
+        print(f"[CMD] ignored message on {msg.topic}: {e}")
+        return
+    executor.submit(cmd)
 
 
 def start_mqtt_loop():
     client = mqtt.Client()
     client.on_connect = on_connect
     client.on_message = on_message
+    # 비정상 종료 시 브로커가 대신 offline 발행
+    client.will_set(STATUS_TOPIC, json.dumps({"agv_id": AGV_ID, "state": "offline"}), qos=1, retain=True)
+    boot.add_state_listener(lambda status: publish_status(client, status))
 
+    executor.start()
     client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
     client.loop_forever()
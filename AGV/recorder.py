@@ -0,0 +1,158 @@
+# recorder.py
+# 카메라 프레임 + 모터/서보 명령을 타임스탬프와 함께 파일 1개에 기록 / mmap으로 읽기
+#
+# 파일 구조 (.agvrec)
+#   MAGIC(8) | meta 길이(u32) | meta JSON
+#   레코드 반복: kind(u8) pad(3) payload 길이(u32) ts(f64) | payload
+#     FRAME : h(u16) w(u16) c(u16) pad(2) seq(u64) | uint8 픽셀 (h*w*c)
+#     MOTOR : left(f32) right(f32) seq(u64)   seq = 이 명령을 계산한 프레임의 seq (0 = 프레임 없음)
+#     SERVO : id(i32) angle(f32) speed(f32) time(f32)
+#     STOP  : (없음)
+#   seq = camera_manager 프레임 슬롯 seq. 파이프라인에서는 모터 명령이 몇 프레임 뒤에 나오므로
+#         시각이 아니라 seq로 명령과 원본 프레임을 연결
+#   AGVREC01 (seq 없음) 파일도 읽을 수 있음 (seq = 0)
+# 추가 기록(append)만 하므로 녹화 중 전원이 나가도 앞부분은 그대로 읽을 수 있음
+import json
+import mmap
+import struct
+import threading
+import time
+import numpy as np
+
+MAGIC = b"AGVREC02"
+MAGIC_V1 = b"AGVREC01"
+
+FRAME = 1
+MOTOR = 2
+SERVO = 3
+STOP = 4
+
+_REC = struct.Struct("<B3xId")
+_FRAME_HDR = struct.Struct("<HHH2xQ")
+_MOTOR = struct.Struct("<ffQ")
+_FRAME_HDR_V1 = struct.Struct("<HHH2x")
+_MOTOR_V1 = struct.Struct("<ff")
+_SERVO = struct.Struct("<ifff")
+
+
+class Recorder:
+    """스레드 안전한 append-only 기록기"""
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = open(path, "wb")
+        self.frames = 0
+        self.events = 0
+
+        meta = dict(meta or {})
+        meta.setdefault("created", time.time())
+        meta_bytes = json.dumps(meta).encode()
+        self._f.write(MAGIC + struct.pack("<I", len(meta_bytes)) + meta_bytes)
+        print(f"[RECORD] start {path}")
+
+    def _write(self, kind, ts, payload, data=b""):
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(_REC.pack(kind, len(payload) + len(data), ts))
+            self._f.write(payload)
+            if data:
+                self._f.write(data)
+
+    def frame(self, frame, seq=0, ts=None):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        self._write(FRAME, ts or time.time(), _FRAME_HDR.pack(h, w, c, seq), memoryview(frame).cast("B"))
+        self.frames += 1
+
+    def motor(self, left, right, frame_seq=0, ts=None):
+        self._write(MOTOR, ts or time.time(), _MOTOR.pack(left, right, frame_seq))
+        self.events += 1
+
+    def servo(self, servo_id, angle, speed, duration, ts=None):
+        self._write(SERVO, ts or time.time(), _SERVO.pack(servo_id, angle, speed, duration))
+        self.events += 1
+
+    def stop(self, ts=None):
+        self._write(STOP, ts or time.time(), b"")
+        self.events += 1
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+        print(f"[RECORD] saved {self.path} (frames={self.frames}, events={self.events})")
+
+
+class Recording:
+    """
+    .agvrec 읽기 (mmap): 프레임은 복사 없이 파일 위 view로 반환
+      rec.frames     : [(ts, offset, (h, w, c)), ...]
+      rec.frame_seqs : 프레임별 seq (AGVREC01이면 전부 0)
+      rec.events     : [(ts, kind, values), ...]   (MOTOR: (left, right, frame_seq) / SERVO / STOP)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+
+        magic = bytes(self._buf[:8])
+        if magic not in (MAGIC, MAGIC_V1):
+            raise ValueError(f"not an AGV recording: {path}")
+        self.version = 2 if magic == MAGIC else 1
+        meta_len = struct.unpack_from("<I", self._buf, 8)[0]
+        self.meta = json.loads(bytes(self._buf[12:12 + meta_len]))
+
+        self.frames = []
+        self.frame_seqs = []
+        self.events = []
+        self._index(12 + meta_len)
+
+    def _index(self, pos):
+        size = len(self._buf)
+        frame_hdr, motor = (_FRAME_HDR, _MOTOR) if self.version == 2 else (_FRAME_HDR_V1, _MOTOR_V1)
+        while pos + _REC.size <= size:
+            kind, length, ts = _REC.unpack_from(self._buf, pos)
+            pos += _REC.size
+            if pos + length > size:
+                break   # 녹화 도중 끊긴 마지막 레코드
+
+            if kind == FRAME:
+                h, w, c, *seq = frame_hdr.unpack_from(self._buf, pos)
+                self.frames.append((ts, pos + frame_hdr.size, (h, w, c)))
+                self.frame_seqs.append(seq[0] if seq else 0)
+            elif kind == MOTOR:
+                left, right, *seq = motor.unpack_from(self._buf, pos)
+                self.events.append((ts, MOTOR, (left, right, seq[0] if seq else 0)))
+            elif kind == SERVO:
+                self.events.append((ts, SERVO, _SERVO.unpack_from(self._buf, pos)))
+            elif kind == STOP:
+                self.events.append((ts, STOP, ()))
+            pos += length
+
+    def frame(self, i):
+        """i번째 프레임 (ts, ndarray view — 읽기 전용)"""
+        ts, offset, (h, w, c) = self.frames[i]
+        arr = np.frombuffer(self._buf, np.uint8, count=h * w * c, offset=offset)
+        return ts, arr.reshape((h, w, c) if c > 1 else (h, w))
+
+    def motor_commands(self):
+        """(ts, left, right, frame_seq) 배열. STOP은 (0, 0, 0)"""
+        out = [
+            (ts, v[0], v[1], v[2]) if kind == MOTOR else (ts, 0.0, 0.0, 0)
+            for ts, kind, v in self.events if kind in (MOTOR, STOP)
+        ]
+        return np.array(out, np.float64).reshape(-1, 4)
+
+    def close(self):
+        try:
+            self._buf.release()
+            self._mm.close()
+        except BufferError:
+            pass    # 아직 사용 중인 프레임 view가 있으면 GC 때 해제
+        self._f.close()
@@ -0,0 +1,140 @@
+# replay.py
+# 녹화 파일(.agvrec) 재생 → 제어 파이프라인 지연 측정 / 회귀 확인 (로봇 없이 아무 리눅스 PC)
+#
+#   python replay.py rec/2025_12_17_1936.agvrec                # lockstep: 프레임마다 추론→제어, 최대 속도
+#   python replay.py rec/xxx.agvrec --pipeline --speed 4       # mission 스레드 파이프라인에 4배속으로 주입
+#
+# lockstep 모드는 결정적: 같은 녹화 + 같은 모델이면 항상 같은 모터 명령이 나옴
+#   → 녹화 당시 모터 명령과 비교해서 차이(회귀)를 출력
+import argparse
+import os
+import time
+import numpy as np
+
+# 실제 장치 대신 시뮬레이션 하드웨어 (import 전에 설정해야 함)
+os.environ.setdefault("AGV_HARDWARE", "sim")
+
+import hardware
+from latency_stats import latency_summary
+from recorder import Recording
+
+
+def replay_lockstep(path, limit=None):
+    """프레임을 하나씩 추론 → compute → 바퀴 속도. 대기 없이 최대 속도로"""
+    from steering_model import infer_xy
+    from line_follow import LineFollower
+    from motor_controller import wheel_speeds
+    import mission
+
+    rec = Recording(path)
+    gains = rec.meta.get("follower", mission.FOLLOWER_GAINS)
+    follower = LineFollower(**gains)
+
+    n = len(rec.frames) if limit is None else min(limit, len(rec.frames))
+    commands = np.zeros((n, 4))     # (frame ts, left, right, frame seq)
+    infer_t, control_t = [], []
+
+    t_start = time.perf_counter()
+    for i in range(n):
+        ts, frame = rec.frame(i)
+        t0 = time.perf_counter()
+        x, y = infer_xy(frame)
+        t1 = time.perf_counter()
+        left, right = wheel_speeds(*follower.compute(x, y))
+        t2 = time.perf_counter()
+
+        commands[i] = (ts, left, right, rec.frame_seqs[i])
+        infer_t.append(t1 - t0)
+        control_t.append(t2 - t1)
+    wall = time.perf_counter() - t_start
+
+    report = {
+        "frames": n,
+        "wall_s": round(wall, 3),
+        "replay_fps": round(n / wall, 1) if wall else None,
+        "infer": latency_summary(infer_t),
+        "control": latency_summary(control_t),
+    }
+
+    if n > 1:
+        rec_span = rec.frames[n - 1][0] - rec.frames[0][0]
+        report["realtime_factor"] = round(rec_span / wall, 2)
+
+    report["regression"] = _compare(commands, rec.motor_commands())
+    rec.close()
+    return report
+
+
+def _compare(replayed, recorded):
+    """
+    녹화 당시 모터 명령과 비교: 각 녹화 명령을 계산한 프레임(frame seq)의 재생 결과와 차이
+    (녹화에는 데드라인 정지 등 타이밍 의존 명령도 있으므로 STOP(0,0)은 제외)
+    seq가 없는 AGVREC01 녹화는 명령 시점 직전 프레임으로 대신 (파이프라인 지연만큼 어긋날 수 있음)
+    """
+    if len(replayed) == 0 or len(recorded) == 0:
+        return {}
+
+    recorded = recorded[(recorded[:, 1] != 0) | (recorded[:, 2] != 0)]
+    if len(recorded) == 0:
+        return {}
+
+    if replayed[:, 3].any():
+        # 프레임 seq는 녹화 순서대로 증가 → 정렬된 seq에서 위치 찾기
+        idx = np.searchsorted(replayed[:, 3], recorded[:, 3])
+        idx = np.minimum(idx, len(replayed) - 1)
+        valid = (recorded[:, 3] > 0) & (replayed[idx, 3] == recorded[:, 3])
+        joined_on = "frame_seq"
+    else:
+        idx = np.searchsorted(replayed[:, 0], recorded[:, 0], side="right") - 1
+        valid = idx >= 0
+        joined_on = "timestamp"
+    if not valid.any():
+        return {"compared": 0, "joined_on": joined_on}
+
+    diff = np.abs(replayed[idx[valid], 1:3] - recorded[valid, 1:3])
+    return {
+        "compared": int(valid.sum()),
+        "joined_on": joined_on,
+        "mean_abs_diff": round(float(diff.mean()), 4),
+        "max_abs_diff": round(float(diff.max()), 4),
+    }
+
+
+def replay_pipeline(path, speed=1.0):
+    """mission의 스레드 파이프라인 그대로 실행 (CSI 카메라 = 녹화 재생)"""
+    import camera_manager
+    import mission
+
+    hardware.AGV_HARDWARE = "replay"
+    hardware.AGV_REPLAY_FILE = path
+    hardware.AGV_REPLAY_SPEED = speed
+
+    mission.start_mission(f"replay_{os.path.splitext(os.path.basename(path))[0]}")
+    camera_manager._camera.done.wait()
+    time.sleep(mission.DEADLINE_S)
+    report = mission.stop_mission()
+    camera_manager.system_off()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="mission 스레드 파이프라인으로 재생 (기본: lockstep)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="--pipeline 재생 배속 (0 이하: 대기 없이)")
+    parser.add_argument("--limit", type=int, help="lockstep: 앞에서부터 N 프레임만")
+    args = parser.parse_args()
+
+    if args.pipeline:
+        report = replay_pipeline(args.path, args.speed)
+    else:
+        report = replay_lockstep(args.path, args.limit)
+
+    for k, v in report.items():
+        print(f"{k:18} {v}")
+
+
+if __name__ == "__main__":
+    main()
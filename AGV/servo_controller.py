@@ -1,11 +1,11 @@
 # servo_controller.py
-from SCSCtrl import TTLServo
+from hardware import get_servo
 
 LINE_FOLLOW_SERVO_ID = 5
 LINE_FOLLOW_ANGLE = -50
 
 def set_line_follow_pose():
-    TTLServo.servoAngleCtrl(
+    get_servo().angle(
         LINE_FOLLOW_SERVO_ID,
         LINE_FOLLOW_ANGLE,
         1,      # speed
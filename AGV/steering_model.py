@@ -1,27 +1,327 @@
 # steering_model.py
-import torch
-import torchvision
-import torchvision.transforms as transforms
-import PIL.Image
+# ResNet18 x/y 회귀 모델 추론 백엔드
+#   cuda_fp16 : PyTorch CUDA half (Jetson 기본)
+#   torch_cpu : PyTorch CPU fp32 (개발 PC / CI)
+#   onnx_cpu  : ONNX Runtime CPU
+#   auto      : CUDA 있으면 cuda_fp16, 없으면 torch_cpu
+# import 시점에는 아무것도 로드하지 않음 → 첫 infer_xy() 또는 get_backend()에서 로드
+import os
+import threading
+import time
 import numpy as np
 
-device = torch.device('cuda')
+STEERING_MODEL_PATH = os.getenv("STEERING_MODEL_PATH", "best_steering_model_xy_test.pth")
+STEERING_BACKEND = os.getenv("STEERING_BACKEND", "auto")
 
-model = torchvision.models.resnet18(pretrained=False)
-model.fc = torch.nn.Linear(512, 2)
-model.load_state_dict(torch.load('best_steering_model_xy_test.pth'))
-model = model.to(device).eval().half()
+# 전처리 옵션: ROI "y0,y1,x0,x1" / 입력 크기 "h,w" (비우면 프레임 그대로)
+STEERING_ROI = os.getenv("STEERING_ROI", "")
+STEERING_INPUT_SIZE = os.getenv("STEERING_INPUT_SIZE", "")
+# 1이면 CUDA 단계 타이밍을 synchronize로 정확히 측정 (약간 느려짐)
+STEERING_PROFILE = os.getenv("STEERING_PROFILE", "0") == "1"
 
-mean = torch.Tensor([0.485, 0.456, 0.406]).cuda().half()
-std = torch.Tensor([0.229, 0.224, 0.225]).cuda().half()
+MEAN = np.array([0.485, 0.456, 0.406], np.float32)
+STD = np.array([0.229, 0.224, 0.225], np.float32)
+
+
+def _parse_ints(text):
+    return tuple(int(v) for v in text.split(",")) if text else None
+
+
+def _build_torch_model(map_location):
+    import torch
+    import torchvision
+
+    model = torchvision.models.resnet18(pretrained=False)
+    model.fc = torch.nn.Linear(512, 2)
+    model.load_state_dict(torch.load(STEERING_MODEL_PATH, map_location=map_location))
+    return model.eval()
+
+
+class StageTimings:
+    """단계별 처리 시간 (ms, EWMA + 마지막 값)"""
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.last = {}
+        self.avg = {}
+
+    def add(self, stage, seconds):
+        ms = seconds * 1000
+        self.last[stage] = ms
+        prev = self.avg.get(stage)
+        self.avg[stage] = ms if prev is None else prev + self.alpha * (ms - prev)
+
+    def report(self):
+        return {k: round(v, 3) for k, v in self.avg.items()}
+
+
+class FramePreprocessor:
+    """
+    uint8 HWC 카메라 프레임 → 정규화된 float32 NCHW 를 한 번에.
+    - ROI 크롭은 view (복사 없음), 리사이즈는 미리 할당한 버퍼로 직접
+    - 3채널 LUT (256개: (v/255 - mean)/std) 를 cv2.LUT로 미리 할당한 float32 HWC 버퍼에 적용
+      (형변환 + 정규화 1번) → HWC→CHW 는 출력 버퍼로 복사. 프레임마다 새 배열 할당 없음
+    """
+
+    def __init__(self, roi=None, size=None):
+        self.roi = roi      # (y0, y1, x0, x1)
+        self.size = size    # (h, w)
+        self.lut = (
+            (np.arange(256, dtype=np.float32)[None, :] / 255.0 - MEAN[:, None])
+            / STD[:, None]
+        ).astype(np.float32)
+        # cv2.LUT용 (1, 256, 3): 채널 c의 값 v → lut[c, v]
+        self._lut_hwc = np.ascontiguousarray(self.lut.T.reshape(1, 256, 3))
+        self._resized = None
+        self._normalized = None
+
+    def output_hw(self, frame_shape):
+        if self.size is not None:
+            return self.size
+        if self.roi is not None:
+            y0, y1, x0, x1 = self.roi
+            return (y1 - y0, x1 - x0)
+        return frame_shape[:2]
+
+    def crop_resize(self, frame, out=None):
+        """ROI + 리사이즈 결과 uint8 HWC (out이 있으면 거기에 기록)"""
+        import cv2
+
+        if self.roi is not None:
+            y0, y1, x0, x1 = self.roi
+            frame = frame[y0:y1, x0:x1]
+
+        if self.size is not None and frame.shape[:2] != self.size:
+            h, w = self.size
+            if out is None:
+                if self._resized is None or self._resized.shape[:2] != (h, w):
+                    self._resized = np.empty((h, w, 3), np.uint8)
+                out = self._resized
+            cv2.resize(frame, (w, h), dst=out, interpolation=cv2.INTER_AREA)
+            return out
+
+        if out is not None:
+            out[...] = frame
+            return out
+        return frame
+
+    def normalize_into(self, src, out):
+        """uint8 HWC src → out[0] (float32 CHW) : cv2.LUT 1회 + CHW 복사 (임시 배열 없음)"""
+        import cv2
+
+        if self._normalized is None or self._normalized.shape != src.shape:
+            self._normalized = np.empty(src.shape, np.float32)
+        cv2.LUT(src, self._lut_hwc, dst=self._normalized)
+        np.copyto(out[0], self._normalized.transpose(2, 0, 1))
+        return out
+
+
+class SteeringBackend:
+    """
+    공통 인터페이스: infer(frame) -> (x, y)
+    frame: uint8 HWC (카메라 프레임). 입력 버퍼는 입력 크기별로 1번만 할당
+    timings: 단계별 처리 시간 (preprocess / upload / infer ...)
+    """
+
+    name = "base"
+
+    def __init__(self, roi=None, size=None):
+        self.prep = FramePreprocessor(roi, size)
+        self.timings = StageTimings()
+        self._shape = None
+
+    def _ensure_buffers(self, frame_shape):
+        hw = self.prep.output_hw(frame_shape)
+        if hw != self._shape:
+            self._alloc(hw)
+            self._shape = hw
+
+    def _alloc(self, hw):
+        raise NotImplementedError
+
+    def infer(self, frame):
+        raise NotImplementedError
+
+
+class _NumpyInputMixin:
+    """CPU 백엔드 공용: float32 NCHW 입력 버퍼 재사용"""
+
+    def _alloc(self, hw):
+        self._input = np.empty((1, 3) + tuple(hw), np.float32)
+
+    def _preprocess(self, frame):
+        t0 = time.perf_counter()
+        self._ensure_buffers(frame.shape)
+        src = self.prep.crop_resize(frame)
+        t1 = time.perf_counter()
+        self.prep.normalize_into(src, self._input)
+        t2 = time.perf_counter()
+        self.timings.add("crop_resize", t1 - t0)
+        self.timings.add("normalize", t2 - t1)
+        return self._input
+
+
+class TorchCudaFP16Backend(SteeringBackend):
+    name = "cuda_fp16"
+
+    def __init__(self, roi=None, size=None):
+        super().__init__(roi, size)
+        import torch
+
+        self._torch = torch
+        self.device = torch.device("cuda")
+        self.model = _build_torch_model("cuda").to(self.device).half()
+        # (x/255 - mean)/std = x*scale - shift
+        self._scale = torch.from_numpy(1.0 / (255.0 * STD)).to(self.device).half()[:, None, None]
+        self._shift = torch.from_numpy(MEAN / STD).to(self.device).half()[:, None, None]
+
+    def _alloc(self, hw):
+        torch = self._torch
+        h, w = hw
+        # uint8로 업로드 (float 대비 전송량 1/4), 정규화는 GPU에서
+        self._host = torch.empty((h, w, 3), dtype=torch.uint8).pin_memory()
+        self._host_np = self._host.numpy()
+        self._gpu_u8 = torch.empty((h, w, 3), dtype=torch.uint8, device=self.device)
+        self._input = torch.empty((1, 3, h, w), dtype=torch.half, device=self.device)
+
+    def _sync(self):
+        if STEERING_PROFILE:
+            self._torch.cuda.synchronize()
+
+    def _preprocess(self, frame):
+        t0 = time.perf_counter()
+        self._ensure_buffers(frame.shape)
+        # 크롭/리사이즈 결과를 pinned 버퍼에 바로 기록
+        self.prep.crop_resize(frame, out=self._host_np)
+        t1 = time.perf_counter()
+        self._gpu_u8.copy_(self._host, non_blocking=True)
+        self._input[0].copy_(self._gpu_u8.permute(2, 0, 1))
+        self._input[0].mul_(self._scale).sub_(self._shift)
+        self._sync()
+        t2 = time.perf_counter()
+        self.timings.add("crop_resize", t1 - t0)
+        self.timings.add("upload_normalize", t2 - t1)
+        return self._input
+
+    def infer(self, frame):
+        with self._torch.no_grad():
+            x = self._preprocess(frame)
+            t0 = time.perf_counter()
+            out = self.model(x)
+            self._sync()
+            t1 = time.perf_counter()
+            xy = out.float().cpu().numpy().flatten()
+            t2 = time.perf_counter()
+        self.timings.add("infer", t1 - t0)
+        self.timings.add("download", t2 - t1)
+        return xy[0], xy[1]
+
+
+class TorchCPUBackend(_NumpyInputMixin, SteeringBackend):
+    name = "torch_cpu"
+
+    def __init__(self, roi=None, size=None):
+        super().__init__(roi, size)
+        import torch
+
+        self._torch = torch
+        self.model = _build_torch_model("cpu")
+
+    def _alloc(self, hw):
+        super()._alloc(hw)
+        # numpy 버퍼와 메모리 공유 (복사 없음)
+        self._input_t = self._torch.from_numpy(self._input)
+
+    def infer(self, frame):
+        self._preprocess(frame)
+        t0 = time.perf_counter()
+        with self._torch.no_grad():
+            xy = self.model(self._input_t).numpy().flatten()
+        self.timings.add("infer", time.perf_counter() - t0)
+        return xy[0], xy[1]
+
+
+def export_onnx(onnx_path=None, size=(224, 224)):
+    """.pth → .onnx 변환 (onnx_cpu 백엔드용, torch 필요)"""
+    import torch
+
+    onnx_path = onnx_path or os.path.splitext(STEERING_MODEL_PATH)[0] + ".onnx"
+    model = _build_torch_model("cpu")
+    dummy = torch.zeros((1, 3) + tuple(size))
+    torch.onnx.export(
+        model, dummy, onnx_path,
+        input_names=["input"], output_names=["xy"],
+        dynamic_axes={"input": {2: "h", 3: "w"}},
+        opset_version=11,
+    )
+    print(f"[STEERING] exported {onnx_path}")
+    return onnx_path
+
+
+class OnnxCPUBackend(_NumpyInputMixin, SteeringBackend):
+    name = "onnx_cpu"
+
+    def __init__(self, roi=None, size=None, onnx_path=None):
+        super().__init__(roi, size)
+        import onnxruntime as ort
+
+        onnx_path = onnx_path or os.path.splitext(STEERING_MODEL_PATH)[0] + ".onnx"
+        if not os.path.exists(onnx_path):
+            export_onnx(onnx_path)
+
+        self.session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def infer(self, frame):
+        x = self._preprocess(frame)
+        t0 = time.perf_counter()
+        xy = self.session.run(None, {self._input_name: x})[0].flatten()
+        self.timings.add("infer", time.perf_counter() - t0)
+        return xy[0], xy[1]
+
+
+BACKENDS = {
+    TorchCudaFP16Backend.name: TorchCudaFP16Backend,
+    TorchCPUBackend.name: TorchCPUBackend,
+    OnnxCPUBackend.name: OnnxCPUBackend,
+}
+
+
+def create_backend(name=None, roi=None, size=None):
+    name = name or STEERING_BACKEND
+    if name == "auto":
+        import torch
+        name = TorchCudaFP16Backend.name if torch.cuda.is_available() else TorchCPUBackend.name
+
+    if name not in BACKENDS:
+        raise ValueError(f"unknown steering backend: {name} (choose from {list(BACKENDS)})")
+
+    backend = BACKENDS[name](
+        roi=roi or _parse_ints(STEERING_ROI),
+        size=size or _parse_ints(STEERING_INPUT_SIZE),
+    )
+    print(f"[STEERING] backend: {backend.name}")
+    return backend
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
 
-def preprocess(image):
-    image = PIL.Image.fromarray(image)
-    image = transforms.functional.to_tensor(image).to(device).half()
-    image.sub_(mean[:, None, None]).div_(std[:, None, None])
-    return image[None, ...]
 
 def infer_xy(frame):
-    with torch.no_grad():
-        xy = model(preprocess(frame)).float().cpu().numpy().flatten()
-    return xy[0], xy[1]
+    return get_backend().infer(frame)
+
+
+def get_timings():
+    """단계별 평균 처리 시간 (ms). 백엔드 로드 전이면 빈 dict"""
+    return _backend.timings.report() if _backend is not None else {}
@@ -0,0 +1,211 @@
+# stream_encoder.py
+# 스트림 서버(ASGI / Flask) 공용: 클라이언트별 적응형 설정 + 설정별 1회 인코딩 캐시
+import cv2
+import importlib
+import math
+import os
+import threading
+import time
+
+# 사용할 스트림 서버: flask (기본, stream_server_flask.py) | asgi (stream_server.py)
+STREAM_BACKEND = os.getenv("AGV_STREAM_BACKEND", "flask")
+
+JPEG_QUALITY = 80
+
+# 화질 단계 (quality, scale) : 위쪽일수록 고화질
+#   quality None = 원본 (passthrough면 카메라 JPEG 그대로, 아니면 JPEG_QUALITY)
+QUALITY_LADDER = [
+    (None, 1.0),
+    (70, 1.0),
+    (60, 0.75),
+    (50, 0.75),
+    (50, 0.5),
+    (40, 0.5),
+    (30, 0.5),
+    (30, 0.25),
+]
+MAX_FPS = 30
+MIN_FPS = 5
+MIN_SCALE = 0.1         # 요청 scale 하한 (0에 가까우면 resize 크기가 0 → 스트림 중단)
+
+# 전송 시간(send time) / 프레임 간격 비율 기준
+DEGRADE_RATIO = 0.5     # 이보다 느리면 화질 ↓
+UPGRADE_RATIO = 0.15    # 이보다 빠른 상태가 유지되면 화질 ↑
+DEGRADE_COOLDOWN = 1.0  # sec
+UPGRADE_HOLD = 3.0      # sec
+
+
+def stream_server_module():
+    """STREAM_BACKEND에 맞는 서버 모듈 (start_stream_server / stop_stream_server 제공)"""
+    return importlib.import_module("stream_server" if STREAM_BACKEND == "asgi" else "stream_server_flask")
+
+
+class AdaptiveStreamSettings:
+    """
+    클라이언트 1명의 전송 설정 (quality / scale / fps).
+    yield 후 다시 돌아올 때까지 걸린 시간 = 소켓 send 시간(backpressure)
+    → 링크가 느리면 화질/해상도, 그다음 fps 순으로 낮추고 여유가 생기면 다시 올림
+    """
+
+    def __init__(self, quality=None, scale=None, fps=MAX_FPS, adaptive=True):
+        # 요청값 범위 제한: quality 1~100, scale MIN_SCALE~1.0, 유한하지 않은 값(nan / inf)은 무시
+        if quality is not None:
+            quality = int(max(1, min(quality, 100))) if math.isfinite(quality) else None
+        if scale is not None:
+            scale = float(max(MIN_SCALE, min(scale, 1.0))) if math.isfinite(scale) else None
+        if not math.isfinite(fps):
+            fps = MAX_FPS
+
+        self.adaptive = adaptive
+        self.max_fps = max(MIN_FPS, min(int(fps), MAX_FPS))
+        self.fps = self.max_fps
+        self.send_ewma = 0.0
+        self._last_change = time.time()
+        self._fast_since = None
+
+        if adaptive:
+            # 요청값은 상한 → 조건을 만족하는 첫 단계부터 시작
+            self.top = len(QUALITY_LADDER) - 1
+            for i, (q, s) in enumerate(QUALITY_LADDER):
+                if (quality is None or (q or JPEG_QUALITY) <= quality) and \
+                        (scale is None or s <= scale):
+                    self.top = i
+                    break
+            self.level = self.top
+            self.quality, self.scale = QUALITY_LADDER[self.level]
+        else:
+            self.top = self.level = 0
+            self.quality = quality
+            self.scale = scale if scale is not None else 1.0
+
+    @classmethod
+    def from_query(cls, args):
+        """/usb_video?quality=70&scale=0.5&fps=15&adaptive=1 쿼리 파싱"""
+        def _get(name, cast, default=None):
+            value = args.get(name)
+            if value is None:
+                return default
+            try:
+                return cast(value)
+            except ValueError:
+                return default
+
+        return cls(
+            quality=_get("quality", int),
+            scale=_get("scale", float),
+            fps=_get("fps", int, MAX_FPS),
+            adaptive=_get("adaptive", int, 1) != 0,
+        )
+
+    @property
+    def interval(self):
+        return 1.0 / self.fps
+
+    @property
+    def is_source(self):
+        """원본 설정 (passthrough면 인코딩 없이 카메라 JPEG 전송)"""
+        return self.quality is None and self.scale == 1.0
+
+    def report(self):
+        return {
+            "quality": self.quality or "source",
+            "scale": self.scale,
+            "fps": self.fps,
+            "adaptive": self.adaptive,
+            "send_ms": round(self.send_ewma * 1000, 1),
+        }
+
+    def update(self, send_time):
+        self.send_ewma = 0.7 * self.send_ewma + 0.3 * send_time
+        if not self.adaptive:
+            return
+
+        now = time.time()
+        ratio = self.send_ewma / self.interval
+
+        if ratio > DEGRADE_RATIO:
+            self._fast_since = None
+            if now - self._last_change >= DEGRADE_COOLDOWN:
+                self._degrade()
+                self._last_change = now
+        elif ratio < UPGRADE_RATIO:
+            if self._fast_since is None:
+                self._fast_since = now
+            elif now - self._fast_since >= UPGRADE_HOLD:
+                self._upgrade()
+                self._fast_since = now
+                self._last_change = now
+        else:
+            self._fast_since = None
+
+    def _degrade(self):
+        if self.level < len(QUALITY_LADDER) - 1:
+            self.level += 1
+            self.quality, self.scale = QUALITY_LADDER[self.level]
+        elif self.fps > MIN_FPS:
+            self.fps = max(MIN_FPS, self.fps // 2)
+
+    def _upgrade(self):
+        # fps 먼저 회복 → 그다음 화질
+        if self.fps < self.max_fps:
+            self.fps = min(self.max_fps, self.fps * 2)
+        elif self.level > self.top:
+            self.level -= 1
+            self.quality, self.scale = QUALITY_LADDER[self.level]
+
+
+class JpegEncodeCache:
+    """
+    프레임을 설정(quality, scale)별로 1번만 JPEG 인코딩.
+    같은 설정의 클라이언트들은 같은 인코딩 결과를 재사용
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}        # (quality, scale) -> (seq, jpeg bytes)
+        self._key_locks = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def encode(self, seq, frame, quality, scale):
+        key = (quality or JPEG_QUALITY, scale)
+
+        with self._key_lock(key):
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] >= seq:
+                return cached[1]
+
+            if scale != 1.0:
+                frame = cv2.resize(
+                    frame, None, fx=scale, fy=scale,
+                    interpolation=cv2.INTER_AREA
+                )
+            ok, jpeg = cv2.imencode(
+                ".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), key[0]]
+            )
+            if not ok:
+                return None
+
+            jpeg = jpeg.tobytes()
+            self._cache[key] = (seq, jpeg)
+            return jpeg
+
+
+def multipart(jpeg, settings):
+    # 선택된 설정을 파트 헤더로 함께 전달 (GUI는 JPEG 마커만 보므로 영향 없음)
+    return (
+        b"--frame\r\n"
+        b"Content-Type: image/jpeg\r\n"
+        + (
+            f"X-Stream-Quality: {settings.quality or 'source'}\r\n"
+            f"X-Stream-Scale: {settings.scale}\r\n"
+            f"X-Stream-FPS: {settings.fps}\r\n\r\n"
+        ).encode()
+        + jpeg
+        + b"\r\n"
+    )
@@ -1,57 +1,215 @@
 # stream_server.py
-from flask import Flask, Response
-import cv2
+# asyncio(ASGI) 스트림 서버: 이벤트 루프 1개로 여러 MJPEG 시청자 처리 (AGV_STREAM_BACKEND=asgi)
+#   스레드 수 / 메모리는 적지만 시청자당 CPU는 Flask보다 높음 → 기본은 stream_server_flask.py
+import asyncio
+import itertools
+import threading
 import time
-from camera_manager import get_usb_frame
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
-app = Flask(__name__)
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
 
-_last_frame = None
+import camera_manager
+from camera_manager import wait_usb_frame, wait_usb_jpeg
+from stream_encoder import AdaptiveStreamSettings, JpegEncodeCache, multipart
 
+STREAM_HOST = "0.0.0.0"
+STREAM_PORT = 5000
 
-def gen_usb_frames():
-    global _last_frame
-    last = time.time()
-    count = 0
 
-    while True:
-        frame = get_usb_frame()
+class AsyncFrameHub:
+    """
+    공유 프레임 소스(camera_manager) → 이벤트 루프 브리지.
+    - 펌프 태스크 1개만 캡처 슬롯을 기다림 (전용 스레드 1개)
+    - 시청자 코루틴들은 asyncio.Condition으로 새 seq를 기다림
+    - 재인코딩이 필요한 경우만 인코딩 스레드풀 사용 (설정별 1회)
+    """
 
-        if frame is not None:
-            _last_frame = frame
+    def __init__(self):
+        self.seq = 0
+        self.jpeg = None          # passthrough 원본 JPEG
+        self._cond = None
+        self._loop = None
+        self._closed = False
+        self._pump_task = None
+        self._wait_pool = ThreadPoolExecutor(max_workers=1)
+        self._encode_pool = ThreadPoolExecutor(max_workers=2)
+        self._encoder = JpegEncodeCache()
+        self._clients = {}        # client id -> AdaptiveStreamSettings
+        self._ids = itertools.count(1)
 
-            count += 1
-            now = time.time()
-            if now - last >= 1.0:
-                print(f"[STREAM OUT] FPS: {count}")
-                count = 0
-                last = now
+    async def start(self):
+        self._loop = asyncio.get_event_loop()
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self._pump_task = asyncio.ensure_future(self._pump())
 
-        # ✅ 프레임이 없을 때는 마지막 프레임 or 대기
-        if _last_frame is None:
-            time.sleep(0.05)
-            continue
+    async def _close(self):
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
 
-        _, jpeg = cv2.imencode(".jpg", _last_frame)
-        yield (
-            b"--frame\r\n"
-            b"Content-Type: image/jpeg\r\n\r\n"
-            + jpeg.tobytes()
-            + b"\r\n"
-        )
+    def close_threadsafe(self):
+        """다른 스레드에서 호출: 시청자 스트림을 모두 끝냄 (서버 종료 전)"""
+        if self._loop is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop)
 
-        # ✅ 과도한 전송 방지 (약 30fps cap)
-        time.sleep(0.03)
+    async def stop(self):
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            try:
+                await self._pump_task
+            except asyncio.CancelledError:
+                pass
+            self._pump_task = None
 
+    async def _pump(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            if camera_manager.USB_JPEG_PASSTHROUGH:
+                seq, jpeg = await loop.run_in_executor(
+                    self._wait_pool, wait_usb_jpeg, self.seq, 0.5
+                )
+            else:
+                # passthrough가 아니면 seq만 알림 (인코딩은 시청자 설정별로)
+                seq, frame = await loop.run_in_executor(
+                    self._wait_pool, wait_usb_frame, self.seq, 0.5
+                )
+                jpeg = None if frame is None else b""
 
-@app.route("/usb_video")
-def usb_video():
-    return Response(
-        gen_usb_frames(),
-        mimetype="multipart/x-mixed-replace; boundary=frame"
+            if jpeg is None:
+                continue
+
+            async with self._cond:
+                self.seq, self.jpeg = seq, jpeg
+                self._cond.notify_all()
+
+    def _encode_latest(self, seq, settings):
+        """seq 이상의 최신 프레임을 디코딩(필요 시) 후 설정대로 인코딩"""
+        new_seq, frame = wait_usb_frame(seq - 1, timeout=0.5)
+        if frame is None:
+            return None
+        return self._encoder.encode(new_seq, frame, settings.quality, settings.scale)
+
+    async def client_frames(self, settings):
+        """시청자 1명용 multipart async 제너레이터"""
+        loop = asyncio.get_event_loop()
+        client_id = next(self._ids)
+        self._clients[client_id] = settings
+
+        try:
+            seq = 0
+            last_sent = 0.0
+            while True:
+                # fps 제한: 간격이 안 됐으면 쉬었다가 그 시점의 최신 프레임을 가져감
+                wait = settings.interval - (time.time() - last_sent)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                async with self._cond:
+                    await self._cond.wait_for(
+                        lambda: self._closed or self.seq > seq
+                    )
+                    if self._closed:
+                        return
+                    seq, jpeg = self.seq, self.jpeg
+
+                if not (camera_manager.USB_JPEG_PASSTHROUGH and settings.is_source):
+                    jpeg = await loop.run_in_executor(
+                        self._encode_pool, self._encode_latest, seq, settings
+                    )
+                if not jpeg:
+                    continue
+
+                last_sent = time.time()
+                yield multipart(jpeg, settings)
+                # 다음 반복까지 = 전송 버퍼가 비워질 때까지 (backpressure)
+                settings.update(time.time() - last_sent)
+        finally:
+            self._clients.pop(client_id, None)
+
+    def stats(self):
+        return {cid: s.report() for cid, s in self._clients.items()}
+
+
+hub = AsyncFrameHub()
+
+
+async def usb_video(request):
+    """
+    /usb_video?quality=70&scale=0.5&fps=15&adaptive=1
+    - adaptive=1 (기본): quality/scale/fps는 상한, 링크 상태에 따라 자동 조절
+    - adaptive=0: 지정값 고정
+    """
+    settings = AdaptiveStreamSettings.from_query(request.query_params)
+    return StreamingResponse(
+        hub.client_frames(settings),
+        media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+async def usb_video_stats(request):
+    """시청자별 현재 전송 설정"""
+    return JSONResponse(hub.stats())
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await hub.start()
+    yield
+    await hub.stop()
+
+
+app = Starlette(
+    routes=[
+        Route("/usb_video", usb_video),
+        Route("/usb_video/stats", usb_video_stats),
+    ],
+    lifespan=lifespan,
+)
+
+# =========================
+# 시작 / 종료 (system_on / system_off 에서 호출)
+# =========================
+_server = None
+_server_thread = None
+
+
+def start_stream_server(host=STREAM_HOST, port=STREAM_PORT):
+    global _server, _server_thread
+
+    if _server_thread is not None and _server_thread.is_alive():
+        return
+
+    config = uvicorn.Config(
+        app, host=host, port=port, log_level="warning", loop="asyncio"
     )
+    _server = uvicorn.Server(config)
+    _server_thread = threading.Thread(target=_server.run, daemon=True)
+    _server_thread.start()
+    print(f"Stream server (ASGI): USB Cam on :{port}/usb_video")
+
+
+def stop_stream_server(timeout=3.0):
+    global _server, _server_thread
+
+    if _server is None:
+        return
+
+    # 스트리밍 응답은 끝나지 않으므로 먼저 닫아야 uvicorn이 정상 종료됨
+    hub.close_threadsafe()
+    _server.should_exit = True
+    _server_thread.join(timeout=timeout)
+    _server = None
+    _server_thread = None
+    print("Stream server stopped")
 
 
-def run_stream_server():
-    print("Stream server: USB Cam on /usb_video")
-    app.run(host="0.0.0.0", port=5000, threaded=True)
+def run_stream_server(host=STREAM_HOST, port=STREAM_PORT):
+    """단독 실행용 (블로킹)"""
+    print("Stream server (ASGI): USB Cam on /usb_video")
+    uvicorn.run(app, host=host, port=port, log_level="warning", loop="asyncio")
@@ -0,0 +1,168 @@
+# track.py
+# 트랙 노드 그래프 + 최단 거리 표 + 방문 순서 결정
+#   간선은 라인트레이싱 진행 방향 기준 (방향 그래프). 기본값 = 정찰 순서대로 도는 루프
+#   AGV_TRACK_FILE (json: {"edges": [["green", "purple", 1.2], ...]}) 로 실제 트랙 지정
+#   거리 표는 시작할 때 한 번 계산 (Floyd–Warshall, numpy로 k마다 행렬 한 번에)
+#   순서: 구역 수가 적으면 완전 탐색(Held–Karp DP), 많으면 최근접 이웃 + 구간 이동(or-opt) 개선
+import json
+import os
+import numpy as np
+
+AGV_TRACK_FILE = os.getenv("AGV_TRACK_FILE", "")
+
+# (출발, 도착, 거리 m) — inference.run_cycle의 노드 순서와 같은 루프
+TRACK_EDGES = [
+    ("green", "purple", 1.0),
+    ("purple", "blue", 1.0),
+    ("blue", "orange", 1.0),
+    ("orange", "green", 1.0),
+]
+
+EXACT_MAX = 10          # 이 이하 구역 수는 DP로 최적 순서 (2^10 × 10 상태)
+
+
+class TrackGraph:
+    def __init__(self, edges=None):
+        edges = edges if edges is not None else TRACK_EDGES
+        names = []
+        for a, b, _ in edges:
+            for n in (a, b):
+                if n not in names:
+                    names.append(n)
+        self.names = names
+        self.index = {n: i for i, n in enumerate(names)}
+
+        n = len(names)
+        d = np.full((n, n), np.inf)
+        np.fill_diagonal(d, 0.0)
+        for a, b, w in edges:
+            i, j = self.index[a], self.index[b]
+            d[i, j] = min(d[i, j], float(w))
+        for k in range(n):
+            np.minimum(d, d[:, k, None] + d[None, k, :], out=d)
+        self.dist = d
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def distance(self, a, b):
+        return float(self.dist[self.index[a], self.index[b]])
+
+    def route_length(self, start, order):
+        total, cur = 0.0, start
+        for z in order:
+            total += self.distance(cur, z)
+            cur = z
+        return total
+
+    def order_zones(self, start, zones):
+        """
+        start에서 출발해 zones를 모두 들르는 총 거리가 가장 짧은 순서
+        반환: (순서 리스트, 총 거리). 그래프에 없는 구역은 빼고 계산
+        """
+        zones = [z for z in dict.fromkeys(zones) if z in self.index]
+        if not zones:
+            return [], 0.0
+        if start not in self.index:
+            start = zones[0]
+
+        s = self.index[start]
+        idx = np.array([self.index[z] for z in zones])
+        from_start = self.dist[s, idx]
+        between = self.dist[np.ix_(idx, idx)]
+
+        if len(zones) <= EXACT_MAX:
+            order = _held_karp(from_start, between)
+        else:
+            order = _or_opt(from_start, between, _nearest_neighbour(from_start, between))
+
+        ordered = [zones[i] for i in order]
+        return ordered, self.route_length(start, ordered)
+
+
+def _held_karp(from_start, between):
+    """열린 경로 TSP 정확해. dp[mask, j] = mask를 방문하고 j에서 끝나는 최소 거리"""
+    n = len(from_start)
+    full = 1 << n
+    dp = np.full((full, n), np.inf)
+    parent = np.full((full, n), -1, dtype=np.int64)
+    for j in range(n):
+        dp[1 << j, j] = from_start[j]
+
+    for mask in range(1, full):
+        row = dp[mask]
+        if not np.isfinite(row).any():
+            continue
+        # 아직 안 간 k 전부에 대해 한 번에: dp[mask | 1<<k, k] ← min_j row[j] + between[j, k]
+        cand = row[:, None] + between
+        best_j = cand.argmin(axis=0)
+        best = cand[best_j, np.arange(n)]
+        for k in range(n):
+            if mask & (1 << k):
+                continue
+            nxt = mask | (1 << k)
+            if best[k] < dp[nxt, k]:
+                dp[nxt, k] = best[k]
+                parent[nxt, k] = best_j[k]
+
+    mask = full - 1
+    j = int(dp[mask].argmin())
+    order = []
+    while j >= 0:
+        order.append(j)
+        prev = int(parent[mask, j])
+        mask ^= 1 << j
+        j = prev
+    return order[::-1]
+
+
+def _nearest_neighbour(from_start, between):
+    n = len(from_start)
+    left = np.ones(n, bool)
+    cur = int(from_start.argmin())
+    order = [cur]
+    left[cur] = False
+    for _ in range(n - 1):
+        d = np.where(left, between[cur], np.inf)
+        cur = int(d.argmin())
+        order.append(cur)
+        left[cur] = False
+    return order
+
+
+def _path_cost(from_start, between, order):
+    o = np.asarray(order)
+    return float(from_start[o[0]] + between[o[:-1], o[1:]].sum())
+
+
+def _or_opt(from_start, between, order, max_seg=3):
+    """구간(1~3개)을 떼어 다른 위치에 끼워서 줄어들면 반영. 방향 그래프라 뒤집기(2-opt)는 안 씀"""
+    best = _path_cost(from_start, between, order)
+    improved = True
+    while improved:
+        improved = False
+        n = len(order)
+        for seg in range(1, max_seg + 1):
+            for i in range(n - seg + 1):
+                moved = order[i:i + seg]
+                rest = order[:i] + order[i + seg:]
+                for j in range(len(rest) + 1):
+                    if j == i:
+                        continue
+                    cand = rest[:j] + moved + rest[j:]
+                    cost = _path_cost(from_start, between, cand)
+                    if cost < best - 1e-9:
+                        order, best, improved = cand, cost, True
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+    return order
+
+
+def load_track():
+    if AGV_TRACK_FILE:
+        with open(AGV_TRACK_FILE, encoding="utf-8") as f:
+            return TrackGraph([tuple(e) for e in json.load(f)["edges"]])
+    return TrackGraph()
@@ -0,0 +1,183 @@
+# zone_executor.py
+# 서버 zone_action 명령 실행: {"cycle_id", "commands": [{"zone", "action"}, ...]}
+#   1) 현재 위치(마지막 도착 노드)에서 요청 구역을 모두 도는 최단 순서 계산 (track.py 거리 표)
+#   2) 라인트레이싱 미션으로 주행 → 색상 노드 도착 이벤트가 다음 목표 구역이면 정차
+#   3) 해당 구역 작업 실행 → 구역별 완료 결과를 서버로 보고 → 다음 구역
+#   목표가 아닌 노드는 미션의 기본 정차(NODE_DWELL_S)만 하고 지나감
+import os
+import threading
+import time
+import requests
+
+import mission
+from track import load_track
+
+SERVER_BASE = os.getenv("AGV_SERVER", "http://172.20.10.6:8888")
+REPORT_URL = f"{SERVER_BASE}/agv/report_zone_result"
+
+# 전원을 켠 직후 위치 (아직 도착 이벤트가 없을 때)
+AGV_START_NODE = os.getenv("AGV_START_NODE", "green")
+ZONE_TIMEOUT_S = 120.0      # 다음 목표 구역까지 이 시간 안에 못 가면 건너뜀
+HOLD_S = 60.0               # 작업 중 정차 상한 (작업이 끝나면 바로 해제)
+
+
+# 작업 이름 → 실행 함수. 작동기(펌프 / 분무기)를 붙이면 여기서 제어
+def _timed_action(seconds):
+    def run(zone):
+        time.sleep(seconds)
+    return run
+
+
+ACTIONS = {
+    "supply_fertilizer": _timed_action(3.0),
+    "spray": _timed_action(3.0),
+}
+
+track = load_track()
+
+
+class ZoneRun:
+    def __init__(self, cycle_id, commands, agv_id, owns_mission=False):
+        self.cycle_id = cycle_id
+        self.agv_id = agv_id
+        # 구역별 작업 묶기 (같은 구역은 한 번 정차해서 전부 실행)
+        self.actions = {}
+        for c in commands:
+            self.actions.setdefault(c["zone"], []).append(c["action"])
+
+        self.order = []
+        self.results = []
+        self._target = None
+        self._arrived = threading.Event()
+        self._cancel = threading.Event()
+        # 이 실행이 끝날 때 미션을 멈출 책임 (직접 시작했거나 이전 실행에서 넘겨받음)
+        self._started_mission = owns_mission
+        self._handover = False
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    # -----------------------------
+    # 도착 이벤트 (mission 추론 스레드에서 호출 → 짧게)
+    # -----------------------------
+    def _on_node(self, event):
+        if event["node"] == self._target:
+            mission.hold(HOLD_S)
+            self._arrived.set()
+
+    def _report(self, zone, action, status, started):
+        result = {
+            "cycle_id": self.cycle_id,
+            "agv_id": self.agv_id,
+            "zone": zone,
+            "action": action,
+            "status": status,
+            "ts": time.time(),
+            "duration_s": round(time.time() - started, 2),
+        }
+        self.results.append(result)
+        print(f"[ZONE] {zone} {action}: {status}")
+        try:
+            self._session.post(REPORT_URL, json=result, timeout=3)
+        except requests.RequestException as e:
+            print(f"[ZONE] report failed: {e}")
+
+    def _go_to(self, zone):
+        """zone 도착까지 대기. 이미 그 노드에 서 있으면 바로 True"""
+        here = mission.last_node or AGV_START_NODE
+        if not mission.is_running() and here == zone:
+            return True
+        if mission.dwelling_at(zone):
+            # 주행 중이지만 지금 그 노드에 정차 중 (이전 실행이 세워 둔 경우 포함) → 정차 연장
+            mission.hold(HOLD_S)
+            return True
+
+        self._target = zone
+        self._arrived.clear()
+        # 이전 실행이 다른 노드에 세워 둔 정차 해제
+        mission.release()
+        if not mission.is_running():
+            mission.start_mission(f"{self.cycle_id}_zone")
+            self._started_mission = True
+        ok = self._arrived.wait(ZONE_TIMEOUT_S) and not self._cancel.is_set()
+        self._target = None
+        return ok
+
+    def _run(self):
+        start = mission.last_node or AGV_START_NODE
+        unknown = [z for z in self.actions if z not in track]
+        self.order, total = track.order_zones(start, list(self.actions))
+        print(f"[ZONE] {start} → {' → '.join(self.order)} ({total:.1f} m)")
+
+        for zone in unknown:
+            for action in self.actions[zone]:
+                self._report(zone, action, "unknown_zone", time.time())
+
+        mission.add_node_listener(self._on_node)
+        try:
+            for zone in self.order:
+                if self._cancel.is_set():
+                    break
+                started = time.time()
+                if not self._go_to(zone):
+                    status = "cancelled" if self._cancel.is_set() else "timeout"
+                    for action in self.actions[zone]:
+                        self._report(zone, action, status, started)
+                    continue
+
+                for action in self.actions[zone]:
+                    t = time.time()
+                    fn = ACTIONS.get(action)
+                    if fn is None:
+                        self._report(zone, action, "unknown_action", t)
+                        continue
+                    try:
+                        fn(zone)
+                        self._report(zone, action, "done", t)
+                    except Exception as e:
+                        print(f"[ZONE] {zone} {action} error: {e}")
+                        self._report(zone, action, "fail", t)
+                mission.release()
+        finally:
+            mission.remove_node_listener(self._on_node)
+            if not self._handover:
+                mission.release()
+            # 취소: 새 실행이 미션을 넘겨받거나 (handover) 호출한 쪽이 멈춤 (PAUSE / OFF)
+            if self._started_mission and not self._cancel.is_set():
+                mission.stop_mission()
+            self._session.close()
+        print(f"[ZONE] run finished: {len(self.results)} results")
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self, handover=False):
+        """handover=True: 새 실행이 이어받음 → 정차 / 미션을 그대로 둠"""
+        self._handover = handover
+        self._cancel.set()
+        self._arrived.set()
+        self._thread.join(timeout=5.0)
+
+
+_current = None
+_lock = threading.Lock()
+
+
+def start_zone_run(cycle_id, commands, agv_id):
+    """새 명령이 오면 진행 중인 실행은 취소하고 새로 시작 (그 실행이 시작한 미션은 새 실행이 이어받아 끝에 정지)"""
+    global _current
+    with _lock:
+        owns_mission = False
+        if _current is not None:
+            _current.cancel(handover=True)
+            owns_mission = _current._started_mission
+        _current = ZoneRun(cycle_id, commands, agv_id, owns_mission=owns_mission)
+        _current.start()
+        return _current
+
+
+def cancel_zone_run():
+    global _current
+    with _lock:
+        if _current is not None:
+            _current.cancel()
+            _current = None
@@ -1,9 +1,10 @@
 import json
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from typing import List, Optional, Literal
-from pydantic import BaseModel, Field
-from services.agv_service import upload_and_analyze_observations, fetch_task_list, set_agv_run_state, get_agv_run_state, is_agv_running, get_image_signed_url, fetch_agv_observations, get_latest_cycle_id, save_task_result_to_firestore
+from pydantic import BaseModel, Field, ValidationError
+from services.agv_service import fetch_task_list, set_agv_run_state, get_agv_run_state, is_agv_running, get_image_signed_url, fetch_agv_observations, get_latest_cycle_id, save_task_result_to_firestore, save_zone_result_to_firestore
 from datetime import datetime
+from services import job_queue
 from .agv_cmd import mqtt_publish
 router = APIRouter(prefix="/agv", tags=["AGV Management"])
 
@@ -66,17 +67,30 @@ def manual_move(cmd: dict):
 # ===============================
 # 요청 스키마 정의
 # ===============================
+# cycle_id는 작업 디렉토리 / Storage 경로 / 문서 id에 그대로 쓰임 → 경로 구분자 등은 거부
+CYCLE_ID_PATTERN = r"^[\w-]+$"
+
 class YoloIn(BaseModel):
     result: Literal["normal", "abnormal", "unknown"]
     confidence: float = Field(ge=0.0, le=1.0)
 
+class QualityIn(BaseModel):
+    sharpness: float
+    clipped: float = Field(ge=0.0, le=1.0)
+    brightness: float
+    acceptable: bool
+    score: float
+
 class ObservationIn(BaseModel):
     node: str
     image_url: Optional[str] = ""
     yolo: YoloIn
+    quality: Optional[QualityIn] = None
+    # AGV가 이미지 변화 없음으로 판단 → 이미지 없이 해당 cycle의 분석 재사용
+    unchanged_since: Optional[str] = Field(default=None, pattern=CYCLE_ID_PATTERN)
 
 class UploadObservationRequest(BaseModel):
-    cycle_id: str
+    cycle_id: str = Field(pattern=CYCLE_ID_PATTERN)
     agv_id: str
     timestamp: str        
     observations: List[ObservationIn]
@@ -85,22 +99,56 @@ class ReportTaskResultIn(BaseModel):
     cycle_id: str
     result: Literal["success", "fail"]
 
-@router.post("/upload_observation")
+class ReportZoneResultIn(BaseModel):
+    cycle_id: str = Field(pattern=CYCLE_ID_PATTERN)
+    agv_id: str
+    zone: str
+    action: str
+    status: Literal["done", "fail", "timeout", "cancelled", "unknown_zone", "unknown_action"]
+    ts: float
+    duration_s: float = 0.0
+
+@router.post("/upload_observation", status_code=202)
 async def upload_observation(
     payload: str = Form(...),
-    images: List[UploadFile] = File(...)
+    images: Optional[List[UploadFile]] = File(None)
 ):
     try:
         payload_dict = json.loads(payload)
         req = UploadObservationRequest(**payload_dict)
-        
-        if len(images) != len(req.observations):
+        images = images or []
+
+        # unchanged_since 관찰은 이미지 없음 → 나머지 관찰과 순서대로 매칭
+        changed = [o for o in req.observations if not o.unchanged_since]
+        if len(images) != len(changed):
             raise HTTPException(status_code=400, detail="이미지 개수와 관찰 데이터 수가 일치하지 않습니다.")
-            
-        return await upload_and_analyze_observations(req, images)
+
+        # 참조한 이전 분석이 없으면 여기서 409 (작업 안에서 실패하면 AGV는 이미 202를 받은 뒤)
+        await job_queue.check_references(req)
+
+        # 저장 + 분석 작업 등록까지만 하고 바로 응답 (업로드 / LLM 분석은 작업 큐 워커가)
+        job = await job_queue.submit(req, images)
+        return {
+            "status": "accepted",
+            "cycle_id": req.cycle_id,
+            "job_id": job["id"],
+            "job_url": f"/agv/jobs/{job['id']}",
+        }
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        # 잘못된 payload는 다시 보내도 거절 → 4xx (AGV 업로더가 재시도하지 않음)
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    분석 작업 진행 상태 (state, stage, 단계별 소요 시간, 오류, 결과)
+    """
+    return job_queue.get_job(job_id)
+
 @router.get("/get_task_list")
 def get_task_list(cycle_id: str):
     return fetch_task_list(cycle_id)
@@ -153,6 +201,16 @@ def report_task_result(body: ReportTaskResultIn):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/report_zone_result")
+def report_zone_result(body: ReportZoneResultIn):
+    """
+    AGV -> 서버 구역별 작업 완료 보고 (zone_action 실행 중 구역마다)
+    """
+    try:
+        return save_zone_result_to_firestore(body)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ===============================
 # AGV 사이클 제어
 # ===============================
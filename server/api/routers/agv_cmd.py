@@ -56,7 +56,7 @@ def publish_zone_actions(agv_id: str, cycle_id: str):
         raise HTTPException(status_code=400, detail="no valid commands")
 
     topic = f"agv/{agv_id}/zone_action"
-    payload = {"commands": commands}  # 명령 commands 배열 안에 넣어주기
+    payload = {"cycle_id": cycle_id, "commands": commands}  # 명령 commands 배열 안에 넣어주기
 
     mqtt_publish(topic, payload, qos=1)
 
@@ -0,0 +1,196 @@
+# bench_llm_batch.py
+# cycle LLM 분석: 노드별 요청(node) vs cycle 일괄 요청(cycle_batch) — 토큰 / 소요 시간
+# 입력은 test_send.py의 cycle (노드 4개, YOLO 결과 그대로) + AGV/model의 샘플 이미지
+#
+#   가짜 엔드포인트 (기본): 토큰 수는 요청 / 응답 텍스트로 추정 (tiktoken이 있으면 o200k_base,
+#     없으면 ASCII 4자당 1토큰 + 그 외 문자 1자당 1토큰 + 메시지당 4토큰). 이미지 토큰은 빼고 셈
+#     (두 모드 모두 같은 이미지를 같은 장수만큼 보내므로 차이에 영향 없음)
+#     지연 = base + 이미지당 시간 + 출력 토큰당 시간 (실제 API 지연이 아니라 모델 값)
+#   --real: 실제 API (GMS_KEY 필요, 비용 발생). 이미지는 data URL로, 토큰은 응답의 usage 값
+#
+#   python bench_llm_batch.py
+#   python bench_llm_batch.py --drop 1        # 일괄 응답에서 노드 1개를 빼서 재분석 경로 확인
+#   python bench_llm_batch.py --real --repeat 3
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import llm.client as llm_client
+from bench_llm_concurrency import _start_fake_llm_app
+from llm.analysis import analyze_cycle_batch, analyze_nodes
+
+IMAGE_DIR = Path(__file__).resolve().parent.parent / "AGV" / "model"
+
+# test_send.py와 같은 cycle
+CYCLE = {
+    "cycle_id": "2025_12_09_1630",
+    "agv_id": "AGV1",
+    "timestamp": "2025-12-15 17:10:00",
+    "observations": [
+        {"node": "green",  "yolo": {"result": "normal", "confidence": 0.94}},
+        {"node": "purple", "yolo": {"result": "normal", "confidence": 0.87}},
+        {"node": "blue",   "yolo": {"result": "abnormal", "confidence": 0.0}},
+        {"node": "orange", "yolo": {"result": "abnormal", "confidence": 0.0}},
+    ],
+}
+
+# 가짜 응답의 reason / 요약 (실제 응답과 비슷한 길이)
+FAKE_REASON = {
+    "supply_fertilizer": "잎 색과 형태가 고르고 병반이 보이지 않아 정상 생육 상태로 판단되며, 생육 유지를 위해 일반 비료를 공급한다.",
+    "spray": "잎 가장자리 갈변과 불규칙한 반점이 관찰되어 영양 부족보다는 잎마름병 등 병해 의심 상태로 판단되므로 치료제를 살포한다.",
+}
+
+
+# =========================
+# 토큰 추정
+# =========================
+def _token_counter():
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("o200k_base")
+        return "o200k_base", lambda text: len(enc.encode(text))
+    except ImportError:
+        def approx(text):
+            ascii_chars = sum(1 for c in text if ord(c) < 128)
+            return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+        return "approx", approx
+
+
+def _fake_llm_app(count_tokens, base, per_image, per_token, drop):
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def completions(request: Request):
+        body = await request.json()
+        system = body["messages"][0]["content"]
+        parts = body["messages"][1]["content"]
+        user = json.loads(parts[0]["text"])
+        images = len(parts) - 1
+
+        if "observations" in user:
+            nodes = [(o["node"], o["detection_result"]) for o in user["observations"]]
+            kept = nodes[:len(nodes) - drop] if drop else nodes
+            tasks = [{"node": n, "action": _action(r), "reason": FAKE_REASON[_action(r)]} for n, r in kept]
+            content = {
+                "task_list": tasks,
+                "node_summaries": {n: f"{n}: {_summary(r)}" for n, r in kept},
+                "summary_report": f"노드 {len(nodes)}개 중 이상 {sum(r != 'normal' for _, r in nodes)}개.",
+            }
+        else:
+            action = _action(user["detection_result"])
+            content = {
+                "task_list": [{"node": user["node"], "action": action, "reason": FAKE_REASON[action]}],
+                "summary_report": f"{user['node']}: {_summary(user['detection_result'])}",
+            }
+
+        text = json.dumps(content, ensure_ascii=False)
+        usage = {
+            "prompt_tokens": count_tokens(system) + count_tokens(parts[0]["text"]) + 8,
+            "completion_tokens": count_tokens(text),
+        }
+        await asyncio.sleep(base + per_image * images + per_token * usage["completion_tokens"])
+        return JSONResponse({"choices": [{"message": {"content": text}}], "usage": usage})
+
+    return Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+
+
+def _action(result):
+    return "supply_fertilizer" if result == "normal" else "spray"
+
+
+def _summary(result):
+    return "정상 생육, 비료 공급" if result == "normal" else "병해 의심, 치료제 살포"
+
+
+# =========================
+# 측정
+# =========================
+def _image_urls(real):
+    urls = {}
+    samples = sorted(IMAGE_DIR.glob("*.jpg"))
+    for i, obs in enumerate(CYCLE["observations"]):
+        path = IMAGE_DIR / f"{obs['node']}.jpg"
+        if not path.exists():
+            path = samples[i % len(samples)]       # 샘플 이미지가 없는 노드는 다른 노드 이미지로
+        if real:
+            urls[obs["node"]] = "data:image/jpeg;base64," + base64.b64encode(path.read_bytes()).decode()
+        else:
+            urls[obs["node"]] = f"http://bench.local/{path.name}"
+    return urls
+
+
+async def _run(mode, signed):
+    observations = [dict(o, image_url=f"https://storage.local/{o['node']}.jpg") for o in CYCLE["observations"]]
+    fn = analyze_cycle_batch if mode == "cycle_batch" else analyze_nodes
+    before = dict(llm_client.token_usage)
+
+    t = time.perf_counter()
+    results = await fn(CYCLE["cycle_id"], CYCLE["agv_id"], CYCLE["timestamp"], observations, signed)
+    wall = time.perf_counter() - t
+    await llm_client.close_client()
+
+    assert [r["task_list"][0]["node"] for r in results] == [o["node"] for o in observations]
+    used = {k: llm_client.token_usage[k] - before[k] for k in before}
+    return wall, used
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--real", action="store_true", help="실제 API 사용 (GMS_KEY 필요)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--base", type=float, default=0.6, help="가짜 LLM 기본 지연 (sec)")
+    parser.add_argument("--per-image", type=float, default=0.15, help="가짜 LLM 이미지당 지연 (sec)")
+    parser.add_argument("--per-token", type=float, default=0.012, help="가짜 LLM 출력 토큰당 지연 (sec)")
+    parser.add_argument("--drop", type=int, default=0, help="가짜 일괄 응답에서 뺄 노드 수")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    counter = "usage"
+    if not args.real:
+        counter, count_tokens = _token_counter()
+        app = _fake_llm_app(count_tokens, args.base, args.per_image, args.per_token, args.drop)
+        _start_fake_llm_app(app, args.port)
+        os.environ["GMS_API_URL"] = f"http://127.0.0.1:{args.port}/v1/chat/completions"
+        os.environ.setdefault("GMS_KEY", "bench")
+    signed = _image_urls(args.real)
+
+    modes = [("node", 1), ("node", 4), ("cycle_batch", 4)]
+    rows = []
+    for mode, limit in modes:
+        os.environ["LLM_CONCURRENCY"] = str(limit)
+        walls, used = [], None
+        for _ in range(args.repeat):
+            wall, used = asyncio.run(_run(mode, signed))
+            walls.append(wall)
+        rows.append((f"{mode} x{limit}", used, statistics.median(walls)))
+
+    print()
+    print(f"cycle {CYCLE['cycle_id']}: {len(CYCLE['observations'])} nodes, tokens: {counter}"
+          + ("" if args.real else " (text only, images excluded)"))
+    if not args.real:
+        print(f"fake latency = {args.base} + {args.per_image}/image + {args.per_token}/output token, drop {args.drop}")
+    print(f"{'mode':16} {'requests':>8} {'prompt tok':>10} {'output tok':>10} {'wall s (med)':>12}")
+    for name, used, wall in rows:
+        print(f"{name:16} {used['requests']:>8} {used['prompt_tokens']:>10} {used['completion_tokens']:>10} {wall:>12.2f}")
+
+    base_used, base_wall = rows[1][1], rows[1][2]
+    batch_used, batch_wall = rows[2][1], rows[2][2]
+
+    def change(key):
+        a, b = base_used[key], batch_used[key]
+        return f"{a} → {b} ({(b - a) / a:+.0%})" if a else f"{a} → {b}"
+
+    print()
+
+    print(f"cycle_batch vs node x4: requests {change('requests')}, prompt tokens {change('prompt_tokens')}, "
+          f"output tokens {change('completion_tokens')}, wall {base_wall:.2f} → {batch_wall:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# bench_llm_concurrency.py
+# 사이클 LLM 분석: 이전 방식(노드마다 blocking requests, 순차) vs 비동기 동시 요청(동시 수 제한별)
+# 로컬 가짜 LLM 엔드포인트(지연 주입)로 측정 — 실제 API 키 / 비용 없이
+#   총 소요 시간, 이벤트 루프 최대 정지 시간(다른 엔드포인트가 응답 못 하는 시간)
+#
+#   python bench_llm_concurrency.py
+#   python bench_llm_concurrency.py --nodes 4 12 --latency 2.0 --jitter 0.5 --limits 1 2 4 8
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import llm.client as llm_client
+from llm.analysis import analyze_nodes, build_node_payload
+from llm.prompt import SYSTEM_PROMPT
+
+
+# =========================
+# 가짜 LLM 서버 (OpenAI chat completions 형식)
+# =========================
+def _fake_llm_app(latency, jitter):
+    async def completions(request: Request):
+        body = await request.json()
+        user = json.loads(body["messages"][1]["content"][0]["text"])
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        action = "supply_fertilizer" if user["detection_result"] == "normal" else "spray"
+        content = {
+            "task_list": [{"node": user["node"], "action": action, "reason": "bench"}],
+            "summary_report": f"{user['node']} bench",
+        }
+        return JSONResponse({"choices": [{"message": {"content": json.dumps(content)}}]})
+
+    return Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+
+
+def _start_fake_llm(port, latency, jitter):
+    return _start_fake_llm_app(_fake_llm_app(latency, jitter), port)
+
+
+def _start_fake_llm_app(app, port):
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# =========================
+# 측정
+# =========================
+async def _loop_lag_probe(stop, interval=0.01):
+    """이벤트 루프가 interval보다 얼마나 늦게 깨어나는지 (최대값)"""
+    worst = 0.0
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - t - interval)
+    return worst
+
+
+def _observations(n):
+    return [
+        {"node": f"node{i}", "image_url": "", "yolo": {"result": random.choice(["normal", "abnormal"]), "confidence": 0.9}}
+        for i in range(n)
+    ]
+
+
+async def _sequential(observations, signed):
+    """이전 방식: async 함수 안에서 blocking 호출을 노드마다 차례로"""
+    out = []
+    for obs in observations:
+        payload = build_node_payload("bench", "AGV1", "now", obs)
+        out.append(llm_client.call_gpt41_mini(SYSTEM_PROMPT, json.dumps(payload, ensure_ascii=False), signed[obs["node"]]))
+    return out
+
+
+async def _run(fn, observations):
+    signed = {o["node"]: "http://example/img.jpg" for o in observations}
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_loop_lag_probe(stop))
+    await asyncio.sleep(0.05)
+
+    t = time.perf_counter()
+    results = await fn(observations, signed)
+    wall = time.perf_counter() - t
+
+    stop.set()
+    lag = await probe
+    await llm_client.close_client()
+    assert len(results) == len(observations)
+    return wall, lag
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, nargs="+", default=[4, 12])
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=1.5, help="가짜 LLM 응답 지연 (sec)")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    _start_fake_llm(args.port, args.latency, args.jitter)
+    os.environ["GMS_API_URL"] = f"http://127.0.0.1:{args.port}/v1/chat/completions"
+    os.environ.setdefault("GMS_KEY", "bench")
+
+    rows = []
+    for n in args.nodes:
+        observations = _observations(n)
+        wall, lag = asyncio.run(_run(_sequential, observations))
+        rows.append((n, "sequential", wall, lag))
+        for limit in args.limits:
+            os.environ["LLM_CONCURRENCY"] = str(limit)
+            fn = lambda obs, signed: analyze_nodes("bench", "AGV1", "now", obs, signed)
+            wall, lag = asyncio.run(_run(fn, observations))
+            rows.append((n, f"async x{limit}", wall, lag))
+
+    print()
+    print(f"LLM latency {args.latency}±{args.jitter} s")
+    print(f"{'nodes':>5} {'mode':12} {'wall s':>7} {'max loop stall s':>17}")
+    for n, mode, wall, lag in rows:
+        print(f"{n:>5} {mode:12} {wall:>7.2f} {lag:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# llm/analysis.py
+import asyncio
+import json
+import os
+from collections import Counter
+from pydantic import ValidationError
+
+from llm.client import call_gpt41_mini_async
+from llm.prompt import BATCH_SYSTEM_PROMPT, SYSTEM_PROMPT
+from llm.schemas import LLMResponse, TaskItem
+
+# 일괄 분석 응답 길이 상한: 노드 수에 비례
+BATCH_MAX_TOKENS_PER_NODE = 256
+
+
+# LLM_ANALYSIS_MODE (호출 시점에 읽음)
+#   node        : 노드마다 요청 1번 (기본값)
+#   cycle_batch : cycle의 모든 노드를 요청 1번으로. 빠지거나 잘못된 노드만 노드별 요청으로 재분석
+def is_batch_mode() -> bool:
+    return os.getenv("LLM_ANALYSIS_MODE", "node") == "cycle_batch"
+
+
+# SYSTEM_PROMPT 판단 규칙과 같은 결정: YOLO 결과 → action (LLM 응답 전에 바로 작업 목록 작성)
+RULE_ACTIONS = {"normal": "supply_fertilizer", "abnormal": "spray"}
+
+
+def rule_preview(obs: dict):
+    """
+    규칙으로 정한 임시 분석 결과 (analyze_node 결과와 같은 형식)
+    reason / summary_report는 LLM 응답으로 채우기 전까지 자리 표시 문장. 규칙이 없는 결과(unknown)는 None
+    """
+    result = obs["yolo"]["result"]
+    action = RULE_ACTIONS.get(result)
+    if action is None:
+        return None
+    note = f"YOLO {result} ({obs['yolo']['confidence']:.2f}) 규칙 적용, LLM 분석 대기 중"
+    return {
+        "task_list": [{"node": obs["node"], "action": action, "reason": note}],
+        "summary_report": note,
+    }
+
+
+def build_node_payload(cycle_id: str, agv_id: str, timestamp: str, obs: dict) -> dict:
+    return {
+        "cycle_id": cycle_id,
+        "node": obs["node"],
+        "image_url": obs["image_url"],
+        "detection_result": obs["yolo"]["result"],
+        "confidence": obs["yolo"]["confidence"],
+        "prompt": "이 식물의 상태를 분석하고 필요한 조치를 추천해줘.",
+        "metadata": {"agv_id": agv_id, "timestamp": timestamp, "position": obs["node"]}
+    }
+
+
+def build_cycle_payload(cycle_id: str, agv_id: str, timestamp: str, observations: list) -> dict:
+    # 이미지는 첨부 순서(image_index)로 연결 → URL을 텍스트에 다시 넣지 않음
+    return {
+        "cycle_id": cycle_id,
+        "prompt": "각 노드 상추의 상태를 분석하고 노드마다 필요한 조치를 하나씩 추천해줘.",
+        "metadata": {"agv_id": agv_id, "timestamp": timestamp},
+        "observations": [
+            {
+                "node": obs["node"],
+                "image_index": i,
+                "detection_result": obs["yolo"]["result"],
+                "confidence": obs["yolo"]["confidence"],
+            }
+            for i, obs in enumerate(observations)
+        ],
+    }
+
+
+async def analyze_node(cycle_id: str, agv_id: str, timestamp: str, obs: dict, image_url: str) -> dict:
+    payload_for_llm = build_node_payload(cycle_id, agv_id, timestamp, obs)
+    llm_text = await call_gpt41_mini_async(SYSTEM_PROMPT, json.dumps(payload_for_llm, ensure_ascii=False), image_url)
+    validated = LLMResponse(**json.loads(llm_text))
+    return validated.model_dump()
+
+
+async def analyze_nodes(cycle_id: str, agv_id: str, timestamp: str, observations: list, signed_url_map: dict) -> list:
+    """
+    노드별 LLM 분석을 동시에 실행 (동시 요청 수는 LLM_CONCURRENCY로 제한)
+    결과는 observations 순서 그대로
+    """
+    return await asyncio.gather(*[
+        analyze_node(cycle_id, agv_id, timestamp, obs, signed_url_map[obs["node"]])
+        for obs in observations
+    ])
+
+
+def split_batch_response(data: dict, nodes: list) -> dict:
+    """
+    일괄 응답(JSON dict) → 노드별 {task_list, summary_report} (analyze_node 결과와 같은 형식)
+    task 항목은 하나씩 TaskItem으로 검증 → 잘못된 항목은 그 노드만 빠지고 나머지 노드는 그대로 사용
+    task가 정확히 1개이고 유효한 입력 노드만 포함. 빠지거나 중복되거나 잘못된 노드는 결과에 없음
+    """
+    items = data.get("task_list") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return {}
+    summaries = data.get("node_summaries")
+    summaries = summaries if isinstance(summaries, dict) else {}
+
+    # 잘못된 항목도 노드 이름이 있으면 개수에 포함 (유효 + 잘못된 중복 → 모호하므로 재분석)
+    counts = Counter(item.get("node") for item in items if isinstance(item, dict))
+    by_node = {}
+    for item in items:
+        try:
+            task = TaskItem.model_validate(item)
+        except ValidationError as e:
+            print(f"[LLM] invalid batch task {item!r}: {e.error_count()} error(s)")
+            continue
+        if task.node in nodes and counts[task.node] == 1:
+            summary = summaries.get(task.node)
+            by_node[task.node] = {
+                "task_list": [task.model_dump()],
+                "summary_report": summary if isinstance(summary, str) and summary else task.reason,
+            }
+    return by_node
+
+
+async def analyze_cycle_batch(cycle_id: str, agv_id: str, timestamp: str, observations: list, signed_url_map: dict) -> list:
+    """
+    cycle의 모든 노드를 요청 1번으로 분석 (SYSTEM_PROMPT / 메타데이터를 노드마다 반복하지 않음)
+    응답의 task 항목을 하나씩 검증하고, 노드마다 task가 정확히 1개인지 확인
+    빠지거나 잘못된 노드(응답이 JSON이 아니면 모든 노드)만 노드별 요청으로 재분석
+    결과는 observations 순서 그대로
+    """
+    nodes = [obs["node"] for obs in observations]
+    payload_for_llm = build_cycle_payload(cycle_id, agv_id, timestamp, observations)
+
+    by_node = {}
+    try:
+        llm_text = await call_gpt41_mini_async(
+            BATCH_SYSTEM_PROMPT,
+            json.dumps(payload_for_llm, ensure_ascii=False),
+            [signed_url_map[n] for n in nodes],
+            max_tokens=BATCH_MAX_TOKENS_PER_NODE * len(nodes),
+        )
+        by_node = split_batch_response(json.loads(llm_text), nodes)
+    except Exception as e:
+        print(f"[LLM] cycle batch failed ({cycle_id}): {e}")
+
+    missing = [obs for obs in observations if obs["node"] not in by_node]
+    if missing:
+        print(f"[LLM] cycle batch fallback ({cycle_id}): {[obs['node'] for obs in missing]}")
+        fallback = await analyze_nodes(cycle_id, agv_id, timestamp, missing, signed_url_map)
+        by_node.update(zip([obs["node"] for obs in missing], fallback))
+
+    return [by_node[n] for n in nodes]
@@ -1,9 +1,29 @@
+import asyncio
 import os
+from typing import List, Union
+import httpx
 import requests
 
 GMS_API_URL = "https://gms.ssafy.io/gmsapi/api.openai.com/v1/chat/completions"
+LLM_TIMEOUT = 60
 
-def call_gpt41_mini(system_prompt: str, user_text: str, image_url: str) -> str:
+# 환경변수는 호출 시점에 읽음 (main.py의 load_dotenv가 import 이후에 실행됨)
+#   GMS_API_URL      : LLM 엔드포인트 (벤치마크 시 로컬 가짜 서버로 교체)
+#   LLM_CONCURRENCY  : 동시에 진행하는 LLM 요청 수 상한 (사이클 여러 개가 겹쳐도 전체 합계 기준)
+def _api_url() -> str:
+    return os.getenv("GMS_API_URL", GMS_API_URL)
+
+
+def _concurrency() -> int:
+    return int(os.getenv("LLM_CONCURRENCY", "4"))
+
+
+# 누적 토큰 사용량 (응답의 usage 필드). 분석 모드별 비용 비교용
+token_usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+def _request(system_prompt: str, user_text: str, image_url: Union[str, List[str]], max_tokens: int = 512):
+    """image_url이 리스트면 순서대로 이미지 여러 장 첨부 (cycle 일괄 분석)"""
     api_key = os.getenv("GMS_KEY")
     if not api_key:
         raise RuntimeError("환경변수 GMS_KEY가 설정되어 있지 않습니다.")
@@ -13,27 +33,78 @@ def call_gpt41_mini(system_prompt: str, user_text: str, image_url: str) -> str:
         "Authorization": f"Bearer {api_key}",
     }
 
+    image_urls = [image_url] if isinstance(image_url, str) else image_url
+    content = [{"type": "text", "text": user_text}]
+    content += [{"type": "image_url", "image_url": {"url": url}} for url in image_urls]
+
     payload = {
         "model": "gpt-4.1-mini",
         "messages": [
             {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": user_text},
-                    {"type": "image_url", "image_url": {"url": image_url}},
-                ],
-            },
+            {"role": "user", "content": content},
         ],
         "temperature": 0.2,
-        "max_tokens": 512,
+        "max_tokens": max_tokens,
     }
+    return headers, payload
+
+
+def _content(data: dict) -> str:
+    usage = data.get("usage") or {}
+    token_usage["requests"] += 1
+    token_usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
+    token_usage["completion_tokens"] += usage.get("completion_tokens", 0)
+    return data["choices"][0]["message"]["content"]
+
+
+def call_gpt41_mini(system_prompt: str, user_text: str, image_url: str) -> str:
+    headers, payload = _request(system_prompt, user_text, image_url)
 
     # timeout -> 서버가 멈추는 상황 방지
-    r = requests.post(GMS_API_URL, headers=headers, json=payload, timeout=60)
+    r = requests.post(_api_url(), headers=headers, json=payload, timeout=LLM_TIMEOUT)
     # r.raise_for_status()
     if r.status_code >= 400:
         raise RuntimeError(f"GMS error {r.status_code}: {r.text}")
 
-    data = r.json()
-    return data["choices"][0]["message"]["content"]
\ No newline at end of file
+    return _content(r.json())
+
+
+# =========================
+# 비동기 버전 (이벤트 루프를 막지 않음)
+# =========================
+_client = None
+_semaphore = None
+
+
+def _get_client():
+    """연결 재사용을 위해 프로세스당 AsyncClient 1개"""
+    global _client, _semaphore
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=LLM_TIMEOUT,
+            limits=httpx.Limits(max_connections=_concurrency()),
+        )
+        _semaphore = asyncio.Semaphore(_concurrency())
+    return _client, _semaphore
+
+
+async def close_client():
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _semaphore = None
+
+
+async def call_gpt41_mini_async(
+    system_prompt: str, user_text: str, image_url: Union[str, List[str]], max_tokens: int = 512
+) -> str:
+    headers, payload = _request(system_prompt, user_text, image_url, max_tokens)
+    client, semaphore = _get_client()
+
+    async with semaphore:
+        r = await client.post(_api_url(), headers=headers, json=payload)
+    if r.status_code >= 400:
+        raise RuntimeError(f"GMS error {r.status_code}: {r.text}")
+
+    return _content(r.json())
@@ -2,11 +2,25 @@ from fastapi import FastAPI
 from api.routers import agv
 from api.routers.agv_cmd import router as agv_cmd_router
 from dotenv import load_dotenv
+from llm.client import close_client
+from services import job_queue
 
 load_dotenv()
 
 app = FastAPI(title="Smart Farm AGV Observation API")
 
+
+@app.on_event("startup")
+async def start_job_queue():
+    # 재시작 전에 끝나지 않은 분석 작업도 여기서 다시 실행
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await job_queue.stop()
+    await close_client()
+
 # 라우터 등록
 app.include_router(agv.router)
 app.include_router(agv_cmd_router)
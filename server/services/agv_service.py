@@ -1,77 +1,287 @@
-import json
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from typing import List
 from fastapi import UploadFile, HTTPException
 from firebase_admin import storage
 from firestore.client import get_db, init_firebase
-from llm.client import call_gpt41_mini
-from llm.prompt import SYSTEM_PROMPT
-from llm.schemas import LLMResponse
+from llm.analysis import analyze_cycle_batch, analyze_node, is_batch_mode, rule_preview
 
-async def upload_and_analyze_observations(req, images: List[UploadFile]):
-    init_firebase()
-    bucket = storage.bucket()
-    signed_url_map = {}
+# Storage 업로드 / URL 서명용 스레드 풀 (firebase_admin storage는 blocking API)
+STORAGE_UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", "4"))
+_upload_pool = ThreadPoolExecutor(max_workers=STORAGE_UPLOAD_WORKERS, thread_name_prefix="storage-upload")
 
-    # 1. Storage 업로드 및 Signed URL 생성
-    for i, img in enumerate(images):
-        node = req.observations[i].node
-        filename = img.filename or f"{node}.jpg"
-        path = f"images/cycles/{req.cycle_id}/{filename}"
+def _load_previous_analysis(db, cycle_id: str, node: str, cache: dict):
+    """
+    unchanged_since로 지정된 cycle에서 해당 노드의 관찰 + LLM 분석을 가져옴
+    반환: (이전 관찰 dict, LLM 결과 dict {task_list, summary_report}, 아직 임시인 필드 리스트)
+    """
+    if cycle_id not in cache:
+        snap = db.collection("cycles").document(cycle_id).get()
+        cache[cycle_id] = snap.to_dict() if snap.exists else {}
+    data = cache[cycle_id]
 
-        blob = bucket.blob(path)
-        blob.upload_from_file(img.file, content_type=img.content_type)
-        
-        req.observations[i].image_url = blob.public_url
-        signed_url_map[node] = blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=10),
-            method="GET",
-        )
+    prev_obs = next((o for o in data.get("agv", {}).get("observations", []) if o.get("node") == node), None)
+    llm_data = data.get("llm", {})
+    if prev_obs is None or node not in llm_data.get("summary", {}):
+        raise HTTPException(status_code=409, detail=f"이전 분석을 찾을 수 없습니다: {cycle_id}/{node}")
+
+    preview = {
+        "task_list": [t for t in llm_data.get("task_list", []) if t.get("node") == node],
+        "summary_report": llm_data["summary"][node],
+    }
+    return prev_obs, preview, llm_data.get("provisional", {}).get(node, [])
+
+
+def check_previous_analyses(refs: dict):
+    """
+    refs: 참조 cycle_id → 노드 리스트. 저장된 분석이 없으면 409 (blocking)
+    작업 등록 전에 호출 → AGV가 거절(409)을 받고 해당 cycle을 변화 비교 기준에서 뺌
+    """
+    db = get_db()
+    cache = {}
+    for cycle_id, nodes in refs.items():
+        for node in nodes:
+            _load_previous_analysis(db, cycle_id, node, cache)
+
+
+def _upload_image(bucket, cycle_id: str, node: str, img: UploadFile):
+    """이미지 1장 Storage 업로드 + Signed URL 생성 (blocking → 업로드 스레드 풀에서 실행)"""
+    filename = img.filename or f"{node}.jpg"
+    path = f"images/cycles/{cycle_id}/{filename}"
+
+    blob = bucket.blob(path)
+    blob.upload_from_file(img.file, content_type=img.content_type)
+
+    signed_url = blob.generate_signed_url(
+        version="v4",
+        expiration=timedelta(minutes=10),
+        method="GET",
+    )
+    return blob.public_url, signed_url
+
+
+# =========================
+# cycle LLM 문서 (cycles/{cycle_id}.llm)
+#   task_list / summary : 노드 순서대로. 규칙으로 먼저 채우고 LLM 응답이 오면 교체
+#   provisional         : 노드 → 아직 임시(규칙 자리 표시)인 필드 ["reason", "summary"]
+#   pending             : 규칙이 없어(unknown) LLM 응답 전까지 task가 없는 노드
+#   errors              : LLM 분석이 실패한 노드 → 오류 (임시 값이 그대로 남음)
+#   status              : provisional → final (임시 / 대기 노드가 없으면 final)
+# =========================
+class _CycleLLMDoc:
+    def __init__(self, db, cycle_id: str, nodes: list):
+        self.ref = db.collection("cycles").document(cycle_id)
+        self.nodes = nodes
+        self.tasks = {}
+        self.summary = {}
+        self.provisional = {}
+        self.pending = []
+        self.errors = {}
+
+    def set_node(self, node: str, preview: dict, provisional=()):
+        self.tasks[node] = preview["task_list"]
+        self.summary[node] = preview["summary_report"]
+        if provisional:
+            self.provisional[node] = list(provisional)
+        else:
+            self.provisional.pop(node, None)
+        if node in self.pending:
+            self.pending.remove(node)
+
+    def enrich(self, node: str, preview: dict):
+        """LLM 결과로 reason / summary 교체. action은 이미 보낸 규칙 값을 유지 (다르면 로그만)"""
+        ruled = {t["node"]: t["action"] for t in self.tasks.get(node, [])}
+        for t in preview["task_list"]:
+            if t["node"] in ruled and t["action"] != ruled[t["node"]]:
+                print(f"[LLM] {node}: LLM action {t['action']} != rule {ruled[t['node']]} (rule kept)")
+                t["action"] = ruled[t["node"]]
+        self.set_node(node, preview)
+
+    def doc(self) -> dict:
+        return {
+            "task_list": [t for n in self.nodes for t in self.tasks.get(n, [])],
+            "summary": dict(self.summary),
+            "provisional": {n: list(f) for n, f in self.provisional.items()},
+            "pending": list(self.pending),
+            "errors": dict(self.errors),
+            "status": "provisional" if self.provisional or self.pending else "final",
+        }
+
+    async def write(self):
+        # update: llm 맵 전체 교체 (merge set은 provisional에서 지운 노드가 남음)
+        await asyncio.to_thread(self.ref.update, {"llm": self.doc()})
 
-    agv_doc = {
+
+_enrich_tasks = set()
+
+
+async def _enrich_llm(cycle_id: str, llm_doc: _CycleLLMDoc, analyses: dict):
+    """
+    백그라운드: LLM 결과가 도착하는 대로 임시 reason / summary를 교체해서 저장
+    analyses: 분석 future → 그 future가 맡은 노드 리스트
+    """
+    waiting = set(analyses)
+    while waiting:
+        done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        for fut in done:
+            error = "cancelled" if fut.cancelled() else fut.exception()
+            if error is not None:
+                print(f"[LLM] enrichment failed ({cycle_id}) {analyses[fut]}: {error}")
+                for node in analyses[fut]:
+                    llm_doc.errors[node] = str(error)
+                continue
+            for node, preview in fut.result():
+                llm_doc.enrich(node, preview)
+        try:
+            await llm_doc.write()
+        except Exception as e:
+            print(f"[LLM] enrichment write failed ({cycle_id}): {e}")
+    print(f"[LLM] {cycle_id} enrichment done: {llm_doc.doc()['status']}")
+
+
+def _agv_doc(req, image_cycle: dict) -> dict:
+    observations = []
+    for o in req.observations:
+        obs = o.model_dump()
+        obs["image_cycle_id"] = image_cycle.get(o.node, req.cycle_id)
+        observations.append(obs)
+    return {
         "cycle_id": req.cycle_id,
         "agv_id": req.agv_id,
         "timestamp": req.timestamp,
-        "observations": [o.model_dump() for o in req.observations],
+        "observations": observations,
     }
 
-    # 2. Firestore 저장
+
+async def upload_and_analyze_observations(req, images: List[UploadFile], on_stage=None, start_llm=None):
+    """
+    on_stage: 단계가 끝날 때마다 on_stage(이름) 호출 — "provisional", "upload"
+    start_llm: LLM 보강 코루틴을 받아 실행을 맡는 함수 (분석 작업 큐: 동시 보강 수 제한)
+               없으면 바로 백그라운드 태스크로. 어느 쪽이든 업로드가 끝나면 보강을 기다리지 않고 반환
+    """
+    on_stage = on_stage or (lambda name: None)
+    init_firebase()
+    bucket = storage.bucket()
     db = get_db()
-    db.collection("cycles").document(req.cycle_id).set({"agv": agv_doc}, merge=True)
-
-    # 3. LLM 분석 수행
-    llm_previews = []
-    for obs in agv_doc["observations"]:
-        payload_for_llm = {
-            "cycle_id": req.cycle_id,
-            "node": obs["node"],
-            "image_url": obs["image_url"],
-            "detection_result": obs["yolo"]["result"],
-            "confidence": obs["yolo"]["confidence"],
-            "prompt": "이 식물의 상태를 분석하고 필요한 조치를 추천해줘.",
-            "metadata": {"agv_id": req.agv_id, "timestamp": req.timestamp, "position": obs["node"]}
-        }
+    loop = asyncio.get_running_loop()
 
-        llm_text = call_gpt41_mini(SYSTEM_PROMPT, json.dumps(payload_for_llm, ensure_ascii=False), signed_url_map[obs["node"]])
-        validated = LLMResponse(**json.loads(llm_text))
-        llm_previews.append(validated.model_dump())
+    # 0. 변화 없는 노드: 이전 cycle의 이미지 / 분석 재사용 (업로드, LLM 호출 생략)
+    prev_cache = {}
+    reused = {}
+    image_cycle = {}
+    for o in req.observations:
+        if not o.unchanged_since:
+            continue
+        prev_obs, preview, provisional = await asyncio.to_thread(
+            _load_previous_analysis, db, o.unchanged_since, o.node, prev_cache
+        )
+        o.image_url = prev_obs.get("image_url", "")
+        # 연속으로 재사용돼도 이미지는 실제로 올라간 cycle을 가리킴
+        image_cycle[o.node] = prev_obs.get("image_cycle_id") or o.unchanged_since
+        reused[o.node] = (preview, provisional)
 
-    # 4. 분석 결과(Task List) 요약 및 저장
-    task_list = []
-    summary_list = {}
-    for one in llm_previews:
-        task_list.extend(one["task_list"])
-        node = one["task_list"][0]["node"]
-        summary_list[node] = one["summary_report"]
+    changed = [o for o in req.observations if not o.unchanged_since]
 
-    db.collection("cycles").document(req.cycle_id).set({"llm": {"task_list": task_list, "summary": summary_list}}, merge=True)
-    
+    # 1. Storage 업로드 및 Signed URL 생성: 노드별 병렬 (동시 업로드 수 = 풀 크기)
+    uploads = [
+        loop.run_in_executor(_upload_pool, _upload_image, bucket, req.cycle_id, o.node, img)
+        for o, img in zip(changed, images)
+    ]
+
+    # 3. LLM 분석: 각 노드는 자기 이미지 업로드가 끝나는 즉시 시작 (전체 업로드를 기다리지 않음)
+    #    결과는 [(node, preview), ...] — 응답 뒤 백그라운드에서 임시 작업 목록을 채움
+    async def _analyze_after_upload(o, upload):
+        o.image_url, signed_url = await upload
+        return [(o.node, await analyze_node(req.cycle_id, req.agv_id, req.timestamp, o.model_dump(), signed_url))]
+
+    # 일괄 모드: 이미지가 전부 올라간 뒤 cycle 전체를 요청 1번으로
+    async def _analyze_batch_after_uploads():
+        signed_url_map = {}
+        for o, upload in zip(changed, uploads):
+            o.image_url, signed_url_map[o.node] = await upload
+        results = await analyze_cycle_batch(
+            req.cycle_id, req.agv_id, req.timestamp, [o.model_dump() for o in changed], signed_url_map
+        )
+        return list(zip([o.node for o in changed], results))
+
+    async def _enrich():
+        # 분석 future → 맡은 노드
+        if is_batch_mode():
+            analyses = {asyncio.ensure_future(_analyze_batch_after_uploads()): [o.node for o in changed]}
+        else:
+            analyses = {asyncio.ensure_future(_analyze_after_upload(o, u)): [o.node] for o, u in zip(changed, uploads)}
+        try:
+            await _enrich_llm(req.cycle_id, llm_doc, analyses)
+        finally:
+            # 보강이 취소돼도 (서버 종료) 남은 LLM 요청은 정리 — 끝난 future에는 영향 없음
+            for t in analyses:
+                t.cancel()
+
+    # 2. 규칙으로 정한 임시 작업 목록 (action은 YOLO 결과로 확정, reason / summary는 자리 표시)
+    #    → 업로드를 기다리지 않고 바로 저장: get_task_list가 바로 ready,
+    #      publish_zone_actions가 LLM을 기다리지 않고 보낼 수 있음
+    llm_doc = _CycleLLMDoc(db, req.cycle_id, [o.node for o in req.observations])
+    for o in req.observations:
+        if o.node in reused:
+            preview, provisional = reused[o.node]
+            llm_doc.set_node(o.node, preview, provisional)
+            continue
+        preview = rule_preview(o.model_dump())
+        if preview is None:
+            llm_doc.pending.append(o.node)
+        else:
+            llm_doc.set_node(o.node, preview, ("reason", "summary"))
+
+    # 관찰 + 임시 작업 목록을 한 번에 저장 (두 필드만 통째로 교체, 문서의 다른 필드는 유지)
+    # 변화 있는 노드의 image_url은 업로드가 끝난 뒤 채움
+    await asyncio.to_thread(
+        llm_doc.ref.set, {"agv": _agv_doc(req, image_cycle), "llm": llm_doc.doc()}, merge=["agv", "llm"]
+    )
+    on_stage("provisional")
+
+    # 4. LLM reason / summary는 도착하는 대로 채움 (업로드와 겹쳐서 시작, 응답은 기다리지 않음)
+    if changed:
+        if start_llm is not None:
+            start_llm(_enrich())
+        else:
+            task = asyncio.create_task(_enrich())
+            _enrich_tasks.add(task)
+            task.add_done_callback(_enrich_tasks.discard)
+
+    # 업로드 실패는 요청 실패로 만들지 않음 (작업 목록은 이미 저장됨)
+    # → 그 노드의 LLM 분석도 같은 오류로 실패해서 llm.errors에 남음
+    upload_errors = {}
+    for o, res in zip(changed, await asyncio.gather(*uploads, return_exceptions=True)):
+        if isinstance(res, Exception):
+            upload_errors[o.node] = f"{type(res).__name__}: {res}"
+            print(f"[UPLOAD] {req.cycle_id}/{o.node} failed: {upload_errors[o.node]}")
+        else:
+            o.image_url = res[0]
+    if len(upload_errors) < len(changed):
+        try:
+            await asyncio.to_thread(
+                llm_doc.ref.update, {"agv.observations": _agv_doc(req, image_cycle)["observations"]}
+            )
+        except Exception as e:
+            print(f"[UPLOAD] image_url write failed ({req.cycle_id}): {e}")
+    on_stage("upload")
+
+    llm = llm_doc.doc()
     return {
         "status": "ok",
         "cycle_id": req.cycle_id,
-        "uploaded": [{"node": o.node, "image_url": o.image_url} for o in req.observations],
-        "llm_preview": llm_previews
+        "uploaded": [{"node": o.node, "image_url": o.image_url} for o in changed if o.node not in upload_errors],
+        "upload_errors": upload_errors,
+        "reused": [{"node": o.node, "unchanged_since": o.unchanged_since} for o in req.observations if o.unchanged_since],
+        "llm_status": llm["status"],
+        "provisional": llm["provisional"],
+        "pending": llm["pending"],
+        "llm_preview": [
+            {"task_list": llm_doc.tasks[n], "summary_report": llm_doc.summary[n]}
+            for n in llm_doc.nodes if n in llm_doc.tasks
+        ],
     }
 
 
@@ -101,9 +311,13 @@ def fetch_task_list(cycle_id: str):
     data = snap.to_dict()
     llm_data = data.get("llm", {})
     
-    if not llm_data or "task_list" not in llm_data:
+    # 규칙 task도 없이 LLM만 기다리는 노드뿐이면 아직 pending
+    if not llm_data or "task_list" not in llm_data or (not llm_data["task_list"] and llm_data.get("pending")):
         return {"cycle_id": cycle_id, "status": "pending", "task_list": [], "summary": {}}
 
+    # 노드 → 아직 규칙 자리 표시인 필드 (LLM 응답 전)
+    provisional = llm_data.get("provisional", {})
+
     # === 데이터 정제 로직 추가 ===
     refined_tasks = []
     for task in llm_data.get("task_list", []):
@@ -117,14 +331,18 @@ def fetch_task_list(cycle_id: str):
             "node": task.get("node"),
             "action": action_map.get(task.get("action"), "점검 필요"),
             "reason": task.get("reason"),
-            "raw_action": task.get("action") # 로봇 제어용 원본 데이터도 유지
+            "raw_action": task.get("action"), # 로봇 제어용 원본 데이터도 유지
+            "provisional": "reason" in provisional.get(task.get("node"), [])
         })
 
     return {
         "cycle_id": cycle_id,
         "status": "ready",
         "task_list": refined_tasks,  # 정제된 한글 데이터
-        "summary": llm_data.get("summary", {})
+        "summary": llm_data.get("summary", {}),
+        "llm_status": llm_data.get("status", "final"),
+        "provisional": provisional,
+        "pending": llm_data.get("pending", [])
     }
 
 def fetch_agv_observations(cycle_id: str):
@@ -140,7 +358,8 @@ def fetch_agv_observations(cycle_id: str):
 
         # 🔥 핵심: 모든 관찰 데이터의 URL을 Signed URL로 교체합니다.
         for obs in observations:
-            signed_link = get_image_signed_url(cycle_id, obs.get("node"))
+            # 변화 없음으로 재사용된 노드는 이미지가 이전 cycle에 있음
+            signed_link = get_image_signed_url(obs.get("image_cycle_id") or cycle_id, obs.get("node"))
             if signed_link:
                 obs["image_url"] = signed_link 
 
@@ -190,6 +409,18 @@ def save_task_result_to_firestore(req):
         "task_result": req.result
     }
 
+def save_zone_result_to_firestore(req):
+    init_firebase()
+    db = get_db()
+
+    # 구역별 작업 결과: zone_results.{zone}.{action}
+    result = req.model_dump()
+    db.collection("cycles").document(req.cycle_id).set(
+        {"zone_results": {req.zone: {req.action: result}}}, merge=True
+    )
+
+    return {"status": "ok", "cycle_id": req.cycle_id, "zone": req.zone, "action": req.action}
+
 # =========================
 # Mock AGV Power State
 # =========================
@@ -0,0 +1,343 @@
+# services/job_queue.py
+# 관찰 업로드 분석 작업 큐
+#   POST /agv/upload_observation: payload + 이미지를 디스크에 저장하고 작업 등록 → 바로 202 (job_id)
+#   워커(ANALYSIS_WORKERS개)가 순서대로 꺼내서 임시 작업 목록 저장 → Storage 업로드
+#   LLM 보강은 워커와 별도 태스크 (동시에 ANALYSIS_LLM_JOBS개까지) → 느린 LLM이 다음 cycle의 임시 작업 목록을 막지 않음
+#   작업 상태 / 단계별 시간은 jobs/<job_id>/job.json에 기록 → 서버가 재시작돼도 대기 / 실행 중 작업은 다시 실행
+#
+# 디렉토리 구조:
+#   jobs/<job_id>/job.json    상태 (state, stage, timings, error, result)
+#   jobs/<job_id>/payload.json
+#   jobs/<job_id>/NN_<filename> 이미지 (순서 = 변화 있는 관찰 순서). 작업이 끝나면 삭제
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from fastapi import HTTPException
+
+from services.agv_service import check_previous_analyses, upload_and_analyze_observations
+
+JOB_DIR = os.getenv("ANALYSIS_JOB_DIR", "jobs")
+JOB_TTL_S = 7 * 24 * 3600       # 끝난 작업 기록 보관 기간 (시작할 때 정리)
+
+
+def _workers() -> int:
+    return int(os.getenv("ANALYSIS_WORKERS", "2"))
+
+
+def _llm_jobs() -> int:
+    return int(os.getenv("ANALYSIS_LLM_JOBS", "4"))
+
+
+_jobs = {}              # job_id → job dict (job.json과 같은 내용)
+_queue = None
+_worker_tasks = []
+_llm_slots = None       # 동시에 LLM 보강 중인 작업 수 제한
+_llm_tasks = set()      # LLM 보강 / 마무리 태스크 (서버 종료 때 취소)
+_cycle_done = {}        # cycle_id → 그 cycle 작업 종료 이벤트 (unchanged_since 참조 대기용)
+
+
+class _StoredImage:
+    """디스크에 저장한 이미지 (_upload_image가 쓰는 UploadFile 속성만)"""
+
+    def __init__(self, path: str, filename: str, content_type: str):
+        self.filename = filename
+        self.content_type = content_type
+        self.file = open(path, "rb")
+
+
+def _job_dir(job_id: str) -> str:
+    return os.path.join(JOB_DIR, job_id)
+
+
+def _save(job: dict):
+    # 쓰는 도중 종료돼도 job.json이 깨지지 않게 임시 파일 → rename
+    path = os.path.join(_job_dir(job["id"]), "job.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def _write_job(job: dict, payload: dict, images: list):
+    """payload + 이미지 [(filename, content_type, bytes)] 저장 (blocking)"""
+    d = _job_dir(job["id"])
+    os.makedirs(d, exist_ok=True)
+    for i, (filename, content_type, data) in enumerate(images):
+        with open(os.path.join(d, f"{i:02d}_{filename}"), "wb") as f:
+            f.write(data)
+    with open(os.path.join(d, "payload.json"), "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    _save(job)
+
+
+def _load_inputs(job: dict):
+    d = _job_dir(job["id"])
+    with open(os.path.join(d, "payload.json"), encoding="utf-8") as f:
+        payload = json.load(f)
+    images = [
+        _StoredImage(os.path.join(d, f"{i:02d}_{filename}"), filename, content_type)
+        for i, (filename, content_type) in enumerate(job["images"])
+    ]
+    return payload, images
+
+
+def _public(job: dict) -> dict:
+    return {k: v for k, v in job.items() if k != "images"}
+
+
+# =========================
+# 작업 등록 / 조회 (라우터에서 호출)
+# =========================
+async def submit(req, images) -> dict:
+    """payload + 이미지를 저장하고 큐에 등록. 반환: 작업 상태"""
+    if _queue is None:
+        raise HTTPException(status_code=503, detail="분석 작업 큐가 시작되지 않았습니다.")
+
+    stored = []
+    for i, img in enumerate(images):
+        filename = os.path.basename(img.filename or f"{i:02d}.jpg")
+        stored.append((filename, img.content_type or "image/jpeg", await img.read()))
+
+    now = time.time()
+    job = {
+        "id": f"{req.cycle_id}_{uuid.uuid4().hex[:8]}",
+        "cycle_id": req.cycle_id,
+        "agv_id": req.agv_id,
+        "state": "queued",          # queued → running → done | failed (LLM 보강이 끝날 때까지 running)
+        "stage": "queued",          # queued → provisional → upload → llm → done
+        "created": now,
+        "started": None,
+        "finished": None,
+        "timings": {},              # 단계 → 걸린 시간(s). queued = 등록 → 실행 시작, wait_ref = 참조 cycle 대기
+        "attempts": 0,              # 실행 시작 횟수 (재시작으로 다시 실행되면 증가)
+        "error": None,
+        "result": None,
+        "images": [(filename, content_type) for filename, content_type, _ in stored],
+    }
+    await asyncio.to_thread(_write_job, job, req.model_dump(), stored)
+
+    _jobs[job["id"]] = job
+    _cycle_done.setdefault(job["cycle_id"], asyncio.Event())
+    _queue.put_nowait(job["id"])
+    print(f"[JOB] {job['id']} queued ({_queue.qsize()} waiting)")
+    return _public(job)
+
+
+async def check_references(req):
+    """
+    unchanged_since로 참조한 cycle마다: 큐에 대기 / 실행 중인 작업이 있거나 저장된 분석이 있어야 함
+    둘 다 아니면 409 — 202를 보내기 전에 거절해야 AGV가 그 cycle을 기준에서 뺌 (NodeIndex.forget_cycle)
+    """
+    active = {j["cycle_id"] for j in _jobs.values() if j["state"] in ("queued", "running")}
+    refs = {}
+    for o in req.observations:
+        if o.unchanged_since and o.unchanged_since not in active:
+            refs.setdefault(o.unchanged_since, []).append(o.node)
+    if refs:
+        await asyncio.to_thread(check_previous_analyses, refs)
+
+
+def get_job(job_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    out = _public(job)
+    out["queue_position"] = None
+    if job["state"] == "queued":
+        out["queue_position"] = sum(
+            1 for j in _jobs.values() if j["state"] == "queued" and j["created"] <= job["created"]
+        )
+    return out
+
+
+# =========================
+# 실행
+# =========================
+async def _run_job(job: dict):
+    # 라우터가 이 모듈을 import하므로 요청 모델은 실행 시점에 import
+    from api.routers.agv import UploadObservationRequest
+
+    payload, images = await asyncio.to_thread(_load_inputs, job)
+    req = UploadObservationRequest(**payload)
+
+    # 변화 없음 노드가 참조하는 cycle이 아직 큐에 있으면 그 작업이 끝날 때까지 대기
+    # (임시 작업 목록만 저장된 시점에 복사하면 규칙 자리 표시 reason이 그대로 남음)
+    last = time.time()
+    for ref in {o.unchanged_since for o in req.observations if o.unchanged_since}:
+        event = _cycle_done.get(ref)
+        if event is not None and ref != job["cycle_id"]:
+            await event.wait()
+    if time.time() - last > 0.001:
+        job["timings"]["wait_ref"] = round(time.time() - last, 3)
+        last = time.time()
+
+    def on_stage(name):
+        nonlocal last
+        now = time.time()
+        job["timings"][name] = round(now - last, 3)
+        job["stage"] = {"provisional": "upload", "upload": "llm"}.get(name, "done")
+        last = now
+        _save(job)
+
+    llm_task = None
+
+    def start_llm(enrich):
+        nonlocal llm_task
+        llm_task = asyncio.create_task(_run_llm(enrich))
+        _track(llm_task)
+
+    try:
+        job["stage"] = "provisional"
+        result = await upload_and_analyze_observations(req, images, on_stage=on_stage, start_llm=start_llm)
+    except BaseException:
+        if llm_task is not None:
+            llm_task.cancel()
+        raise
+    finally:
+        for img in images:
+            img.file.close()
+    return result, llm_task
+
+
+def _track(task):
+    _llm_tasks.add(task)
+    task.add_done_callback(_llm_tasks.discard)
+
+
+async def _run_llm(enrich):
+    """LLM 보강: 동시에 ANALYSIS_LLM_JOBS개까지 (자리가 날 때까지 대기)"""
+    try:
+        async with _llm_slots:
+            await enrich
+    finally:
+        # 자리를 얻기 전에 취소되면 코루틴이 시작되지 않은 채 남음
+        enrich.close()
+
+
+async def _finish_after_llm(job: dict, llm_task, since: float):
+    try:
+        await llm_task
+        job["state"] = "done"
+    except asyncio.CancelledError:
+        # 서버 종료: job.json은 running으로 남음 → 다음 시작 때 다시 실행
+        raise
+    except Exception as e:
+        job["state"] = "failed"
+        job["error"] = f"{type(e).__name__}: {e}"
+    job["timings"]["llm"] = round(time.time() - since, 3)
+    await _finish(job, "llm")
+
+
+async def _finish(job: dict, who: str):
+    job["stage"] = "done" if job["state"] == "done" else job["stage"]
+    job["finished"] = time.time()
+    job["timings"]["total"] = round(job["finished"] - job["created"], 3)
+    await asyncio.to_thread(_save, job)
+    await asyncio.to_thread(_remove_images, job)
+
+    # 실패해도 이 cycle을 기다리는 작업은 풀어줌 (이전 분석이 없으면 그쪽에서 409)
+    event = _cycle_done.pop(job["cycle_id"], None)
+    if event is not None:
+        event.set()
+    print(f"[JOB] {who}: {job['id']} {job['state']} {job['timings']}" + (f" ({job['error']})" if job["error"] else ""))
+
+
+async def _worker(n: int):
+    while True:
+        job_id = await _queue.get()
+        job = _jobs[job_id]
+        job["state"] = "running"
+        job["started"] = time.time()
+        job["attempts"] += 1
+        job["timings"] = {"queued": round(job["started"] - job["created"], 3)}
+        job["error"] = None
+        await asyncio.to_thread(_save, job)
+
+        llm_task = None
+        try:
+            job["result"], llm_task = await _run_job(job)
+            if llm_task is None:
+                job["state"] = "done"
+        except asyncio.CancelledError:
+            # 서버 종료: job.json은 running으로 남음 → 다음 시작 때 다시 실행
+            raise
+        except HTTPException as e:
+            job["state"] = "failed"
+            job["error"] = f"{e.status_code}: {e.detail}"
+        except Exception as e:
+            job["state"] = "failed"
+            job["error"] = f"{type(e).__name__}: {e}"
+
+        if llm_task is None:
+            await _finish(job, f"worker {n}")
+        else:
+            # 임시 작업 목록 / 업로드 완료 → 워커는 다음 작업으로. 이미지는 보강이 끝나면 삭제
+            _track(asyncio.create_task(_finish_after_llm(job, llm_task, time.time())))
+            print(f"[JOB] worker {n}: {job_id} provisional ready, LLM in background {job['timings']}")
+        _queue.task_done()
+
+
+def _remove_images(job: dict):
+    d = _job_dir(job["id"])
+    for i, (filename, _) in enumerate(job["images"]):
+        try:
+            os.remove(os.path.join(d, f"{i:02d}_{filename}"))
+        except FileNotFoundError:
+            pass
+
+
+def _load_jobs():
+    """디스크의 작업 기록 읽기 (blocking). 오래된 끝난 작업은 삭제"""
+    jobs = []
+    if not os.path.isdir(JOB_DIR):
+        return jobs
+    now = time.time()
+    for name in os.listdir(JOB_DIR):
+        path = os.path.join(JOB_DIR, name, "job.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            # payload 저장 도중 종료된 작업 (job.json 없음) → 202를 받지 못했으므로 AGV가 다시 보냄
+            print(f"[JOB] skip broken job dir: {name}")
+            continue
+        if job["state"] in ("done", "failed") and now - (job["finished"] or 0) > JOB_TTL_S:
+            shutil.rmtree(os.path.join(JOB_DIR, name), ignore_errors=True)
+            continue
+        jobs.append(job)
+    return sorted(jobs, key=lambda j: j["created"])
+
+
+async def start():
+    """서버 시작: 남아 있는 대기 / 실행 중 작업을 등록 순서대로 다시 큐에 넣고 워커 시작"""
+    global _queue, _llm_slots
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue()
+    _llm_slots = asyncio.Semaphore(_llm_jobs())
+    os.makedirs(JOB_DIR, exist_ok=True)
+
+    resumed = 0
+    for job in await asyncio.to_thread(_load_jobs):
+        _jobs[job["id"]] = job
+        if job["state"] in ("queued", "running"):
+            job["state"] = job["stage"] = "queued"
+            _cycle_done.setdefault(job["cycle_id"], asyncio.Event())
+            _queue.put_nowait(job["id"])
+            resumed += 1
+    if resumed:
+        print(f"[JOB] resumed {resumed} job(s) from {JOB_DIR}")
+
+    _worker_tasks.extend(asyncio.create_task(_worker(n)) for n in range(_workers()))
+
+
+async def stop():
+    global _queue
+    tasks = _worker_tasks + list(_llm_tasks)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _worker_tasks.clear()
+    _queue = None